@@ -0,0 +1,574 @@
+"""
+Embedium çevrimdışı performans testi (benchmark).
+
+main.py'deki gerçek olay işleyicilerini sahte Discord verisi ve geçici bir veritabanıyla çalıştırır.
+Ağ bağlantısı kurulmaz: discord.py'nin HTTP istekleri FakeDiscordAPI'ye yönlendirilir, Discord'un döneceği
+yanıtlar burada üretilir ve kanal oluşturma/silme gibi gateway olayları taklit edilir.
+
+Her senaryo için olay/sn, p50/p99 gecikme ve en yüksek bellek kullanımı raporlanır. Hata sütunu, işleyicilerin
+kendisinden yükselen hatalarla birlikte senaryo sırasında başlatılan arka plan görevlerindeki yakalanmamış hataları da
+sayar; herhangi bir hata varsa program 1 koduyla çıkar.
+
+Kullanım:
+    python benchmark.py
+    python benchmark.py --guilds 200 --concurrency 50 --events 5000
+    python benchmark.py --scenarios message,member_join --http-latency 20
+    SLASH_ONLY=1 python benchmark.py --scenarios message,spam
+"""
+import os
+import argparse
+import asyncio
+import collections
+import itertools
+import json
+import random
+import statistics
+import sys
+import tempfile
+import time
+import traceback
+import tracemalloc
+from datetime import datetime, timezone
+
+# main.py içe aktarılmadan önce: sahte token, dosyaya log yok, ölçüm uç noktası kapalı, tek işlem
+os.environ.setdefault('DISCORD_TOKEN', 'benchmark')
+os.environ['LOG_FILE'] = ''
+os.environ.setdefault('LOG_LEVEL', 'WARNING')
+os.environ['METRICS_PORT'] = '0'
+for name in ('CLUSTER_COUNT', 'SHARD_COUNT', 'SHARDED', 'EMBEDIUM_CLUSTER_ID', 'EMBEDIUM_DB_WRITER'):
+    os.environ.pop(name, None)
+
+import logging
+import discord
+import discord.webhook.async_
+
+import main
+
+SCENARIOS = ('message', 'spam', 'member_join', 'raid', 'member_remove', 'reaction_add', 'reaction_remove', 'ticket_open', 'ticket_close')
+BOT_PERMISSIONS = discord.Permissions.all().value
+REACTION_EMOJI = '👍'
+
+_snowflakes = itertools.count(1_100_000_000_000_000_000)
+
+def snowflake():
+    return next(_snowflakes)
+
+def now_iso():
+    return datetime.now(timezone.utc).isoformat()
+
+# --- Sahte Discord verisi ---
+
+def user_payload(user_id, name, bot=False):
+    return {'id': str(user_id), 'username': name, 'discriminator': '0', 'global_name': name, 'avatar': None, 'bot': bot}
+
+def member_payload(user, role_ids=()):
+    return {'user': user, 'roles': [str(role_id) for role_id in role_ids], 'joined_at': now_iso(),
+            'deaf': False, 'mute': False, 'flags': 0, 'nick': None}
+
+def role_payload(role_id, name, position, permissions=0):
+    return {'id': str(role_id), 'name': name, 'permissions': str(permissions), 'position': position,
+            'color': 0, 'hoist': False, 'managed': False, 'mentionable': True, 'flags': 0}
+
+def channel_payload(channel_id, guild_id, name, channel_type=0, parent_id=None):
+    return {'id': str(channel_id), 'guild_id': str(guild_id), 'name': name, 'type': channel_type, 'position': 0,
+            'permission_overwrites': [], 'parent_id': str(parent_id) if parent_id else None, 'nsfw': False,
+            'topic': None, 'last_message_id': None, 'rate_limit_per_user': 0}
+
+def message_payload(channel_id, guild_id, author, content, member=None, embeds=None):
+    if not main.intents.message_content and not author.get('bot'):
+        content = '' # message_content intent'i kapalıyken (SLASH_ONLY) Discord üye mesajlarının içeriğini göndermez
+    data = {'id': str(snowflake()), 'channel_id': str(channel_id), 'guild_id': str(guild_id), 'author': author,
+            'content': content, 'timestamp': now_iso(), 'edited_timestamp': None, 'tts': False,
+            'mention_everyone': False, 'mentions': [], 'mention_roles': [], 'attachments': [], 'embeds': list(embeds or []),
+            'pinned': False, 'type': 0}
+    if member is not None:
+        data['member'] = member
+    return data
+
+class FakeGuild:
+    """Bir test sunucusunun ID'leri; discord.Guild nesnesi ConnectionState'e eklenir."""
+    def __init__(self, index, bot_user):
+        self.id = snowflake()
+        self.bot_role_id = snowflake()
+        self.autorole_id = snowflake()
+        self.reaction_role_id = snowflake()
+        self.mod_role_id = snowflake()
+        self.category_id = snowflake()
+        self.general_id = snowflake()
+        self.welcome_id = snowflake()
+        self.ticket_log_id = snowflake()
+        self.reaction_message_id = snowflake()
+        self.owner_id = snowflake()
+        self.payload = {
+            'id': str(self.id), 'name': f'Test Sunucusu {index}', 'owner_id': str(self.owner_id), 'member_count': 1000,
+            'premium_tier': 0, 'premium_subscription_count': 0, 'features': [], 'emojis': [], 'stickers': [],
+            'verification_level': 0, 'default_message_notifications': 0, 'explicit_content_filter': 0,
+            'mfa_level': 0, 'system_channel_flags': 0, 'preferred_locale': 'tr', 'large': False, 'unavailable': False,
+            'roles': [
+                role_payload(self.id, '@everyone', 0, discord.Permissions.general().value),
+                role_payload(self.autorole_id, 'Üye', 1),
+                role_payload(self.reaction_role_id, 'Bildirim', 2),
+                role_payload(self.mod_role_id, 'Moderatör', 3),
+                role_payload(self.bot_role_id, 'Embedium', 10, BOT_PERMISSIONS),
+            ],
+            'channels': [
+                channel_payload(self.category_id, self.id, 'Ticketlar', channel_type=4),
+                channel_payload(self.general_id, self.id, 'genel'),
+                channel_payload(self.welcome_id, self.id, 'hoş-geldin'),
+                channel_payload(self.ticket_log_id, self.id, 'ticket-log'),
+            ],
+            'members': [member_payload(bot_user, [self.bot_role_id])],
+        }
+
+class FakeDiscordAPI:
+    """
+    discord.py'nin HTTPClient.request ve webhook adaptörü isteklerini karşılar.
+    Yanıtlar rota anahtarına ("METHOD /path") göre üretilir; bilinmeyen rotalar None döner ve sayılır.
+    """
+    def __init__(self, state, bot_user, latency=0.0, history_size=50):
+        self.state = state
+        self.bot_user = bot_user
+        self.latency = latency
+        self.history_size = history_size
+        self.requests = collections.Counter()
+        self.unknown_routes = collections.Counter()
+        self.routes = {
+            'POST /channels/{channel_id}/messages': self._create_message,
+            'DELETE /channels/{channel_id}/messages/{message_id}': self._no_content,
+            'GET /channels/{channel_id}/messages': self._history,
+            'POST /guilds/{guild_id}/channels': self._create_channel,
+            'DELETE /channels/{channel_id}': self._delete_channel,
+            'PUT /guilds/{guild_id}/members/{user_id}/roles/{role_id}': self._no_content,
+            'DELETE /guilds/{guild_id}/members/{user_id}/roles/{role_id}': self._no_content,
+            'DELETE /guilds/{guild_id}/members/{user_id}': self._no_content,
+            'GET /guilds/{guild_id}/members/{member_id}': self._fetch_member,
+            'PATCH /guilds/{guild_id}/members/{user_id}': self._fetch_member,
+            'POST /channels/{channel_id}/messages/bulk-delete': self._no_content,
+            'POST /interactions/{webhook_id}/{webhook_token}/callback': self._interaction_callback,
+            'POST /webhooks/{webhook_id}/{webhook_token}': self._create_message,
+            'PATCH /channels/{channel_id}/messages/{message_id}': self._edit_message,
+            'PATCH /webhooks/{webhook_id}/{webhook_token}/messages/{message_id}': self._edit_message,
+            'PUT /applications/{application_id}/commands': self._sync_commands,
+        }
+
+    async def request(self, route, **kwargs):
+        if self.latency:
+            await asyncio.sleep(self.latency) # Discord'a gidiş-dönüş süresini taklit et
+        key = f"{route.method} {route.path}"
+        self.requests[key] += 1
+        handler = self.routes.get(key)
+        if handler is None:
+            self.unknown_routes[key] += 1
+            return None
+        return handler(route, **kwargs)
+
+    async def webhook_request(self, route, session=None, **kwargs):
+        # Sınıf özniteliği olarak atanan bağlı metot: adaptör örneği parametre olarak gelmez
+        return await self.request(route, **kwargs)
+
+    def _no_content(self, route, **kwargs):
+        return None
+
+    @staticmethod
+    def _message_body(form=None, multipart=None, **kwargs):
+        # Dosya eklenen isteklerde gövde multipart formun payload_json alanında gelir
+        for part in form or multipart or ():
+            if part.get('name') == 'payload_json':
+                return json.loads(part['value'])
+        return kwargs.get('json') or kwargs.get('payload') or {}
+
+    def _reply(self, route, body, message_id=None):
+        # Discord gönderilen içeriği ve embed'leri mesaj nesnesinde geri döner
+        channel_id = route.channel_id or 0
+        channel = self.state.get_channel(int(channel_id)) if channel_id else None
+        guild_id = channel.guild.id if channel is not None and hasattr(channel, 'guild') else 0
+        data = message_payload(channel_id, guild_id, self.bot_user, body.get('content') or '', embeds=body.get('embeds'))
+        if message_id is not None:
+            data['id'] = str(message_id)
+            data['edited_timestamp'] = now_iso()
+        return data
+
+    def _create_message(self, route, **kwargs):
+        return self._reply(route, self._message_body(**kwargs))
+
+    def _edit_message(self, route, **kwargs):
+        return self._reply(route, self._message_body(**kwargs), message_id=route.url.rsplit('/', 1)[1])
+
+    def _history(self, route, params=None, **kwargs):
+        # Ticket kanalı geçmişi: history_size kadar kullanıcı mesajı; 'after' ile sayfalanır, en yeni önce döner
+        params = params or {}
+        limit = int(params.get('limit', 100))
+        after = int(params.get('after', 0))
+        channel_id = int(route.channel_id)
+        start = channel_id + 1
+        ids = [start + i for i in range(self.history_size) if start + i > after][:limit]
+        author = user_payload(channel_id % 1_000_000, 'ticket-sahibi')
+        return [dict(message_payload(channel_id, 0, author, f"Destek mesajı {message_id - start}"), id=str(message_id))
+                for message_id in reversed(ids)]
+
+    def _create_channel(self, route, json=None, **kwargs):
+        body = json or {}
+        data = channel_payload(snowflake(), route.guild_id, body.get('name', 'kanal'), body.get('type', 0), body.get('parent_id'))
+        # Kanal yalnızca id aralığında çakışma olmasın diye history_size kadar ileri kaydırılır (bkz. _history)
+        for _ in range(self.history_size + 1):
+            snowflake()
+        self.state.parse_channel_create(data) # Gateway'in CHANNEL_CREATE olayını taklit et
+        return data
+
+    def _delete_channel(self, route, **kwargs):
+        channel = self.state.get_channel(int(route.channel_id))
+        if channel is None:
+            return None
+        data = channel_payload(channel.id, channel.guild.id, channel.name)
+        self.state.parse_channel_delete(data) # Gateway'in CHANNEL_DELETE olayını taklit et
+        return data
+
+    def _fetch_member(self, route, **kwargs):
+        user_id = int(route.url.rsplit('/', 1)[1])
+        return member_payload(user_payload(user_id, f'kullanici-{user_id % 100000}'))
+
+    def _sync_commands(self, route, json=None, **kwargs):
+        # Discord gönderilen slash komutlarını kimlik vererek geri döner
+        return [dict(command, id=str(snowflake()), application_id=route.url.rsplit('/', 2)[1], version=str(snowflake()))
+                for command in json or []]
+
+    def _interaction_callback(self, route, **kwargs):
+        return {'interaction': {'id': str(route.webhook_id), 'type': 3}}
+
+# --- Benchmark ortamı ---
+
+class BenchmarkEnvironment:
+    def __init__(self, args):
+        self.args = args
+        self.bot = main.bot
+        self.state = main.bot._connection
+        self.bot_user = user_payload(snowflake(), 'Embedium', bot=True)
+        self.guilds = []
+        self.api = None
+        self._tempdir = tempfile.TemporaryDirectory()
+
+    async def start(self):
+        state = self.state
+        state.user = discord.ClientUser(state=state, data=self.bot_user)
+        state.application_id = int(self.bot_user['id'])
+
+        self.api = FakeDiscordAPI(state, self.bot_user, latency=self.args.http_latency / 1000, history_size=self.args.ticket_messages)
+        self.bot.http.request = self.api.request
+        discord.webhook.async_.AsyncWebhookAdapter.request = self.api.webhook_request
+        main.TICKET_DELETE_DELAY = 0 # Kapatılan ticket'ı beklemeden sil
+
+        main.db.path = os.path.join(self._tempdir.name, 'benchmark.db')
+        await self.bot._async_setup_hook() # Giriş yapılmadığı için login()'in yaptığı döngü bağlamasını elle yap
+        await self.bot.setup_hook() # Gerçek açılış: veritabanı, migration'lar, önbellekler, otorol kuyruğu, view'lar
+
+        for index in range(self.args.guilds):
+            guild = FakeGuild(index, self.bot_user)
+            state._add_guild(discord.Guild(data=guild.payload, state=state))
+            self.guilds.append(guild)
+            await main.db.execute("INSERT INTO guild_settings (guild_id, welcome_channel_id) VALUES (?, ?)", (guild.id, guild.welcome_id))
+            await main.db.execute("INSERT INTO autoroles (guild_id, role_id) VALUES (?, ?)", (guild.id, guild.autorole_id))
+            await main.db.execute("INSERT INTO ticket_settings (guild_id, ticket_category_id, ticket_log_channel_id, ticket_moderator_role_id) VALUES (?, ?, ?, ?)",
+                                  (guild.id, guild.category_id, guild.ticket_log_id, guild.mod_role_id))
+            await main.reaction_role_index.set(guild.id, guild.reaction_message_id, REACTION_EMOJI, guild.reaction_role_id)
+            # Sahte katılımlar baskın hızında geldiği için koruma yalnızca 'raid' senaryosunda açılır
+            await main.db.execute("INSERT INTO raid_settings (guild_id, enabled) VALUES (?, 0)", (guild.id,))
+        await main.command_state.load()
+
+    async def enable_raid_protection(self, action):
+        for guild in self.guilds:
+            await main.db.execute("UPDATE raid_settings SET enabled = 1, action = ? WHERE guild_id = ?", (action, guild.id))
+            main.guild_settings_cache.invalidate(guild.id)
+
+    async def stop(self):
+        main.raid_guard.stop()
+        await main.member_event_coalescer.stop()
+        await main.autorole_queue.stop()
+        await main.db.close()
+        self._tempdir.cleanup()
+
+    def random_guild(self):
+        return random.choice(self.guilds)
+
+    def new_member(self, guild):
+        user = user_payload(snowflake(), f'kullanici-{random.randrange(100000)}')
+        data = member_payload(user, [guild.reaction_role_id])
+        return discord.Member(data=data, guild=self.state._get_guild(guild.id), state=self.state), data
+
+    def component_interaction(self, guild, channel_id, member_data, custom_id):
+        data = {
+            'id': str(snowflake()), 'application_id': self.bot_user['id'], 'type': 3, 'token': 'benchmark', 'version': 1,
+            'guild_id': str(guild.id), 'channel_id': str(channel_id), 'channel': {'id': str(channel_id), 'type': 0}, 'member': dict(member_data, permissions=str(0)),
+            'data': {'custom_id': custom_id, 'component_type': 2}, 'app_permissions': str(BOT_PERMISSIONS),
+            'locale': 'tr', 'guild_locale': 'tr', 'entitlements': [], 'authorizing_integration_owners': {},
+            'attachment_size_limit': 8 * 1024 * 1024,
+        }
+        return discord.Interaction(data=data, state=self.state)
+
+# --- Senaryolar ---
+# Her senaryo, i. olayı üreten ve gerçek işleyiciyi çağıran bir coroutine fabrikası döner.
+
+def scenario_message(env):
+    commands = [f"e!{name}" for name in env.args.commands.split(',') if name]
+    def make(i):
+        guild = env.random_guild()
+        author_member = member_payload(user_payload(snowflake(), 'yazar'))
+        content = random.choice(commands) if commands and random.random() < env.args.command_ratio else f"Merhaba dünya {i}"
+        data = message_payload(guild.general_id, guild.id, author_member['user'], content,
+                               member={key: value for key, value in author_member.items() if key != 'user'})
+        channel = env.state.get_channel(guild.general_id)
+        message = discord.Message(state=env.state, channel=channel, data=data)
+        return main.on_message(message)
+    return make
+
+def scenario_spam(env):
+    # Küçük bir kullanıcı havuzu aynı birkaç mesajı art arda gönderir: hız ve tekrar sınırları aşılır,
+    # silme/zaman aşımı/uyarı yolları çalışır. Havuz büyütülerek (--spam-users) LRU tablosunun sınırı da ölçülebilir.
+    authors = {}
+    texts = ["bedava nitro burada!!", "BEDAVA   nitro burada", "selaaaam", "katılın katılın", "reklam linki"]
+    def make(i):
+        guild = env.random_guild()
+        user_index = random.randrange(env.args.spam_users)
+        author = authors.get((guild.id, user_index))
+        if author is None:
+            author = authors[(guild.id, user_index)] = member_payload(user_payload(snowflake(), f'spamci-{user_index}'))
+        data = message_payload(guild.general_id, guild.id, author['user'], random.choice(texts),
+                               member={key: value for key, value in author.items() if key != 'user'})
+        message = discord.Message(state=env.state, channel=env.state.get_channel(guild.general_id), data=data)
+        return main.on_message(message)
+    return make
+
+def scenario_member_join(env):
+    def make(i):
+        member, _ = env.new_member(env.random_guild())
+        return main.on_member_join(member)
+    return make
+
+def scenario_member_remove(env):
+    def make(i):
+        guild = env.random_guild()
+        user = user_payload(snowflake(), f'ayrilan-{i}')
+        payload = discord.RawMemberRemoveEvent({'guild_id': str(guild.id), 'user': user}, env.state.store_user(user))
+        return main.on_raw_member_remove(payload)
+    return make
+
+def _reaction_payload(env, guild, event_type):
+    member, member_data = env.new_member(guild)
+    data = {'user_id': str(member.id), 'channel_id': str(guild.general_id), 'message_id': str(guild.reaction_message_id),
+            'guild_id': str(guild.id), 'type': 0}
+    payload = discord.RawReactionActionEvent(data, discord.PartialEmoji(name=REACTION_EMOJI), event_type)
+    if event_type == 'REACTION_ADD':
+        payload.member = member
+    return payload
+
+def scenario_reaction_add(env):
+    def make(i):
+        return main.on_raw_reaction_add(_reaction_payload(env, env.random_guild(), 'REACTION_ADD'))
+    return make
+
+def scenario_reaction_remove(env):
+    def make(i):
+        return main.on_raw_reaction_remove(_reaction_payload(env, env.random_guild(), 'REACTION_REMOVE'))
+    return make
+
+def scenario_ticket_open(env):
+    view = env.bot.ticket_view
+    button = view.children[0]
+    def make(i):
+        guild = env.random_guild()
+        _, member_data = env.new_member(guild)
+        interaction = env.component_interaction(guild, guild.general_id, member_data, 'create_ticket_button')
+        return main.TicketView.create_ticket(view, interaction, button)
+    return make
+
+async def _open_tickets(env):
+    """ticket_close senaryosu için açık ticket listesi: (sunucu, kanal ID, sahibinin üye verisi)."""
+    rows = await main.db.fetchall("SELECT guild_id, channel_id, user_id FROM active_tickets")
+    guilds = {guild.id: guild for guild in env.guilds}
+    tickets = []
+    for guild_id, channel_id, user_id in rows:
+        if env.state.get_channel(channel_id) is not None:
+            owner = member_payload(user_payload(user_id, 'ticket-sahibi'))
+            tickets.append((guilds[guild_id], channel_id, owner))
+    return tickets
+
+def scenario_ticket_close(env, tickets):
+    view = env.bot.ticket_close_view
+    button = view.children[0]
+    def make(i):
+        guild, channel_id, owner = tickets[i]
+        interaction = env.component_interaction(guild, channel_id, owner, 'close_ticket_button')
+        return main.TicketCloseView.close_ticket(view, interaction, button)
+    return make
+
+# --- Ölçüm ---
+
+class BackgroundTaskTracker:
+    """
+    Olay işleyicileri işi arka plan görevlerine bırakabilir (baskın kilidi, spam cezası, özet mesajları); bu görevlerdeki
+    hatalar işleyiciye geri dönmez. Senaryo sırasında oluşturulan görevler kaydedilir ve yakalanmamış hataları o
+    senaryonun hata sayısına eklenir. Olay döngüsüne bildirilen diğer hatalar (callback'ler) da sayılır.
+    """
+    def __init__(self, loop):
+        self.loop = loop
+        self.scenario = None
+        self.tasks = collections.defaultdict(list)  # senaryo -> görevler
+        self.loop_errors = collections.Counter()     # senaryo -> olay döngüsü hata bildirimi sayısı
+
+    def install(self):
+        self.loop.set_task_factory(self._create_task)
+        self.loop.set_exception_handler(self._handle_exception)
+
+    def _create_task(self, loop, coro, **kwargs):
+        task = asyncio.Task(coro, loop=loop, **kwargs)
+        if self.scenario is not None:
+            self.tasks[self.scenario].append(task)
+        return task
+
+    def _handle_exception(self, loop, context):
+        if self.scenario is not None:
+            self.loop_errors[self.scenario] += 1
+        loop.default_exception_handler(context)
+
+    async def settle(self, timeout):
+        """Bitmemiş görevlere (ör. kapanışta iptal edilen kilitler) sonlanmaları için süre tanır."""
+        pending = [task for tasks in self.tasks.values() for task in tasks if not task.done()]
+        if pending:
+            await asyncio.wait(pending, timeout=timeout)
+
+    def errors(self, name):
+        failed = [task.exception() for task in self.tasks.get(name, ())
+                  if task.done() and not task.cancelled() and task.exception() is not None]
+        for error in failed[:3]:
+            frame = traceback.extract_tb(error.__traceback__)[-1]
+            print(f"  [{name}] arka plan görevinde hata: {type(error).__name__}: {error} ({os.path.basename(frame.filename)}:{frame.lineno})")
+        return len(failed) + self.loop_errors[name]
+
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(q * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+async def run_scenario(name, make_event, count, concurrency, measure_memory):
+    latencies = []
+    errors = 0
+    next_index = iter(range(count))
+
+    async def worker():
+        nonlocal errors
+        for i in next_index:
+            started = time.perf_counter()
+            try:
+                await make_event(i)
+            except Exception as e:
+                errors += 1
+                if errors <= 3:
+                    print(f"  [{name}] hata: {type(e).__name__}: {e}")
+            latencies.append(time.perf_counter() - started)
+
+    if measure_memory:
+        tracemalloc.start()
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    peak = 0
+    if measure_memory:
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+    latencies.sort()
+    return {
+        'name': name,
+        'events': count,
+        'errors': errors,
+        'rate': count / elapsed if elapsed else 0.0,
+        'p50': percentile(latencies, 0.50) * 1000,
+        'p99': percentile(latencies, 0.99) * 1000,
+        'mean': statistics.fmean(latencies) * 1000 if latencies else 0.0,
+        'peak_mb': peak / (1024 * 1024),
+    }
+
+def print_report(results, args):
+    print()
+    print(f"Sunucu: {args.guilds}, eşzamanlılık: {args.concurrency}, HTTP gecikmesi: {args.http_latency} ms"
+          + ("" if args.memory else " (bellek ölçümü kapalı)"))
+    header = f"{'Senaryo':<16}{'Olay':>8}{'Hata':>7}{'Olay/sn':>11}{'p50 ms':>10}{'p99 ms':>10}{'Ort. ms':>10}{'Bellek MB':>11}"
+    print(header)
+    print("-" * len(header))
+    for r in results:
+        print(f"{r['name']:<16}{r['events']:>8}{r['errors']:>7}{r['rate']:>11.1f}{r['p50']:>10.2f}{r['p99']:>10.2f}{r['mean']:>10.2f}"
+              f"{(format(r['peak_mb'], '.2f') if args.memory else '-'):>11}")
+
+async def run(args):
+    random.seed(args.seed)
+    tracker = BackgroundTaskTracker(asyncio.get_running_loop())
+    tracker.install()
+    env = BenchmarkEnvironment(args)
+    await env.start()
+    results = []
+    try:
+        factories = {
+            'message': scenario_message,
+            'spam': scenario_spam,
+            'member_join': scenario_member_join,
+            'raid': scenario_member_join, # Aynı katılımlar, baskın koruması açıkken
+            'member_remove': scenario_member_remove,
+            'reaction_add': scenario_reaction_add,
+            'reaction_remove': scenario_reaction_remove,
+            'ticket_open': scenario_ticket_open,
+        }
+        for name in args.scenarios:
+            if name == 'ticket_close':
+                tickets = await _open_tickets(env)
+                if not tickets:
+                    print("  [ticket_close] açık ticket yok, atlandı (önce ticket_open çalıştırılmalı).")
+                    continue
+                make_event, count = scenario_ticket_close(env, tickets), len(tickets)
+            else:
+                if name == 'raid':
+                    await env.enable_raid_protection(args.raid_action)
+                make_event, count = factories[name](env), args.events
+            tracker.scenario = name
+            results.append(await run_scenario(name, make_event, count, args.concurrency, args.memory))
+    finally:
+        await env.stop()
+        tracker.scenario = None
+        await tracker.settle(timeout=5.0)
+
+    for result in results:
+        result['errors'] += tracker.errors(result['name'])
+
+    print_report(results, args)
+    if env.api.unknown_routes:
+        print(f"\nTaklit edilmeyen HTTP rotaları (None döndü): {dict(env.api.unknown_routes)}")
+    if args.verbose:
+        print(f"HTTP istekleri: {dict(env.api.requests)}")
+        print(f"Spam koruması: {dict(main.anti_spam.actions)}, izlenen kullanıcı: {main.anti_spam.tracked_users}")
+    return results
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Embedium olay işleyicileri için çevrimdışı benchmark.")
+    parser.add_argument('--guilds', type=int, default=20, help="Oluşturulacak sahte sunucu sayısı")
+    parser.add_argument('--events', type=int, default=1000, help="Her senaryoda işlenecek olay sayısı")
+    parser.add_argument('--concurrency', type=int, default=10, help="Aynı anda işlenen olay sayısı")
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS), help=f"Virgülle ayrılmış senaryolar: {','.join(SCENARIOS)}")
+    parser.add_argument('--commands', default='ping,zar,sunucu_bilgi', help="message senaryosunda kullanılacak komutlar")
+    parser.add_argument('--command-ratio', type=float, default=0.2, help="message senaryosunda komut içeren mesaj oranı")
+    parser.add_argument('--spam-users', type=int, default=20, help="spam senaryosunda sunucu başına mesaj gönderen kullanıcı sayısı")
+    parser.add_argument('--raid-action', default='kick', choices=['yok', 'kick', 'karantina'], help="raid senaryosunda kilit modundaki işlem")
+    parser.add_argument('--ticket-messages', type=int, default=50, help="Kapatılan her ticket kanalındaki mesaj sayısı")
+    parser.add_argument('--http-latency', type=float, default=0.0, help="Her sahte HTTP isteğine eklenecek gecikme (ms)")
+    parser.add_argument('--no-memory', dest='memory', action='store_false', help="tracemalloc ile bellek ölçümünü kapat (daha hızlı)")
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--verbose', action='store_true', help="HTTP istek sayılarını da yazdır")
+    args = parser.parse_args(argv)
+    args.scenarios = [name.strip() for name in args.scenarios.split(',') if name.strip()]
+    unknown = [name for name in args.scenarios if name not in SCENARIOS]
+    if unknown:
+        parser.error(f"Bilinmeyen senaryo: {', '.join(unknown)}")
+    return args
+
+if __name__ == '__main__':
+    logging.getLogger('discord').setLevel(logging.WARNING)
+    results = asyncio.run(run(parse_args()))
+    sys.exit(1 if any(result['errors'] for result in results) else 0)
@@ -1,135 +1,1553 @@
 import discord
+from discord import app_commands
 import os
 import random
 from dotenv import load_dotenv
 from discord.ext import commands
 import aiosqlite
+import sqlite3
+from typing import Optional
 from datetime import datetime, timezone, timedelta
 import asyncio
 import io
+import contextlib
+import re
+import functools
+import collections
+import gzip
+import tempfile
+import zlib
+import time
+import sys
+import math
+import hmac
+import hashlib
+import base64
+import secrets
+import struct
+import json
+import copy
+import queue
+import atexit
+import logging
+import logging.handlers
 
 # .env dosyasındaki ortam değişkenlerini yükle
 load_dotenv()
 
+# --- Loglama ---
+# print() çağrıları stdout yavaşken olay döngüsünü bloklayabiliyordu. Log kayıtları artık sadece bir kuyruğa eklenir
+# (QueueHandler); konsola ve dosyaya yazma işini ayrı bir thread (QueueListener) yapar. Kuyruk dolarsa kayıt beklemeden düşürülür.
+# Kayıtlara extra={...} ile verilen alanlar (guild, user, command, latency_ms vb.) konsolda anahtar=değer, dosyada JSON olarak yazılır.
+LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO').upper()
+LOG_FILE = os.getenv('LOG_FILE', 'embedium.log') # Boş bırakılırsa dosyaya yazılmaz
+LOG_MAX_BYTES = 10 * 1024 * 1024 # Dosya bu boyuta ulaşınca döndürülür
+LOG_BACKUP_COUNT = 5
+LOG_QUEUE_SIZE = 10_000
+# Yüksek hacimli loggerlar için örnekleme oranı ("logger=oran,..."). Sadece INFO ve altı örneklenir, uyarı ve hatalar hep yazılır.
+LOG_SAMPLE_RATES = os.getenv('LOG_SAMPLE_RATES', 'embedium.member=0.1,embedium.reaction_role=0.1,embedium.autorole=0.1')
+
+# LogRecord'un kendi alanları; bunların dışında kalan her öznitelik extra ile gelmiş yapılandırılmış alandır
+_STANDARD_RECORD_FIELDS = set(logging.LogRecord('', 0, '', 0, '', (), None).__dict__) | {'message', 'asctime'}
+
+def _record_fields(record):
+    return {key: value for key, value in record.__dict__.items() if key not in _STANDARD_RECORD_FIELDS}
+
+class ConsoleFormatter(logging.Formatter):
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)-8s [%(name)s] %(message)s", datefmt="%H:%M:%S")
+
+    def formatMessage(self, record):
+        line = super().formatMessage(record)
+        fields = _record_fields(record)
+        if fields:
+            line += "  " + " ".join(f"{key}={value}" for key, value in fields.items())
+        return line # Varsa hata izi bu satırın altına eklenir
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            'time': datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        entry.update(_record_fields(record))
+        if record.exc_text:
+            entry['exception'] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+class SamplingFilter(logging.Filter):
+    """INFO ve altındaki kayıtları logger adına göre (en uzun önek eşleşmesi) verilen oranda geçirir."""
+    def __init__(self, rates):
+        super().__init__()
+        self.rates = rates
+        self._resolved = {}
+
+    def _rate_for(self, name):
+        rate = self._resolved.get(name)
+        if rate is None:
+            rate = 1.0
+            parts = name.split('.')
+            for i in range(len(parts), 0, -1):
+                prefix = '.'.join(parts[:i])
+                if prefix in self.rates:
+                    rate = self.rates[prefix]
+                    break
+            self._resolved[name] = rate
+        return rate
+
+    def filter(self, record):
+        if record.levelno > logging.INFO:
+            return True
+        rate = self._rate_for(record.name)
+        return rate >= 1.0 or random.random() < rate
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """Kuyruk doluysa kaydı bekletmek yerine düşürür; olay döngüsü log yazımını hiçbir zaman beklemez."""
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        # Mesaj ve hata izi burada metne çevrilir (argümanlar thread'ler arasında taşınmasın), yapılandırılmış alanlar korunur
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+def parse_sample_rates(text):
+    rates = {}
+    for item in text.split(','):
+        if '=' in item:
+            name, rate = item.split('=', 1)
+            rates[name.strip()] = float(rate)
+    return rates
+
+def worker_log_file(path, cluster_id):
+    """
+    Küme modunda başlatıcı ve her işçi ayrı bir süreçtir; RotatingFileHandler döndürmeyi süreçler arasında eşgüdümlemez
+    (biri dosyayı yeniden adlandırırken diğerleri eski dosyaya yazmaya devam eder). Bu yüzden her işçi kendi dosyasına
+    yazar: embedium.log -> embedium.2.log. Başlatıcı ve tek süreçli bot asıl dosya adını kullanır.
+    """
+    if not path or cluster_id is None:
+        return path
+    root, extension = os.path.splitext(path)
+    return f"{root}.{cluster_id}{extension}"
+
+def setup_logging():
+    log_queue = queue.Queue(LOG_QUEUE_SIZE)
+    queue_handler = DroppingQueueHandler(log_queue)
+    queue_handler.addFilter(SamplingFilter(parse_sample_rates(LOG_SAMPLE_RATES)))
+
+    console_handler = logging.StreamHandler(sys.stdout)
+    console_handler.setFormatter(ConsoleFormatter())
+    output_handlers = [console_handler]
+    if LOG_FILE:
+        log_file = worker_log_file(LOG_FILE, os.getenv('EMBEDIUM_CLUSTER_ID'))
+        file_handler = logging.handlers.RotatingFileHandler(log_file, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUP_COUNT, encoding='utf-8')
+        file_handler.setFormatter(JsonFormatter())
+        output_handlers.append(file_handler)
+
+    listener = logging.handlers.QueueListener(log_queue, *output_handlers, respect_handler_level=True)
+    root = logging.getLogger()
+    root.addHandler(queue_handler)
+    root.setLevel(logging.INFO) # discord.py kayıtları da aynı kuyruktan geçer
+    logging.getLogger('embedium').setLevel(LOG_LEVEL)
+    listener.start()
+    atexit.register(listener.stop) # Kapanırken kuyrukta kalan kayıtlar da yazılsın
+    return queue_handler
+
+log_queue_handler = setup_logging()
+
+logger = logging.getLogger('embedium')
+db_logger = logging.getLogger('embedium.db')
+cluster_logger = logging.getLogger('embedium.cluster')
+command_logger = logging.getLogger('embedium.command')          # Her komut çağrısı (after_invoke)
+moderation_logger = logging.getLogger('embedium.moderation')    # Moderasyon işlemleri ve ayar değişiklikleri
+ticket_logger = logging.getLogger('embedium.ticket')
+autorole_logger = logging.getLogger('embedium.autorole')
+member_logger = logging.getLogger('embedium.member')            # Hoş geldin / ayrılık
+reaction_role_logger = logging.getLogger('embedium.reaction_role')
+
+def ctx_fields(ctx, **fields):
+    """Komut bağlamındaki sunucu, kullanıcı ve komut bilgisini log alanlarına çevirir."""
+    return {
+        'guild': ctx.guild.id if ctx.guild else None,
+        'user': ctx.author.id,
+        'command': ctx.command.qualified_name if ctx.command else None,
+        **fields,
+    }
+
 # Discord bot token'ını .env dosyasından al
 TOKEN = os.getenv('DISCORD_TOKEN')
 if TOKEN is None:
-    print("HATA: DISCORD_TOKEN ortam değişkeni bulunamadı. .env dosyasını kontrol edin.")
+    logger.critical("DISCORD_TOKEN ortam değişkeni bulunamadı. .env dosyasını kontrol edin.")
     exit()
 
 # Bot sahibinin Discord kullanıcı ID'si
 OWNER_ID = 1239252682515152917  # <--- BURAYI KENDİ DISCORD KULLANICI ID'NİZLE DEĞİŞTİRİN!
 
+# Hafif gateway modu (.env içinde LEAN_GATEWAY=1): presence güncellemeleri alınmaz, üyeler önbelleğe alınmaz ve
+# açılışta sunucuların üye listesi indirilmez. Büyük sunucularda bellek ve gateway trafiğinin çoğu bunlardan gelir.
+# Bu modda üyeler gerektiğinde API'den çekilir (bkz. MemberLookup), kullanıcı_bilgi'de çevrimiçi durumu gösterilmez.
+LEAN_GATEWAY = os.getenv('LEAN_GATEWAY', '0').lower() in ('1', 'true', 'evet')
+
+# Komut modu (.env içinde SLASH_ONLY=1): tüm komutlar hem `e!` öneki hem slash (/) komutu olarak tanımlıdır.
+# Bu modda prefix yolu ve ayrıcalıklı message_content intent'i kapatılır; mesajlar komut aranmak için ayrıştırılmaz
+# ve Discord mesaj içeriklerini göndermez. Ticket transkriptlerinde üye mesajlarının metni bu yüzden yer almaz.
+SLASH_ONLY = os.getenv('SLASH_ONLY', '0').lower() in ('1', 'true', 'evet')
+COMMAND_PREFIX = 'e!'
+USAGE_PREFIX = '/' if SLASH_ONLY else COMMAND_PREFIX # Kullanıcıya gösterilen metinlerdeki komut öneki
+
+def usage_text(text):
+    """Yardım ve hata metinlerindeki `e!` öneklerini kullanılan komut moduna göre yazar."""
+    return text.replace(f"`{COMMAND_PREFIX}", f"`{USAGE_PREFIX}") if SLASH_ONLY else text
+
 # Intents (ayrıcalıklı yetkiler) ayarları
 intents = discord.Intents.default()
-intents.message_content = True  # Mesaj içeriklerini okumak için
-intents.members = True          # on_member_join, on_member_remove ve kullanıcı bilgisi için gerekli
-intents.presences = True        # Botun durumunu ayarlamak için gerekli
+intents.message_content = not SLASH_ONLY  # Prefix komutları için mesaj içeriklerini okumak gerekir
+intents.members = True          # on_member_join, on_raw_member_remove ve otorol için gerekli
+intents.presences = not LEAN_GATEWAY # Sadece kullanıcı_bilgi'deki "Durum" alanı için; botun kendi durumunu ayarlamak bu yetkiyi gerektirmez
+
+# Sharding ve küme (cluster) ayarları (.env):
+#   SHARDED=1        -> tek işlemde AutoShardedBot kullanılır (shard sayısı Discord'dan alınır)
+#   SHARD_COUNT=n    -> toplam shard sayısı (boşsa Discord'un önerdiği sayı)
+#   CLUSTER_COUNT=n  -> n > 1 ise main.py başlatıcı olarak çalışır ve shard'ları n işçi işleme dağıtır
+SHARD_COUNT = int(os.getenv('SHARD_COUNT')) if os.getenv('SHARD_COUNT') else None
+CLUSTER_COUNT = max(1, int(os.getenv('CLUSTER_COUNT', '1')))
+# Aşağıdakiler başlatıcının işçi işlemlere verdiği değerlerdir, elle ayarlanmaz
+CLUSTER_ID = int(os.environ['EMBEDIUM_CLUSTER_ID']) if os.getenv('EMBEDIUM_CLUSTER_ID') else None
+CLUSTER_SHARD_IDS = [int(i) for i in os.environ['EMBEDIUM_SHARD_IDS'].split(',')] if CLUSTER_ID is not None else None
+DB_WRITER_ADDRESS = os.getenv('EMBEDIUM_DB_WRITER') # İşçilerin yazma sorgularını gönderdiği başlatıcı adresi (host:port)
+DB_WRITER_SECRET = os.getenv('EMBEDIUM_DB_SECRET')
+
+IS_CLUSTER_LAUNCHER = CLUSTER_COUNT > 1 and CLUSTER_ID is None
+SHARDED = (CLUSTER_ID is not None or IS_CLUSTER_LAUNCHER or SHARD_COUNT is not None
+           or os.getenv('SHARDED', '0').lower() in ('1', 'true', 'evet'))
+
+if LEAN_GATEWAY:
+    member_cache_flags = discord.MemberCacheFlags.none() # Sadece botun kendisi önbellekte tutulur (guild.me)
+else:
+    member_cache_flags = discord.MemberCacheFlags.from_intents(intents)
+
+# --- Ölçümler (Metrics) ---
+# Her komut, olay ve veritabanı sorgusu için süre histogramı, hata sayısı ve son dakikadaki verim tutulur.
+# Sonuçlar METRICS_HOST:METRICS_PORT/metrics adresinde Prometheus biçiminde ve e!istatistik komutunda gösterilir.
+METRICS_HOST = os.getenv('METRICS_HOST', '127.0.0.1')
+METRICS_PORT = int(os.getenv('METRICS_PORT', '9464')) # 0 -> uç nokta kapalı. Küme modunda her işçi METRICS_PORT + küme no kullanır
+METRICS_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0) # saniye
+METRICS_RATE_WINDOW = 60 # Verim hesabında kullanılan pencere (saniye)
+
+class Histogram:
+    __slots__ = ('counts', 'total', 'count', 'errors')
+
+    def __init__(self):
+        self.counts = [0] * (len(METRICS_BUCKETS) + 1) # Son kova +Inf
+        self.total = 0.0
+        self.count = 0
+        self.errors = 0
+
+    def observe(self, seconds, error=False):
+        index = 0
+        while index < len(METRICS_BUCKETS) and seconds > METRICS_BUCKETS[index]:
+            index += 1
+        self.counts[index] += 1
+        self.total += seconds
+        self.count += 1
+        if error:
+            self.errors += 1
+
+    def quantile(self, q):
+        """Kova sınırlarına göre yaklaşık yüzdelik (üst sınır) döner."""
+        if not self.count:
+            return 0.0
+        target = q * self.count
+        cumulative = 0
+        for bound, count in zip(METRICS_BUCKETS, self.counts):
+            cumulative += count
+            if cumulative >= target:
+                return bound
+        return float('inf')
+
+class Metrics:
+    """Süre ölçümlerinin tutulduğu kayıt. Anahtar (tür, ad) ikilisidir; tür 'command', 'event' veya 'db' olur."""
+    def __init__(self):
+        self.histograms = {}
+        self._rate_buckets = collections.defaultdict(lambda: [0] * METRICS_RATE_WINDOW) # tür -> saniye başına sayaç
+        self._rate_seconds = collections.defaultdict(lambda: [0] * METRICS_RATE_WINDOW) # kovanın ait olduğu saniye
+
+    def observe(self, kind, name, seconds, error=False):
+        histogram = self.histograms.get((kind, name))
+        if histogram is None:
+            histogram = self.histograms[(kind, name)] = Histogram()
+        histogram.observe(seconds, error)
+
+        now = int(time.monotonic())
+        slot = now % METRICS_RATE_WINDOW
+        seconds_slots = self._rate_seconds[kind]
+        if seconds_slots[slot] != now: # Kova bir önceki tura ait, sıfırla
+            seconds_slots[slot] = now
+            self._rate_buckets[kind][slot] = 0
+        self._rate_buckets[kind][slot] += 1
+
+    @contextlib.contextmanager
+    def measure(self, kind, name):
+        started = time.perf_counter()
+        error = False
+        try:
+            yield
+        except BaseException:
+            error = True
+            raise
+        finally:
+            self.observe(kind, name, time.perf_counter() - started, error)
+
+    def rate(self, kind):
+        """Son METRICS_RATE_WINDOW saniyedeki saniye başına ortalama işlem sayısı."""
+        now = int(time.monotonic())
+        buckets, seconds_slots = self._rate_buckets[kind], self._rate_seconds[kind]
+        recent = sum(count for count, second in zip(buckets, seconds_slots) if now - second < METRICS_RATE_WINDOW)
+        return recent / METRICS_RATE_WINDOW
+
+    def by_kind(self, kind):
+        return [(name, histogram) for (k, name), histogram in self.histograms.items() if k == kind]
+
+metrics = Metrics()
+
+def timed_event(name):
+    """Olay ve buton işleyicilerinin süresini ve hatalarını ölçen dekoratör."""
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            with metrics.measure('event', name):
+                return await func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+_query_labels = {}
+
+def query_label(sql):
+    # Sorgular parametreli olduğundan farklı SQL metni sayısı sınırlıdır; etiket olarak tek satıra indirilmiş hali kullanılır
+    label = _query_labels.get(sql)
+    if label is None:
+        label = _query_labels[sql] = " ".join(sql.split())[:120]
+    return label
+
+def _prometheus_label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def render_prometheus_metrics():
+    lines = []
+    for kind, description in (('command', 'Komut'), ('event', 'Olay işleyici'), ('db', 'Veritabanı sorgusu')):
+        entries = metrics.by_kind(kind)
+        base = f"embedium_{kind}_duration_seconds"
+        lines.append(f"# HELP {base} {description} süresi")
+        lines.append(f"# TYPE {base} histogram")
+        for name, histogram in entries:
+            label = _prometheus_label(name)
+            cumulative = 0
+            for bound, count in zip(METRICS_BUCKETS, histogram.counts):
+                cumulative += count
+                lines.append(f'{base}_bucket{{name="{label}",le="{bound}"}} {cumulative}')
+            lines.append(f'{base}_bucket{{name="{label}",le="+Inf"}} {histogram.count}')
+            lines.append(f'{base}_sum{{name="{label}"}} {histogram.total}')
+            lines.append(f'{base}_count{{name="{label}"}} {histogram.count}')
+        lines.append(f"# HELP embedium_{kind}_errors_total {description} hata sayısı")
+        lines.append(f"# TYPE embedium_{kind}_errors_total counter")
+        for name, histogram in entries:
+            lines.append(f'embedium_{kind}_errors_total{{name="{_prometheus_label(name)}"}} {histogram.errors}')
+    if bot.is_ready():
+        lines.append("# TYPE embedium_guilds gauge")
+        lines.append(f"embedium_guilds {len(bot.guilds)}")
+        lines.append("# TYPE embedium_gateway_latency_seconds gauge")
+        for shard_id, latency in (bot.latencies if SHARDED else [(0, bot.latency)]):
+            if not (math.isnan(latency) or math.isinf(latency)):
+                lines.append(f'embedium_gateway_latency_seconds{{shard="{shard_id}"}} {latency}')
+    lines.append("# TYPE embedium_autorole_queue_depth gauge")
+    lines.append(f"embedium_autorole_queue_depth {autorole_queue.depth}")
+    lines.append("# TYPE embedium_guild_settings_cache_hits_total counter")
+    lines.append(f"embedium_guild_settings_cache_hits_total {guild_settings_cache.hits}")
+    lines.append("# TYPE embedium_guild_settings_cache_misses_total counter")
+    lines.append(f"embedium_guild_settings_cache_misses_total {guild_settings_cache.misses}")
+    return "\n".join(lines) + "\n"
+
+class MetricsServer:
+    """/metrics isteğine Prometheus metin biçiminde yanıt veren küçük bir HTTP sunucusu (sadece GET)."""
+    def __init__(self, host, port):
+        self.host = host
+        self.port = port
+        self._server = None
+
+    async def start(self):
+        if not self.port:
+            return
+        try:
+            self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        except OSError as e:
+            logger.warning("%s:%s adresi dinlenemedi, ölçüm uç noktası kapalı: %s", self.host, self.port, e)
+            return
+        logger.info("Prometheus ölçümleri http://%s:%s/metrics adresinde.", self.host, self.port)
+
+    async def stop(self):
+        if self._server:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def _handle(self, reader, writer):
+        try:
+            request_line = await asyncio.wait_for(reader.readline(), timeout=5)
+            while (await asyncio.wait_for(reader.readline(), timeout=5)) not in (b"\r\n", b"\n", b""):
+                pass # Başlıklar kullanılmıyor
+            parts = request_line.decode('latin-1').split()
+            if len(parts) >= 2 and parts[0] == 'GET' and parts[1].split('?')[0] == '/metrics':
+                status, body = "200 OK", render_prometheus_metrics().encode('utf-8')
+            else:
+                status, body = "404 Not Found", b"Not Found\n"
+            writer.write(f"HTTP/1.1 {status}\r\nContent-Type: text/plain; version=0.0.4; charset=utf-8\r\n"
+                         f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode('latin-1') + body)
+            await writer.drain()
+        except (asyncio.TimeoutError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+metrics_server = MetricsServer(METRICS_HOST, METRICS_PORT + CLUSTER_ID if METRICS_PORT and CLUSTER_ID is not None else METRICS_PORT)
+
+# --- Veritabanı Katmanı ---
+# Her olayda aiosqlite.connect çağırmak yeni bir thread ve dosya tanıtıcısı açıyordu.
+# Bunun yerine bot açılırken bir kez bağlanan, kapanırken kapatılan paylaşımlı bir katman kullanıyoruz.
+DB_GROUP_COMMIT_DELAY = 0.005     # Yazmaların tek transaction'da toplanması için beklenen süre (saniye)
+DB_GROUP_COMMIT_MAX_BATCH = 256   # Bir transaction'daki en fazla yazma; dolunca süre beklenmeden commit edilir
+
+class Database:
+    """
+    Bot ömrü boyunca açık kalan paylaşımlı veritabanı bağlantıları.
+    Tüm yazmalar tek bir yazıcı bağlantısından (kilit ile sıraya sokularak) geçer,
+    okumalar WAL modu sayesinde ayrı bir okuyucu bağlantısından yazıcıyı beklemeden yapılır.
+    Hazırlanmış sorgular sqlite3'ün ifade önbelleğinde (cached_statements) tutulur.
+    Küme modunda (writer_address verilirse) bu işlem yazıcı bağlantı açmaz; yazmalar başlatıcı işlemdeki
+    tek yazıcıya gönderilir, böylece birden çok işlem aynı dosyaya yazarken "database is locked" hatası alınmaz.
+
+    Yazmalar tek tek commit edilmez (group commit): DB_GROUP_COMMIT_DELAY içinde gelen yazmalar sırayla tek bir
+    transaction'da çalıştırılıp birlikte commit edilir. durable=True (varsayılan) çağıran commit bitene kadar bekler
+    ve sonucu ya da o sorgunun hatasını alır. durable=False ile çağıran beklemez (write-behind); hata loglanır.
+    Bekleyen yazmaların hepsi flush() ile, kapanışta da close() içinde commit edilir.
+    """
+    def __init__(self, path, cached_statements=256, writer_address=None, writer_secret=None):
+        self.path = path
+        self.cached_statements = cached_statements
+        self.writer_address = writer_address
+        self.writer_secret = writer_secret
+        self._writer = None
+        self._reader = None
+        self._remote = None
+        self._write_lock = asyncio.Lock()
+        self._pending = []           # Commit bekleyen yazmalar: (işlem, sql, parametreler, future)
+        self._commit_timer = None
+        self._commit_tasks = set()
+        self._background = set()     # Küme işçisinde beklenmeyen (durable=False) uzak yazmalar
+        self.commits = 0             # Group commit sayısı
+        self.committed_writes = 0    # Bu commit'lerle yazılan sorgu sayısı
+
+    @property
+    def is_connected(self):
+        return self._reader is not None
+
+    @property
+    def has_remote_writer(self):
+        return self.writer_address is not None
+
+    async def connect(self):
+        if self.is_connected:
+            return
+        if self.has_remote_writer:
+            self._remote = DatabaseWriterClient(self.writer_address, self.writer_secret)
+            await self._remote.connect()
+            self._reader = await aiosqlite.connect(self.path, cached_statements=self.cached_statements)
+            await self._reader.execute("PRAGMA busy_timeout=5000")
+            await self._reader.execute("PRAGMA query_only=1")
+            db_logger.info("Veritabanı bağlantısı açıldı: %s (WAL, yazıcı: %s)", self.path, self.writer_address)
+            return
+        self._writer = await aiosqlite.connect(self.path, cached_statements=self.cached_statements)
+        await self._writer.execute("PRAGMA journal_mode=WAL")
+        await self._writer.execute("PRAGMA synchronous=NORMAL") # WAL ile NORMAL güvenli ve çok daha az fsync yapar
+        await self._writer.execute("PRAGMA busy_timeout=5000")
+        self._reader = await aiosqlite.connect(self.path, cached_statements=self.cached_statements)
+        await self._reader.execute("PRAGMA busy_timeout=5000")
+        await self._reader.execute("PRAGMA query_only=1") # Okuyucu bağlantı yanlışlıkla yazma yapmasın
+        db_logger.info("Veritabanı bağlantısı açıldı: %s (WAL)", self.path)
+
+    async def close(self):
+        if not self.is_connected:
+            return
+        await self.flush() # Bekleyen yazmalar kaybolmasın
+        if self._commit_timer is not None:
+            self._commit_timer.cancel()
+            self._commit_timer = None
+        async with self._write_lock:
+            await self._reader.close()
+            self._reader = None
+            if self._remote:
+                await self._remote.close()
+                self._remote = None
+            else:
+                await self._writer.close()
+                self._writer = None
+        db_logger.info("Veritabanı bağlantısı kapatıldı.")
+
+    async def fetchone(self, sql, params=()):
+        with metrics.measure('db', query_label(sql)):
+            async with self._reader.execute(sql, params) as cursor:
+                return await cursor.fetchone()
+
+    async def fetchall(self, sql, params=()):
+        with metrics.measure('db', query_label(sql)):
+            async with self._reader.execute(sql, params) as cursor:
+                return await cursor.fetchall()
+
+    async def execute(self, sql, params=(), durable=True):
+        """Tek bir yazma sorgusu. Etkilenen satır sayısını döner (durable=False ise beklemeden None döner)."""
+        return await self._write('execute', sql, params, durable)
+
+    async def executemany(self, sql, seq_of_params, durable=True):
+        """Aynı yazma sorgusunu her parametre grubu için aynı transaction içinde çalıştırır."""
+        return await self._write('executemany', sql, list(seq_of_params), durable)
+
+    async def insert(self, sql, params=()):
+        """Tek bir INSERT. Eklenen satırın rowid'sini döner; bu yüzden her zaman commit beklenir."""
+        return await self._write('insert', sql, params, True)
+
+    async def _write(self, op, sql, params, durable):
+        if self._remote:
+            # Başlatıcıdaki yazıcı, farklı işçilerden gelen yazmaları kendi group commit'inde birleştirir.
+            # İstek burada eşzamanlı olarak gönderim kuyruğuna girer; böylece yerel yoldaki gibi beklenmeyen
+            # (durable=False) yazmalar da kendilerinden sonra çağrılan yazmalardan önce commit edilir.
+            future = self._remote.submit(op, sql, params)
+            if durable:
+                with metrics.measure('db', query_label(sql)):
+                    return await future
+            future.add_done_callback(functools.partial(self._log_write_behind_error, sql))
+            self._track(self._background, future)
+            return None
+
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((op, sql, params, future))
+        if len(self._pending) % DB_GROUP_COMMIT_MAX_BATCH == 0: # Grup doldu, süreyi beklemeden commit et
+            self._track(self._commit_tasks, asyncio.create_task(self._commit_pending()))
+        elif self._commit_timer is None:
+            self._commit_timer = asyncio.get_running_loop().call_later(DB_GROUP_COMMIT_DELAY, self._on_commit_timer)
+        if durable:
+            return await future
+        future.add_done_callback(functools.partial(self._log_write_behind_error, sql))
+        return None
+
+    @staticmethod
+    def _track(tasks, task):
+        tasks.add(task)
+        task.add_done_callback(tasks.discard)
+
+    @staticmethod
+    def _log_write_behind_error(sql, future):
+        if not future.cancelled() and future.exception() is not None:
+            db_logger.error("Arka planda yazma başarısız: %s (%s)", future.exception(), query_label(sql))
+
+    def _on_commit_timer(self):
+        self._commit_timer = None
+        self._track(self._commit_tasks, asyncio.create_task(self._commit_pending()))
+
+    async def _commit_pending(self):
+        """Kuyruktaki yazmaları sırayla tek transaction'da çalıştırıp commit eder, sonuçları çağıranlara iletir."""
+        async with self._write_lock:
+            batch = self._pending[:DB_GROUP_COMMIT_MAX_BATCH]
+            del self._pending[:len(batch)]
+            if not batch:
+                return
+            results = []
+            try:
+                for op, sql, params, future in batch:
+                    try:
+                        with metrics.measure('db', query_label(sql)):
+                            if op == 'executemany':
+                                cursor = await self._writer.executemany(sql, params)
+                            else:
+                                cursor = await self._writer.execute(sql, params)
+                    except sqlite3.Error as e:
+                        # Kısıt hataları yalnızca o sorguyu geri alır, transaction ve önceki yazmalar sürer.
+                        # Transaction'ın tamamı geri alındıysa (disk dolu vb.) bu grubun hepsi başarısız sayılır.
+                        if self._writer.in_transaction or not results:
+                            results.append((future, None, e))
+                            continue
+                        raise
+                    results.append((future, cursor.lastrowid if op == 'insert' else cursor.rowcount, None))
+                with metrics.measure('db', 'COMMIT'):
+                    await self._writer.commit()
+            except BaseException as e:
+                with contextlib.suppress(Exception):
+                    await self._writer.rollback()
+                for _, _, _, future in batch:
+                    if not future.done():
+                        future.set_exception(e if isinstance(e, Exception) else RuntimeError("Yazma iptal edildi."))
+                if not isinstance(e, Exception):
+                    raise
+                db_logger.error("Group commit başarısız (%d yazma): %s", len(batch), e)
+                return
+            self.commits += 1
+            self.committed_writes += len(batch)
+            for future, result, error in results:
+                if future.done():
+                    continue # Çağıran iptal edilmiş
+                if error is not None:
+                    future.set_exception(error)
+                else:
+                    future.set_result(result)
+
+    async def flush(self):
+        """Kuyruktaki ve arka planda gönderilmekte olan tüm yazmaların commit edilmesini bekler."""
+        while self._pending or self._commit_tasks or self._background:
+            if self._pending:
+                self._track(self._commit_tasks, asyncio.create_task(self._commit_pending()))
+            await asyncio.gather(*self._commit_tasks, *self._background, return_exceptions=True)
+
+    @contextlib.asynccontextmanager
+    async def transaction(self):
+        """Yazıcı bağlantı üzerinde birden fazla sorguyu tek transaction'da çalıştırmak için."""
+        if self._remote:
+            raise RuntimeError("Küme işçisinde transaction açılamaz; execute, executemany veya insert kullanın.")
+        async with self._write_lock:
+            try:
+                yield self._writer
+            except BaseException:
+                await self._writer.rollback()
+                raise
+            else:
+                await self._writer.commit()
+
+# --- Küme Modunda Tek Yazıcı ---
+# Başlatıcı işlem veritabanına yazan tek işlemdir; işçiler yazma sorgularını yerel bir TCP bağlantısı üzerinden
+# ona gönderir. Her çerçeve 4 baytlık uzunluk + JSON verisidir: istek [kimlik, işlem, sql, parametreler], yanıt
+# [kimlik, başarılı mı, sonuç]; hata yanıtında sonuç {type, message} olur. Ağdan gelen veriden hiçbir zaman nesne
+# (pickle) çözülmez. Bağlantının ilk çerçevesi başlatıcının ürettiği gizli anahtardır. İstek ve yanıtlar bir istek
+# kimliği taşır; böylece bir bağlantıda aynı anda birden çok yazma beklenebilir ve başlatıcı bunları diğer
+# işçilerinkilerle aynı commit'e koyar.
+DB_WRITER_OPS = ('execute', 'executemany', 'insert')
+DB_WRITER_RECONNECT_MIN = 0.5  # Bağlantı koptuğunda ilk yeniden deneme beklemesi (saniye)
+DB_WRITER_RECONNECT_MAX = 30.0 # Yeniden deneme beklemesinin üst sınırı (her denemede iki katına çıkar)
+
+def _encode_frame(value):
+    # SQLite'ın BLOB değerleri (bytes) JSON'da {"$bytes": base64} olarak taşınır
+    def default(obj):
+        if isinstance(obj, bytes):
+            return {'$bytes': base64.b64encode(obj).decode('ascii')}
+        raise TypeError(f"Veritabanı yazıcısına gönderilemeyen değer türü: {type(obj).__name__}")
+    return json.dumps(value, default=default, separators=(',', ':')).encode('utf-8')
+
+def _decode_frame(payload):
+    def object_hook(obj):
+        if obj.keys() == {'$bytes'}:
+            return base64.b64decode(obj['$bytes'])
+        return obj
+    return json.loads(payload, object_hook=object_hook)
+
+def _writer_error(error):
+    """Yanıttaki {type, message} hatasını yükseltilecek istisnaya çevirir; sqlite3 hataları aynı sınıfla yükseltilir."""
+    error_class = getattr(sqlite3, str(error.get('type')), None)
+    if not (isinstance(error_class, type) and issubclass(error_class, sqlite3.Error)):
+        error_class = RuntimeError
+    return error_class(error.get('message', ''))
+
+async def _write_frame(writer, payload):
+    writer.write(struct.pack('>I', len(payload)) + payload)
+    await writer.drain()
+
+async def _read_frame(reader):
+    (length,) = struct.unpack('>I', await reader.readexactly(4))
+    return await reader.readexactly(length)
+
+class DatabaseWriterClient:
+    """
+    İşçi tarafı: yazma sorgularını başlatıcıdaki DatabaseWriterServer'a gönderir.
+    İstekler bir gönderim kuyruğundan çağrı sırasıyla yazılır, yanıtları ayrı bir okuyucu görev istek kimliğine göre
+    eşleştirir; bir yazmanın yanıtı beklenirken sonrakiler gönderilmeye devam eder. Bağlantı koparsa yanıtı gelmemiş
+    istekler hata alır (yazıcıda commit edilmiş olabilirler, tekrar gönderilmez), kuyruktakiler ise artan aralıklarla
+    yeniden bağlanıldıktan sonra gönderilir.
+    """
+    def __init__(self, address, secret):
+        self.host, port = address.rsplit(':', 1)
+        self.port = int(port)
+        self.secret = secret
+        self._writer = None
+        self._reader_task = None
+        self._sender_task = None
+        self._outgoing = asyncio.Queue()   # Gönderilmeyi bekleyen (istek kimliği, çerçeve)
+        self._waiting = {}                 # Yanıt bekleyen istekler: istek kimliği -> future
+        self._in_flight = set()            # Şu anki bağlantıda gönderilmiş, yanıtı gelmemiş istek kimlikleri
+        self._next_id = 0
+        self.reconnects = 0
+
+    async def connect(self):
+        await self._open()
+        self._sender_task = asyncio.create_task(self._send_loop())
+
+    async def _open(self):
+        reader, writer = await asyncio.open_connection(self.host, self.port)
+        await _write_frame(writer, self.secret.encode())
+        self._writer = writer
+        self._reader_task = asyncio.create_task(self._read_loop(reader, writer))
+
+    async def _reconnect(self):
+        delay = DB_WRITER_RECONNECT_MIN
+        while True:
+            try:
+                await self._open()
+            except OSError as e:
+                cluster_logger.warning("Veritabanı yazıcısına bağlanılamadı (%s), %.1f saniye sonra tekrar denenecek.", e, delay)
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, DB_WRITER_RECONNECT_MAX)
+            else:
+                self.reconnects += 1
+                cluster_logger.info("Veritabanı yazıcısına yeniden bağlanıldı.")
+                return
+
+    def submit(self, op, sql, params):
+        """
+        İsteği hemen gönderim kuyruğuna ekler ve sonucu için bir future döner. İstekler submit() çağrı sırasıyla
+        gönderilir. Yazıcıda oluşan sqlite hatası future üzerinden aynen yükseltilir.
+        """
+        self._next_id += 1
+        request_id = self._next_id
+        future = asyncio.get_running_loop().create_future()
+        self._waiting[request_id] = future
+        self._outgoing.put_nowait((request_id, _encode_frame([request_id, op, sql, params])))
+        return future
+
+    async def request(self, op, sql, params):
+        return await self.submit(op, sql, params)
+
+    async def _send_loop(self):
+        while True:
+            request_id, frame = await self._outgoing.get()
+            future = self._waiting.get(request_id)
+            if future is None or future.done():
+                # Gönderilmeden iptal edilmiş ya da bağlantı kapanırken sonuçlandırılmış
+                self._waiting.pop(request_id, None)
+                continue
+            if self._writer is None:
+                await self._reconnect()
+            self._in_flight.add(request_id)
+            try:
+                await _write_frame(self._writer, frame)
+            except ConnectionError:
+                self._connection_lost(self._writer) # Çerçevenin ne kadarının gittiği bilinmez, bu istek de hata alır
+
+    async def _read_loop(self, reader, writer):
+        try:
+            while True:
+                request_id, ok, result = _decode_frame(await _read_frame(reader))
+                self._in_flight.discard(request_id)
+                future = self._waiting.pop(request_id, None)
+                if future is None or future.done():
+                    continue
+                if ok:
+                    future.set_result(result)
+                else:
+                    future.set_exception(_writer_error(result))
+        except (asyncio.IncompleteReadError, ConnectionError):
+            self._connection_lost(writer)
+        except (ValueError, TypeError) as e: # Bozuk çerçeve; bağlantı artık güvenilir değil
+            cluster_logger.error("Veritabanı yazıcısından geçersiz yanıt: %s", e)
+            self._connection_lost(writer)
+
+    def _connection_lost(self, writer):
+        if writer is not self._writer:
+            return # Bu bağlantı zaten kapatıldı
+        cluster_logger.warning("Veritabanı yazıcısıyla bağlantı koptu; %d yazmanın sonucu bilinmiyor.", len(self._in_flight))
+        writer.close()
+        self._writer = None
+        if self._reader_task is not asyncio.current_task():
+            self._reader_task.cancel()
+        self._reader_task = None
+        for request_id in self._in_flight:
+            future = self._waiting.pop(request_id, None)
+            if future is not None and not future.done():
+                future.set_exception(ConnectionError("Veritabanı yazıcısıyla bağlantı koptu."))
+        self._in_flight.clear()
+
+    async def close(self):
+        for task in (self._sender_task, self._reader_task):
+            if task is not None:
+                task.cancel()
+        if self._writer is not None:
+            self._writer.close()
+            with contextlib.suppress(Exception):
+                await self._writer.wait_closed()
+            self._writer = None
+        for future in self._waiting.values():
+            if not future.done():
+                future.set_exception(ConnectionError("Veritabanı yazıcısı bağlantısı kapatıldı."))
+        self._waiting.clear()
+
+class DatabaseWriterServer:
+    """
+    Başlatıcı tarafı: işçilerden gelen yazma sorgularını kendi Database örneğinin tek yazıcı bağlantısında çalıştırır.
+    Her istek ayrı bir görevde çalıştırılır, böylece bir bağlantıdaki ve diğer işçilerdeki yazmalar aynı group commit'te
+    birleşir. Görevler oluşturulma sırasıyla başladığından bir işçinin yazmaları commit kuyruğuna gönderildiği sırayla girer.
+    """
+    def __init__(self, database, secret):
+        self.db = database
+        self.secret = secret.encode()
+
+    async def handle(self, reader, writer):
+        tasks = set()
+        send_lock = asyncio.Lock() # Yanıt çerçeveleri birbirine karışmasın
+        try:
+            if not hmac.compare_digest(await _read_frame(reader), self.secret):
+                cluster_logger.warning("Veritabanı yazıcısına geçersiz anahtarla bağlanılmaya çalışıldı.")
+                return
+            while True:
+                try:
+                    request_id, op, sql, params = _decode_frame(await _read_frame(reader))
+                except (ValueError, TypeError) as e:
+                    cluster_logger.error("Veritabanı yazıcısına geçersiz istek geldi, bağlantı kapatılıyor: %s", e)
+                    return
+                task = asyncio.create_task(self._run(writer, send_lock, request_id, op, sql, params))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass # İşçi kapandı
+        finally:
+            if tasks:
+                await asyncio.gather(*tasks, return_exceptions=True) # Başlamış yazmalar yine de commit edilsin
+            writer.close()
+
+    async def _run(self, writer, send_lock, request_id, op, sql, params):
+        try:
+            if op not in DB_WRITER_OPS:
+                raise ValueError(f"Bilinmeyen veritabanı işlemi: {op}")
+            response = [request_id, True, await getattr(self.db, op)(sql, params)]
+        except Exception as e:
+            response = [request_id, False, {'type': type(e).__name__, 'message': str(e)}]
+        async with send_lock:
+            with contextlib.suppress(ConnectionError):
+                await _write_frame(writer, _encode_frame(response))
+
+# Bütün sorgu noktalarının kullandığı tek veritabanı örneği
+db = Database('bot_settings.db', writer_address=DB_WRITER_ADDRESS, writer_secret=DB_WRITER_SECRET)
+
+# --- Sunucu Ayarları Önbelleği ---
+# Bellekte tutulacak en fazla sunucu ayarı sayısı. Dolunca en uzun süredir kullanılmayan sunucu atılır.
+GUILD_SETTINGS_CACHE_SIZE = 1000
+
+# Baskın koruması varsayılanları (sunucu raid_settings'te bir değer ayarlamadıysa kullanılır)
+RAID_DEFAULT_THRESHOLD = 10        # Pencere içinde baskın sayılan katılım ağırlığı (yeni hesaplar 2 sayılır)
+RAID_DEFAULT_WINDOW = 10           # Katılımların sayıldığı kayan pencere (saniye)
+RAID_DEFAULT_ACCOUNT_AGE = 7       # Bu kadar günden yeni hesaplar şüpheli sayılır
+RAID_DEFAULT_LOCKDOWN = 10         # Kilit modunun süresi (dakika); baskın sürdükçe uzar
+RAID_ACTIONS = ('yok', 'kick', 'karantina')
+
+class GuildSettings:
+    """Bir sunucunun guild_settings, autoroles, ticket_settings, raid_settings ve spam_settings satırlarının birleşimi."""
+    __slots__ = ('welcome_channel_id', 'autorole_id', 'ticket_category_id', 'ticket_log_channel_id', 'ticket_moderator_role_id',
+                 'raid_enabled', 'raid_threshold', 'raid_window', 'raid_account_age', 'raid_action', 'raid_quarantine_role_id', 'raid_lockdown',
+                 'spam_punish_duplicates')
+
+    def __init__(self, welcome_channel_id=None, autorole_id=None, ticket_category_id=None, ticket_log_channel_id=None, ticket_moderator_role_id=None,
+                 raid_enabled=None, raid_threshold=None, raid_window=None, raid_account_age=None, raid_action=None, raid_quarantine_role_id=None, raid_lockdown=None,
+                 spam_punish_duplicates=None):
+        self.welcome_channel_id = welcome_channel_id
+        self.autorole_id = autorole_id
+        self.ticket_category_id = ticket_category_id
+        self.ticket_log_channel_id = ticket_log_channel_id
+        self.ticket_moderator_role_id = ticket_moderator_role_id
+        self.raid_enabled = raid_enabled is None or bool(raid_enabled) # Ayarlanmamışsa açık
+        self.raid_threshold = raid_threshold or RAID_DEFAULT_THRESHOLD
+        self.raid_window = raid_window or RAID_DEFAULT_WINDOW
+        self.raid_account_age = RAID_DEFAULT_ACCOUNT_AGE if raid_account_age is None else raid_account_age
+        self.raid_action = raid_action or 'yok'
+        self.raid_quarantine_role_id = raid_quarantine_role_id
+        self.raid_lockdown = raid_lockdown or RAID_DEFAULT_LOCKDOWN
+        self.spam_punish_duplicates = bool(spam_punish_duplicates) # Ayarlanmamışsa tekrarlanan mesajlar için sadece uyarı
+
+    @property
+    def has_ticket_settings(self):
+        return self.ticket_category_id is not None
+
+# Bir sunucunun tüm ayarlarını tek sorguda yükler. Sütun sırası GuildSettings.__init__ parametreleriyle aynıdır.
+# HOT_QUERIES de bu sabiti kullanır; plan kontrolü botun gerçekten çalıştırdığı sorguyu denetler.
+GUILD_SETTINGS_QUERY = '''
+    SELECT g.welcome_channel_id, a.role_id, t.ticket_category_id, t.ticket_log_channel_id, t.ticket_moderator_role_id,
+           r.enabled, r.join_threshold, r.window_seconds, r.min_account_age_days, r.action, r.quarantine_role_id, r.lockdown_minutes,
+           s.punish_duplicates
+    FROM (SELECT ? AS guild_id) AS k
+    LEFT JOIN guild_settings AS g ON g.guild_id = k.guild_id
+    LEFT JOIN autoroles AS a ON a.guild_id = k.guild_id
+    LEFT JOIN ticket_settings AS t ON t.guild_id = k.guild_id
+    LEFT JOIN raid_settings AS r ON r.guild_id = k.guild_id
+    LEFT JOIN spam_settings AS s ON s.guild_id = k.guild_id
+'''
+
+class GuildSettingsCache:
+    """
+    Sunucu ayarlarını bellekte tutan LRU önbellek.
+    Bir sunucu ilk istendiğinde tek sorguyla yüklenir, sonraki okumalar SQLite'a gitmez.
+    Ayar komutları önce veritabanına yazar, sonra update() ile önbelleği günceller (write-through).
+    """
+    def __init__(self, database, max_size=GUILD_SETTINGS_CACHE_SIZE):
+        self.db = database
+        self.max_size = max_size
+        self._entries = collections.OrderedDict()
+        self._epoch = 0 # Her yazmada artar; yazmayla yarışan eski bir yükleme önbelleğe konmaz
+        self.hits = 0
+        self.misses = 0
+
+    async def get(self, guild_id):
+        entry = self._entries.get(guild_id)
+        if entry is not None:
+            self._entries.move_to_end(guild_id)
+            self.hits += 1
+            return entry
+
+        self.misses += 1
+        epoch = self._epoch
+        row = await self.db.fetchone(GUILD_SETTINGS_QUERY, (guild_id,))
+        entry = GuildSettings(*row)
+        if epoch == self._epoch:
+            self._store(guild_id, entry)
+        return entry
+
+    def update(self, guild_id, **fields):
+        """Veritabanına yazıldıktan sonra çağrılır. Sunucu önbellekte değilse bir sonraki get() zaten güncel veriyi yükler."""
+        self._epoch += 1
+        entry = self._entries.get(guild_id)
+        if entry is None:
+            return
+        for name, value in fields.items():
+            setattr(entry, name, value)
+
+    def invalidate(self, guild_id):
+        self._epoch += 1
+        self._entries.pop(guild_id, None)
+
+    def _store(self, guild_id, entry):
+        self._entries[guild_id] = entry
+        self._entries.move_to_end(guild_id)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False) # En uzun süredir kullanılmayan sunucuyu at
+
+    def __len__(self):
+        return len(self._entries)
+
+guild_settings_cache = GuildSettingsCache(db)
+
+# --- Üye Arama Önbelleği ---
+MEMBER_LOOKUP_CACHE_SIZE = 2000   # Hafif modda bellekte tutulacak en fazla üye sayısı
+MEMBER_LOOKUP_TTL = 120.0         # Çekilen bir üyenin (rolleri değişmiş olabilir) en fazla kaç saniye kullanılacağı
+MEMBER_CACHE_BYTES_ESTIMATE = 700 # discord.py önbelleğindeki bir üyenin (Member + User) yaklaşık boyutu, tracemalloc ile ölçüldü
+
+class MemberLookup:
+    """
+    Üyeleri önce discord.py'nin kendi önbelleğinden, orada yoksa küçük bir LRU önbellekten,
+    o da yoksa fetch_member ile API'den alır. Normal modda ilk adımda bulunur; hafif modda önbellek
+    kapalı olduğundan bu sınıf tam üye listesinin yerini tutar.
+    """
+    def __init__(self, max_size=MEMBER_LOOKUP_CACHE_SIZE, ttl=MEMBER_LOOKUP_TTL):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = collections.OrderedDict() # (guild_id, user_id) -> (member, çekildiği zaman)
+        self.hits = 0
+        self.misses = 0
+
+    async def get(self, guild, user_id):
+        """Üyeyi döner; üye sunucuda değilse veya çekilemezse None."""
+        member = guild.get_member(user_id)
+        if member is not None:
+            return member
+
+        key = (guild.id, user_id)
+        entry = self._entries.get(key)
+        if entry is not None and time.monotonic() - entry[1] < self.ttl:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+        self.misses += 1
+        try:
+            member = await guild.fetch_member(user_id)
+        except discord.HTTPException:
+            self._entries.pop(key, None)
+            return None
+        self.put(member)
+        return member
+
+    def put(self, member):
+        key = (member.guild.id, member.id)
+        self._entries[key] = (member, time.monotonic())
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False) # En uzun süredir kullanılmayan üyeyi at
+
+    def invalidate(self, guild_id, user_id):
+        self._entries.pop((guild_id, user_id), None)
+
+    def __len__(self):
+        return len(self._entries)
+
+member_lookup = MemberLookup()
+
+class CachedMemberConverter(commands.MemberConverter, app_commands.Transformer):
+    """
+    discord.Member dönüştürücüsü; ID ile verilen ve önbellekte olmayan üyeleri member_lookup üzerinden bulur.
+    Slash komutlarında üye seçeneği olarak görünür; Discord üyeyi çözümlenmiş gönderdiği için arama yapılmaz.
+    """
+    async def query_member_by_id(self, bot, guild, user_id):
+        return await member_lookup.get(guild, user_id)
+
+    @property
+    def type(self):
+        return discord.AppCommandOptionType.user
+
+    async def transform(self, interaction, value):
+        if not isinstance(value, discord.Member): # Seçilen kullanıcı sunucuda değil
+            raise commands.MemberNotFound(str(value))
+        return value
+
+class SnowflakeConverter(commands.Converter, app_commands.Transformer):
+    """
+    Mesaj ve kullanıcı ID'leri için int dönüştürücüsü. Slash komutlarının tamsayı seçenekleri 2^53 ile sınırlı
+    olduğundan ve ID'ler bu sınırı aştığından, slash komutlarında ID metin olarak alınıp burada çevrilir.
+    """
+    async def convert(self, ctx, argument):
+        try:
+            return int(argument)
+        except ValueError:
+            raise commands.BadArgument(f"`{argument}` geçerli bir ID değil.") from None
+
+    async def transform(self, interaction, value):
+        return await self.convert(interaction, value)
+
+# --- Slash Komutları ---
+SLASH_DESCRIPTION_LIMIT = 100 # Discord'un slash komut açıklaması sınırı
+
+def slash_description(command):
+    """Yardım metninin kullanım kısmı çıkarılmış hali; slash komut listesinde kullanım zaten seçeneklerden görünür."""
+    text = (command.help or "Açıklama yok.").split(" Kullanım:")[0]
+    return text if len(text) <= SLASH_DESCRIPTION_LIMIT else text[:SLASH_DESCRIPTION_LIMIT - 1] + "…"
+
+async def sync_app_commands(bot_instance):
+    """
+    Slash komutlarının tanımı son gönderimden beri değiştiyse Discord'a gönderir ve True döner.
+    Toplu komut güncellemesi sıkı bir hız sınırına tabi olduğundan her açılışta değil, sadece değişiklikte yapılır.
+    """
+    payload = [command.to_dict(bot_instance.tree) for command in bot_instance.tree.get_commands()]
+    signature = hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+    row = await db.fetchone("SELECT value FROM bot_metadata WHERE key = 'app_commands_signature'")
+    if row is not None and row[0] == signature:
+        return False
+    synced = await bot_instance.tree.sync()
+    await db.execute("REPLACE INTO bot_metadata (key, value) VALUES ('app_commands_signature', ?)", (signature,))
+    logger.info("%d slash komutu Discord'a gönderildi.", len(synced))
+    return True
+
+def estimate_member_cache_savings(guilds):
+    """Hafif modda önbelleğe alınmayan üye sayısını ve bunun yaklaşık bellek karşılığını (bayt) döner."""
+    total = sum(guild.member_count or 0 for guild in guilds)
+    cached = sum(len(guild.members) for guild in guilds)
+    uncached = max(0, total - cached)
+    return uncached, uncached * MEMBER_CACHE_BYTES_ESTIMATE
+
+# Bot client yerine commands.Bot (sharding açıksa commands.AutoShardedBot) kullanıyoruz
+# Veritabanı bağlantısını bot açılırken kurup kapanırken kapatmak için küçük bir alt sınıf
+class EmbediumBot(commands.AutoShardedBot if SHARDED else commands.Bot):
+    async def setup_hook(self):
+        await db.connect()
+        await setup_db() # Tablolar, durum yüklenmeden önce hazır olmalı
+        await command_state.load()
+        await reaction_role_index.load()
+        await command_cooldowns.load()
+        autorole_queue.start()
+        orphan_collector.start()
+        # Kalıcı ticket butonları: tüm sunucular için tek örnek, sunucu sayısından bağımsız olarak bir kez kaydedilir
+        self.ticket_view = TicketView(self)
+        self.ticket_close_view = TicketCloseView(self)
+        self.add_view(self.ticket_view)
+        self.add_view(self.ticket_close_view)
+        await metrics_server.start()
+        help_catalog.pages(False, False) # Yardım sayfalarını ilk çağrıdan önce hazırla
+        # Slash komutlarını küme başına değil bir kez gönder; uygulama kimliği yoksa (benchmark) Discord'a bağlanılmamıştır
+        if self.application_id is not None and CLUSTER_ID in (None, 0):
+            try:
+                await sync_app_commands(self)
+            except discord.HTTPException as e:
+                logger.error("Slash komutları Discord'a gönderilemedi: %s", e)
+        if CLUSTER_ID is not None:
+            # Kilit durumu bot geneli bir ayar; diğer işçilerde değiştirilirse bu işçi de görsün
+            self.command_state_sync = asyncio.create_task(command_state.sync_locked(CLUSTER_STATE_SYNC_INTERVAL))
 
-# Bot client yerine commands.Bot kullanıyoruz
-# PREFIX 'e!' olarak ayarlandı
-bot = commands.Bot(command_prefix='e!', intents=intents, help_command=None) # help_command=None ile varsayılan yardım kapatılır
+    async def close(self):
+        if CLUSTER_ID is not None:
+            self.command_state_sync.cancel()
+        await member_event_coalescer.stop()
+        raid_guard.stop()
+        await metrics_server.stop()
+        await super().close()
+        await autorole_queue.stop()
+        await orphan_collector.stop()
+        await db.close()
+
+    # Yardım sayfaları komut listesinden hesaplanır; komutlar değiştiğinde yeniden hesaplanmaları için geçersiz kılınır
+    def add_command(self, command):
+        app_command = getattr(command, 'app_command', None)
+        if app_command is not None:
+            app_command.description = slash_description(command)
+            if command.hidden: # Sahibe özel komutlar slash listesinde sadece yöneticilere görünsün
+                app_command.default_permissions = discord.Permissions(administrator=True)
+        super().add_command(command)
+        help_catalog.invalidate()
+
+    def remove_command(self, name):
+        command = super().remove_command(name)
+        help_catalog.invalidate()
+        return command
+
+# PREFIX 'e!' olarak ayarlandı. SLASH_ONLY modunda on_message prefix komutlarını hiç işlemez; önek yine de
+# verilmek zorunda olduğundan, discord.py intent uyarısı vermesin diye metin önek yerine when_mentioned kullanılır.
+# Küme işçisinde sadece başlatıcının verdiği shard'lar açılır; tek işlemde sharding'de hepsi (shard_ids=None)
+shard_options = {'shard_count': SHARD_COUNT, 'shard_ids': CLUSTER_SHARD_IDS} if SHARDED else {}
+bot = EmbediumBot(command_prefix=commands.when_mentioned if SLASH_ONLY else COMMAND_PREFIX, intents=intents, help_command=None, # help_command=None ile varsayılan yardım kapatılır
+                  member_cache_flags=member_cache_flags,
+                  chunk_guilds_at_startup=not LEAN_GATEWAY, # Hafif modda üye listeleri açılışta indirilmez
+                  **shard_options)
 
 # Botun başlangıç zamanı (uptime için)
 bot_start_time = datetime.now(timezone.utc)
 
-# Veritabanını başlatma ve tablo oluşturma fonksiyonu
-async def setup_db():
-    async with aiosqlite.connect('bot_settings.db') as db:
+# --- Veritabanı Şeması ve Migration'lar ---
+# Her migration bir (sürüm, açıklama, SQL listesi) üçlüsüdür. Uygulanan sürümler schema_version tablosunda tutulur,
+# her sürüm tek bir transaction içinde ve yalnızca bir kez çalışır. Yeni bir şema değişikliği için listenin sonuna
+# yeni bir sürüm ekleyin; eski migration'ları asla değiştirmeyin.
+MIGRATIONS = [
+    (1, "İlk şema", [
         # Sunucu ayarları için tablo (hoş geldin kanalı vb.)
-        await db.execute('''
-            CREATE TABLE IF NOT EXISTS guild_settings (
-                guild_id INTEGER PRIMARY KEY,
-                welcome_channel_id INTEGER
-            )
-        ''')
+        '''
+        CREATE TABLE IF NOT EXISTS guild_settings (
+            guild_id INTEGER PRIMARY KEY,
+            welcome_channel_id INTEGER
+        )
+        ''',
         # Botun genel kilitleme durumunu tutacak tablo
-        await db.execute('''
-            CREATE TABLE IF NOT EXISTS bot_status (
-                status_name TEXT PRIMARY KEY,
-                is_locked INTEGER -- 0 for unlocked (açık), 1 for locked (kilitli)
-            )
-        ''')
+        '''
+        CREATE TABLE IF NOT EXISTS bot_status (
+            status_name TEXT PRIMARY KEY,
+            is_locked INTEGER -- 0 for unlocked (açık), 1 for locked (kilitli)
+        )
+        ''',
         # Reaksiyon rolleri için tablo
-        await db.execute('''
-            CREATE TABLE IF NOT EXISTS reaction_roles (
-                guild_id INTEGER,
-                message_id INTEGER,
-                emoji TEXT,
-                role_id INTEGER,
-                PRIMARY KEY (guild_id, message_id, emoji)
-            )
-        ''')
+        '''
+        CREATE TABLE IF NOT EXISTS reaction_roles (
+            guild_id INTEGER,
+            message_id INTEGER,
+            emoji TEXT,
+            role_id INTEGER,
+            PRIMARY KEY (guild_id, message_id, emoji)
+        )
+        ''',
         # Sessiz kanallar için tablo
-        await db.execute('''
-            CREATE TABLE IF NOT EXISTS silent_channels (
-                channel_id INTEGER PRIMARY KEY,
-                guild_id INTEGER
-            )
-        ''')
+        '''
+        CREATE TABLE IF NOT EXISTS silent_channels (
+            channel_id INTEGER PRIMARY KEY,
+            guild_id INTEGER
+        )
+        ''',
         # Otomatik roller için tablo
-        await db.execute('''
-            CREATE TABLE IF NOT EXISTS autoroles (
-                guild_id INTEGER PRIMARY KEY,
-                role_id INTEGER
-            )
-        ''')
+        '''
+        CREATE TABLE IF NOT EXISTS autoroles (
+            guild_id INTEGER PRIMARY KEY,
+            role_id INTEGER
+        )
+        ''',
         # Ticket ayarları için tablo (log kanalı, kategori, moderatör rolü vb.)
-        await db.execute('''
-            CREATE TABLE IF NOT EXISTS ticket_settings (
-                guild_id INTEGER PRIMARY KEY,
-                ticket_category_id INTEGER,
-                ticket_log_channel_id INTEGER,
-                ticket_moderator_role_id INTEGER -- Ticketları yönetecek rolün ID'si
-            )
-        ''')
+        '''
+        CREATE TABLE IF NOT EXISTS ticket_settings (
+            guild_id INTEGER PRIMARY KEY,
+            ticket_category_id INTEGER,
+            ticket_log_channel_id INTEGER,
+            ticket_moderator_role_id INTEGER -- Ticketları yönetecek rolün ID'si
+        )
+        ''',
         # Açık ticket'ları takip etmek için tablo
-        await db.execute('''
-            CREATE TABLE IF NOT EXISTS active_tickets (
-                channel_id INTEGER PRIMARY KEY,
-                guild_id INTEGER,
-                user_id INTEGER,
-                opened_at TEXT
+        '''
+        CREATE TABLE IF NOT EXISTS active_tickets (
+            channel_id INTEGER PRIMARY KEY,
+            guild_id INTEGER,
+            user_id INTEGER,
+            opened_at TEXT
+        )
+        ''',
+        # 'command_lock' kaydı yoksa, varsayılan olarak KİLİDİ AÇIK (0) olarak ekle
+        "INSERT OR IGNORE INTO bot_status (status_name, is_locked) VALUES ('command_lock', 0)",
+    ]),
+    (2, "Kapatılan ticket arşivi", [
+        # Kapatılan ticket'ların arşivi (gzip ile sıkıştırılmış transkript)
+        '''
+        CREATE TABLE IF NOT EXISTS ticket_archive (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            guild_id INTEGER,
+            channel_id INTEGER,
+            channel_name TEXT,
+            user_id INTEGER,
+            closed_by_id INTEGER,
+            opened_at TEXT,
+            closed_at TEXT,
+            message_count INTEGER DEFAULT 0,
+            transcript BLOB
+        )
+        ''',
+        # Arşivdeki mesajlar için tam metin arama indeksi (FTS5)
+        '''
+        CREATE VIRTUAL TABLE IF NOT EXISTS ticket_archive_fts USING fts5(
+            author,
+            timestamp,
+            content,
+            ticket_id UNINDEXED,
+            guild_id UNINDEXED
+        )
+        ''',
+    ]),
+    (3, "Bir kullanıcıya sunucu başına tek açık ticket", [
+        # Eski sürümlerde oluşmuş olabilecek çift kayıtlardan en yenisini bırakıp indeksi oluştur
+        '''
+        DELETE FROM active_tickets WHERE rowid NOT IN (
+            SELECT MAX(rowid) FROM active_tickets GROUP BY guild_id, user_id
+        )
+        ''',
+        "CREATE UNIQUE INDEX IF NOT EXISTS idx_active_tickets_guild_user ON active_tickets (guild_id, user_id)",
+    ]),
+    (4, "Sık kullanılan sorgular için indeksler", [
+        "CREATE INDEX IF NOT EXISTS idx_silent_channels_guild ON silent_channels (guild_id)",
+        "CREATE INDEX IF NOT EXISTS idx_ticket_archive_guild ON ticket_archive (guild_id, id)",
+    ]),
+    (5, "Silinen mesaj ve rollerin reaksiyon rollerini temizlemek için indeksler", [
+        "CREATE INDEX IF NOT EXISTS idx_reaction_roles_message ON reaction_roles (message_id)",
+        "CREATE INDEX IF NOT EXISTS idx_reaction_roles_role ON reaction_roles (guild_id, role_id)",
+    ]),
+    (6, "Baskın koruması ayarları", [
+        # Boş (NULL) sütunlar için GuildSettings'teki varsayılanlar kullanılır
+        '''
+        CREATE TABLE IF NOT EXISTS raid_settings (
+            guild_id INTEGER PRIMARY KEY,
+            enabled INTEGER,
+            join_threshold INTEGER,
+            window_seconds INTEGER,
+            min_account_age_days INTEGER,
+            action TEXT,               -- 'yok', 'kick' veya 'karantina'
+            quarantine_role_id INTEGER,
+            lockdown_minutes INTEGER
+        )
+        ''',
+    ]),
+    (7, "Sunucuya özel komut bekleme süreleri", [
+        '''
+        CREATE TABLE IF NOT EXISTS command_cooldowns (
+            guild_id INTEGER,
+            command_name TEXT,
+            rate INTEGER,     -- Süre içinde izin verilen kullanım sayısı; 0 = sınırsız
+            per REAL,         -- saniye
+            scope TEXT,       -- 'kullanıcı', 'kanal' veya 'sunucu'
+            PRIMARY KEY (guild_id, command_name)
+        )
+        ''',
+    ]),
+    (8, "Bot geneli anahtar-değer kayıtları", [
+        # Örn. app_commands_signature: Discord'a en son gönderilen slash komut tanımlarının özeti
+        "CREATE TABLE IF NOT EXISTS bot_metadata (key TEXT PRIMARY KEY, value TEXT)",
+    ]),
+    (9, "Spam koruması ayarları", [
+        # punish_duplicates: tekrarlanan mesajlarda silme ve zaman aşımı (boşsa sadece uyarı gönderilir)
+        "CREATE TABLE IF NOT EXISTS spam_settings (guild_id INTEGER PRIMARY KEY, punish_duplicates INTEGER)",
+    ]),
+]
+
+# Her olayda veya komutta çalışan sorgular. Açılışta EXPLAIN QUERY PLAN ile kontrol edilir;
+# bunlardan biri indeks yerine tüm tabloyu taramaya (SCAN) başlarsa bot açılmaz.
+HOT_QUERIES = [
+    ("Sunucu ayarları", GUILD_SETTINGS_QUERY, (1,)),
+    ("Kullanıcının açık ticket'ı", "SELECT channel_id FROM active_tickets WHERE guild_id = ? AND user_id = ?", (1, 1)),
+    ("Kanalın ticket kaydı", "SELECT user_id, opened_at FROM active_tickets WHERE channel_id = ?", (1,)),
+    ("Ticket kapatma", "DELETE FROM active_tickets WHERE channel_id = ?", (1,)),
+    ("Sunucunun açık ticket'ları", "SELECT channel_id FROM active_tickets WHERE guild_id = ?", (1,)),
+    ("Sunucunun sessiz kanalları", "SELECT channel_id FROM silent_channels WHERE guild_id = ?", (1,)),
+    ("Sessiz kanal sıfırlama", "DELETE FROM silent_channels WHERE channel_id = ?", (1,)),
+    ("Reaksiyon rolü", "SELECT role_id FROM reaction_roles WHERE guild_id = ? AND message_id = ? AND emoji = ?", (1, 1, "x")),
+    ("Silinen mesajın reaksiyon rolleri", "DELETE FROM reaction_roles WHERE message_id = ?", (1,)),
+    ("Silinen rolün reaksiyon rolleri", "DELETE FROM reaction_roles WHERE guild_id = ? AND role_id = ?", (1, 1)),
+    ("Çöp kayıt taraması", "SELECT rowid, guild_id, message_id, emoji, role_id FROM reaction_roles WHERE rowid > ? ORDER BY rowid LIMIT ?", (0, 1)),
+    ("Arşivlenmiş ticket", "SELECT channel_name, transcript, message_count, closed_at FROM ticket_archive WHERE id = ? AND guild_id = ?", (1, 1)),
+]
+
+async def run_migrations():
+    """Henüz uygulanmamış migration'ları sırayla uygular. Uygulanan migration sayısını döner."""
+    async with db.transaction() as conn:
+        await conn.execute('''
+            CREATE TABLE IF NOT EXISTS schema_version (
+                version INTEGER PRIMARY KEY,
+                description TEXT,
+                applied_at TEXT
             )
         ''')
-        # 'command_lock' kaydı yoksa, varsayılan olarak KİLİDİ AÇIK (0) olarak ekle
-        await db.execute("INSERT OR IGNORE INTO bot_status (status_name, is_locked) VALUES (?, ?)", ('command_lock', 0))
-        await db.commit()
-    print("Veritabanı hazır ve bağlantı başarılı.")
+        async with conn.execute("SELECT COALESCE(MAX(version), 0) FROM schema_version") as cursor:
+            current_version = (await cursor.fetchone())[0]
+
+    applied = 0
+    for version, description, statements in MIGRATIONS:
+        if version <= current_version:
+            continue
+        async with db.transaction() as conn:
+            # sqlite3 DDL komutlarından önce kendiliğinden transaction açmaz; migration'ın yarım kalmaması için açıkça başlatıyoruz
+            await conn.execute("BEGIN")
+            for statement in statements:
+                await conn.execute(statement)
+            await conn.execute("INSERT INTO schema_version (version, description, applied_at) VALUES (?, ?, ?)",
+                               (version, description, datetime.now(timezone.utc).isoformat()))
+        applied += 1
+        db_logger.info("Veritabanı şeması %d. sürüme güncellendi: %s", version, description)
+    return applied
+
+async def check_query_plans():
+    """HOT_QUERIES'teki sorgulardan tüm tabloyu tarayanların listesini döner (boş liste = sorun yok)."""
+    regressions = []
+    for name, sql, params in HOT_QUERIES:
+        plan = await db.fetchall(f"EXPLAIN QUERY PLAN {sql}", params)
+        # Tek satırlık alt sorguların (CO-ROUTINE/MATERIALIZE) ve FTS tablolarının taranması sorun değil
+        subqueries = {detail.split()[-1] for (_, _, _, detail) in plan if detail.startswith(("CO-ROUTINE", "MATERIALIZE"))}
+        scans = [detail for (_, _, _, detail) in plan
+                 if detail.startswith("SCAN") and "VIRTUAL TABLE" not in detail and "CONSTANT ROW" not in detail
+                 and detail.split()[1] not in subqueries]
+        if scans:
+            regressions.append(f"{name}: {', '.join(scans)}")
+    return regressions
+
+# Veritabanını başlatma fonksiyonu: bot açılırken (setup_hook) bir kez, giriş yapılmadan önce çalışır
+async def setup_db():
+    if not db.has_remote_writer: # Küme işçilerinde şemayı başlatıcı işlem zaten güncelledi
+        await run_migrations()
+    # Plan SQLite sürümüne göre değişebilir; kullanıcının kurulumunda bot bu yüzden açılmamazlık etmesin.
+    # Kesin kontrol `python main.py --check-plans` ile (ve testlerde) yapılır.
+    for regression in await check_query_plans():
+        db_logger.error("Sık kullanılan sorgu indeks kullanmıyor: %s", regression)
+    db_logger.info("Veritabanı hazır ve bağlantı başarılı.")
+
+async def run_query_plan_check():
+    """`--check-plans`: şemayı günceller, HOT_QUERIES planlarını denetler; tam tablo taraması varsa 1 döner."""
+    await db.connect()
+    try:
+        await run_migrations()
+        regressions = await check_query_plans()
+    finally:
+        await db.close()
+    for regression in regressions:
+        print(f"SCAN: {regression}")
+    print("Sorgu planları: " + ("sorun yok." if not regressions else f"{len(regressions)} sorgu indeks kullanmıyor."))
+    return 1 if regressions else 0
+
+# --- Ticket Transkript Yazıcısı ---
+def transcript_lines(message):
+    """Bir mesajın transkriptteki satırlarını üretir (mesajın kendisi ve ekleri)."""
+    yield f"[{message.created_at.strftime('%Y-%m-%d %H:%M:%S')}] {message.author.display_name}: {message.clean_content}"
+    for attachment in message.attachments:
+        yield f"[Ek: {attachment.url}]"
+
+TRANSCRIPT_COMPRESS = False # True yapılırsa transkriptler .txt.gz olarak sıkıştırılıp gönderilir
+
+class TranscriptWriter:
+    """
+    Ticket geçmişini sayfalar geldikçe satır satır yazan transkript yazıcısı.
+    Tüm transkripti tek bir string'de biriktirmek yerine her parça geçici bir dosyaya yazılır; transkriptin
+    boyutu belleği büyütmez. Bir parça yükleme sınırına ulaşınca yeni bir parçaya geçilir ve her parça ayrı
+    bir ek olarak gönderilir.
+    """
+    # gzip veriyi kendi içinde tamponladığı için sıkıştırmada sınırın altında bir pay bırakılır
+    GZIP_MARGIN = 256 * 1024
+
+    def __init__(self, base_filename, size_limit, compress=TRANSCRIPT_COMPRESS):
+        self.base_filename = base_filename
+        self.compress = compress
+        self.size_limit = size_limit - self.GZIP_MARGIN if compress else size_limit
+        self.message_count = 0
+        self._parts = []
+        self._files = []
+        self._raw = None
+        self._stream = None
+        self._part_bytes = 0
+        self._open_part()
+
+    def _open_part(self):
+        # TemporaryFile gerçek bir dosya nesnesidir (BufferedRandom); discord.File'ın yokladığı seekable/readable
+        # metotları her Python sürümünde vardır (SpooledTemporaryFile'da 3.11 öncesinde yoktur)
+        self._raw = tempfile.TemporaryFile()
+        self._stream = gzip.GzipFile(fileobj=self._raw, mode='wb') if self.compress else self._raw
+        self._parts.append(self._raw)
+        self._part_bytes = 0
+
+    def _current_size(self):
+        # Sıkıştırmada diske inen gerçek boyut, sıkıştırmasızda yazılan bayt sayısı
+        return self._raw.tell() if self.compress else self._part_bytes
+
+    def write_line(self, line=""):
+        data = (line + "\n").encode('utf-8')
+        if self._part_bytes and self._current_size() + len(data) > self.size_limit:
+            if self.compress:
+                self._stream.close() # gzip trailer'ını yazar, alttaki dosyayı kapatmaz
+            self._open_part()
+        self._stream.write(data)
+        self._part_bytes += len(data)
+
+    def write_message(self, message):
+        self.message_count += 1
+        for line in transcript_lines(message):
+            self.write_line(line)
+
+    def finish(self):
+        """Yazmayı bitirir ve her parça için gönderilmeye hazır bir discord.File listesi döner."""
+        if self.compress:
+            self._stream.close()
+        extension = "txt.gz" if self.compress else "txt"
+        for index, part in enumerate(self._parts, start=1):
+            part.seek(0)
+            if len(self._parts) == 1:
+                filename = f"{self.base_filename}.{extension}"
+            else:
+                filename = f"{self.base_filename}-{index}.{extension}"
+            self._files.append(discord.File(part, filename=filename))
+        return self._files
+
+    def close(self):
+        # discord.File dosyanın close metodunu geçici olarak devre dışı bırakır, önce onu geri alıyoruz
+        for transcript_file in self._files:
+            transcript_file.close()
+        for part in self._parts:
+            part.close()
+
+# --- Kapatılan Ticket Arşivi ---
+ARCHIVE_BATCH_SIZE = 200 # Arama indeksine kaç mesajda bir toplu yazılacağı
+ARCHIVE_PAGE_SIZE = 5    # Arama sonuçlarında sayfa başına gösterilecek sonuç sayısı
+TICKET_DELETE_DELAY = 5.0 # Kapatılan ticket kanalının silinmeden önce bekleyeceği süre (saniye)
+
+class TicketArchiveWriter:
+    """
+    Kapatılan bir ticket'ı yerel arşive yazar.
+    Transkript gzip ile sıkıştırılarak ticket_archive tablosuna blob olarak, mesajlar ise aranabilmeleri için
+    ticket_archive_fts (FTS5) tablosuna yazılır. İndeks satırları ARCHIVE_BATCH_SIZE'lık gruplar halinde eklenir.
+    """
+    def __init__(self, database, guild_id, channel, user_id, closed_by_id, opened_at):
+        self.db = database
+        self.guild_id = guild_id
+        self.channel = channel
+        self.user_id = user_id
+        self.closed_by_id = closed_by_id
+        self.opened_at = opened_at
+        self.archive_id = None
+        self.message_count = 0
+        self._compressor = zlib.compressobj(wbits=31) # wbits=31 -> gzip biçimi
+        self._chunks = []
+        self._pending = []
+
+    async def start(self):
+        self.archive_id = await self.db.insert("INSERT INTO ticket_archive (guild_id, channel_id, channel_name, user_id, closed_by_id, opened_at) VALUES (?, ?, ?, ?, ?, ?)",
+                                               (self.guild_id, self.channel.id, self.channel.name, self.user_id, self.closed_by_id, self.opened_at))
+
+    def write_line(self, line=""):
+        self._chunks.append(self._compressor.compress((line + "\n").encode('utf-8')))
+
+    async def add_message(self, message):
+        for line in transcript_lines(message):
+            self.write_line(line)
+        self._pending.append((self.archive_id, self.guild_id, message.author.display_name,
+                              message.created_at.strftime('%Y-%m-%d %H:%M:%S'), message.clean_content))
+        self.message_count += 1
+        if len(self._pending) >= ARCHIVE_BATCH_SIZE:
+            await self._flush()
+
+    async def _flush(self):
+        if not self._pending:
+            return
+        # Ara gruplar beklenmeden yazılır; finish()'teki son UPDATE onlardan sonra commit edildiği için arşiv tamamlanmış olur
+        await self.db.executemany("INSERT INTO ticket_archive_fts (ticket_id, guild_id, author, timestamp, content) VALUES (?, ?, ?, ?, ?)",
+                                  self._pending, durable=False)
+        self._pending = []
+
+    async def finish(self):
+        await self._flush()
+        self._chunks.append(self._compressor.flush())
+        await self.db.execute("UPDATE ticket_archive SET transcript = ?, message_count = ?, closed_at = ? WHERE id = ?",
+                              (b"".join(self._chunks), self.message_count, datetime.now(timezone.utc).isoformat(), self.archive_id))
+
+def fts_query(text):
+    """Kullanıcının yazdığı metni FTS5 sözdizimi hatası vermeyecek şekilde, kelime kelime tırnaklar."""
+    return " ".join('"' + term.replace('"', '""') + '"' for term in text.split())
+
+async def search_ticket_archive(guild_id, query, page):
+    """Bir sunucunun ticket arşivinde sıralı (bm25) arama yapar. (toplam sonuç, sayfadaki sonuçlar) döner."""
+    match = fts_query(query)
+    total = (await db.fetchone("SELECT COUNT(*) FROM ticket_archive_fts WHERE ticket_archive_fts MATCH ? AND guild_id = ?",
+                               (match, guild_id)))[0]
+    rows = await db.fetchall('''
+        SELECT f.ticket_id, a.channel_name, f.author, f.timestamp, snippet(ticket_archive_fts, 2, '**', '**', '…', 12)
+        FROM ticket_archive_fts AS f
+        JOIN ticket_archive AS a ON a.id = f.ticket_id
+        WHERE ticket_archive_fts MATCH ? AND f.guild_id = ?
+        ORDER BY f.rank
+        LIMIT ? OFFSET ?
+    ''', (match, guild_id, ARCHIVE_PAGE_SIZE, page * ARCHIVE_PAGE_SIZE))
+    return total, rows
 
 # --- Ticket Sistemi İçin View Sınıfı ---
 # Hatanın ana kaynağı burasıydı. timeout=None ve custom_id'ler eklendi.
+# Bu view tüm sunucular için tek bir kalıcı örnek olarak kaydedilir (bkz. setup_hook).
+# Sunucuya özel ayarlar (kategori, log kanalı, moderatör rolü) her tıklamada önbellekten okunur,
+# böylece açılış maliyeti sunucu sayısından bağımsızdır ve ayarlar değişince eskimez.
 class TicketView(discord.ui.View):
-    def __init__(self, bot_instance, mod_role_id):
+    def __init__(self, bot_instance):
         # Kalıcı bir View için timeout=None olmalıdır.
         super().__init__(timeout=None)
         self.bot = bot_instance
-        self.mod_role_id = mod_role_id
-
-        # "Ticket Aç" butonu
-        # custom_id her zaman benzersiz ve sabit olmalıdır.
-        self.add_item(discord.ui.Button(
-            label="Ticket Aç",
-            style=discord.ButtonStyle.primary,
-            custom_id="create_ticket_button", # Benzersiz ve sabit ID
-            emoji="✉️"
-        ))
+        self._in_flight = set() # Ticket'ı şu anda oluşturulmakta olan (guild_id, user_id) çiftleri
 
+    # custom_id her zaman benzersiz ve sabit olmalıdır.
     @discord.ui.button(label="Ticket Aç", style=discord.ButtonStyle.primary, custom_id="create_ticket_button", emoji="✉️")
+    @timed_event('ticket_create_button')
     async def create_ticket(self, interaction: discord.Interaction, button: discord.ui.Button):
+        # Aynı kullanıcının art arda tıklamaları tek bir kanal oluşturmaya indirgenir
+        key = (interaction.guild.id, interaction.user.id)
+        if key in self._in_flight:
+            return await interaction.response.send_message("Ticket'ınız zaten oluşturuluyor, lütfen bekleyin.", ephemeral=True)
+        self._in_flight.add(key)
+        try:
+            await self._open_ticket(interaction)
+        finally:
+            self._in_flight.discard(key)
+
+    async def _open_ticket(self, interaction):
         guild = interaction.guild
         user = interaction.user
 
-        async with aiosqlite.connect('bot_settings.db') as db:
-            cursor = await db.execute("SELECT ticket_category_id, ticket_log_channel_id FROM ticket_settings WHERE guild_id = ?", (guild.id,))
-            settings = await cursor.fetchone()
+        settings = await guild_settings_cache.get(guild.id)
 
-        if not settings:
+        if not settings.has_ticket_settings:
             return await interaction.response.send_message("Ticket sistemi bu sunucuda ayarlanmamış.", ephemeral=True)
 
-        category_id, log_channel_id = settings
-        category = guild.get_channel(category_id)
-        log_channel = guild.get_channel(log_channel_id)
+        category = guild.get_channel(settings.ticket_category_id)
+        log_channel = guild.get_channel(settings.ticket_log_channel_id)
+        mod_role_id = settings.ticket_moderator_role_id
 
         if not category:
             return await interaction.response.send_message("Ayarlanan ticket kategorisi bulunamadı.", ephemeral=True)
@@ -137,19 +1555,15 @@ class TicketView(discord.ui.View):
             return await interaction.response.send_message("Ayarlanan ticket log kanalı bulunamadı.", ephemeral=True)
 
         # Kullanıcının zaten açık bir ticket'ı var mı kontrol et
-        async with aiosqlite.connect('bot_settings.db') as db:
-            cursor = await db.execute("SELECT channel_id FROM active_tickets WHERE user_id = ? AND guild_id = ?", (user.id, guild.id))
-            existing_ticket = await cursor.fetchone()
+        existing_ticket = await db.fetchone("SELECT channel_id FROM active_tickets WHERE guild_id = ? AND user_id = ?", (guild.id, user.id))
 
+        stale_channel_id = None
         if existing_ticket:
             existing_channel = guild.get_channel(existing_ticket[0])
             if existing_channel:
                 return await interaction.response.send_message(f"Zaten açık bir ticket'ınız var: {existing_channel.mention}", ephemeral=True)
-            else:
-                # Eğer kanal yoksa veritabanından sil (çöp temizliği)
-                async with aiosqlite.connect('bot_settings.db') as db:
-                    await db.execute("DELETE FROM active_tickets WHERE channel_id = ?", (existing_ticket[0],))
-                    await db.commit()
+            # Kanal silinmişse bu kayıt çöptür; aşağıdaki kayıt sorgusu onun yerine geçer
+            stale_channel_id = existing_ticket[0]
 
         overwrites = {
             guild.default_role: discord.PermissionOverwrite(read_messages=False),
@@ -158,21 +1572,26 @@ class TicketView(discord.ui.View):
         }
 
         # Moderatör rolüne izin ver
-        if self.mod_role_id:
-            mod_role = guild.get_role(self.mod_role_id)
+        if mod_role_id:
+            mod_role = guild.get_role(mod_role_id)
             if mod_role:
                 overwrites[mod_role] = discord.PermissionOverwrite(read_messages=True, send_messages=True, embed_links=True, attach_files=True)
             else:
-                print(f"[Ticket Hatası] Moderatör rolü bulunamadı: {self.mod_role_id}")
+                ticket_logger.warning("Moderatör rolü bulunamadı: %s", mod_role_id, extra={'guild': guild.id})
         
         try:
             ticket_channel = await guild.create_text_channel(f'ticket-{user.name}-{user.discriminator or user.id}', category=category, overwrites=overwrites)
             
-            # Ticket'ı veritabanına kaydet
-            async with aiosqlite.connect('bot_settings.db') as db:
-                await db.execute("INSERT INTO active_tickets (channel_id, guild_id, user_id, opened_at) VALUES (?, ?, ?, ?)",
-                                 (ticket_channel.id, guild.id, user.id, datetime.now(timezone.utc).isoformat()))
-                await db.commit()
+            # Ticket'ı tek bir atomik sorguyla kaydet. Kanalı silinmiş eski bir kayıt varsa onun yerine geçer.
+            # (guild_id, user_id) üzerindeki UNIQUE indeks sayesinde aynı anda açılmış ikinci bir ticket kaydedilemez.
+            registered = await db.execute('''
+                INSERT INTO active_tickets (channel_id, guild_id, user_id, opened_at) VALUES (?, ?, ?, ?)
+                ON CONFLICT(guild_id, user_id) DO UPDATE SET channel_id = excluded.channel_id, opened_at = excluded.opened_at
+                WHERE active_tickets.channel_id = ?
+            ''', (ticket_channel.id, guild.id, user.id, datetime.now(timezone.utc).isoformat(), stale_channel_id))
+            if not registered:
+                await ticket_channel.delete(reason="Kullanıcının zaten açık bir ticket'ı var.")
+                return await interaction.response.send_message("Zaten açık bir ticket'ınız var.", ephemeral=True)
 
             embed = discord.Embed(
                 title="🎟️ Destek Talebi Açıldı",
@@ -182,9 +1601,8 @@ class TicketView(discord.ui.View):
             embed.set_footer(text="Ticket'ı kapatmak için 'Kapat' butonunu kullanın.")
             embed.timestamp = datetime.now(timezone.utc)
 
-            close_view = TicketCloseView(self.bot, self.mod_role_id) # Kapatma butonu için yeni bir View
-            await ticket_channel.send(embed=embed, view=close_view)
-            await ticket_channel.send(f"{user.mention}, <@&{self.mod_role_id}>", delete_after=0.1) # Moderatör rolünü etiketle
+            await ticket_channel.send(embed=embed, view=self.bot.ticket_close_view) # Kapatma butonu, kalıcı olarak kayıtlı tek view
+            await ticket_channel.send(f"{user.mention}, <@&{mod_role_id}>", delete_after=0.1) # Moderatör rolünü etiketle
 
             await interaction.response.send_message(f"Ticket'ınız açıldı: {ticket_channel.mention}", ephemeral=True)
 
@@ -196,39 +1614,39 @@ class TicketView(discord.ui.View):
             )
             log_embed.timestamp = datetime.now(timezone.utc)
             await log_channel.send(embed=log_embed)
-            print(f"[Ticket] {user.name} tarafından yeni bir ticket açıldı: {ticket_channel.name}")
+            ticket_logger.info("%s tarafından yeni bir ticket açıldı: %s", user.name, ticket_channel.name, extra={'guild': guild.id, 'user': user.id, 'channel': ticket_channel.id})
 
         except discord.Forbidden:
             await interaction.response.send_message("Ticket kanalı oluşturma yetkim yok. Lütfen yetkilerimi kontrol edin.", ephemeral=True)
         except Exception as e:
             await interaction.response.send_message(f"Bir hata oluştu: {e}", ephemeral=True)
-            print(f"[Ticket Hatası] Ticket oluşturulurken hata: {e}")
+            ticket_logger.exception("Ticket oluşturulurken hata: %s", e, extra={'guild': guild.id, 'user': user.id})
 
 # Ticket kapatma ve silme butonları için yeni bir View sınıfı
+# Bu da tek örnek olarak kalıcı kaydedilir, böylece bot yeniden başlasa da açık ticket'lardaki "Kapat" butonları çalışır.
 class TicketCloseView(discord.ui.View):
-    def __init__(self, bot_instance, mod_role_id):
+    def __init__(self, bot_instance):
         super().__init__(timeout=None) # Kalıcı bir View için timeout=None
         self.bot = bot_instance
-        self.mod_role_id = mod_role_id
 
     @discord.ui.button(label="Kapat", style=discord.ButtonStyle.red, custom_id="close_ticket_button", emoji="🔒")
+    @timed_event('ticket_close_button')
     async def close_ticket(self, interaction: discord.Interaction, button: discord.ui.Button):
         channel = interaction.channel
         guild = interaction.guild
         user_id_from_ticket = None
 
         # Sadece ticket sahibinin veya moderatörün kapatabilmesini sağla
-        async with aiosqlite.connect('bot_settings.db') as db:
-            cursor = await db.execute("SELECT user_id FROM active_tickets WHERE channel_id = ?", (channel.id,))
-            result = await cursor.fetchone()
-            if result:
-                user_id_from_ticket = result[0]
-            else:
-                return await interaction.response.send_message("Bu bir ticket kanalı gibi görünmüyor veya veritabanında bulunamadı.", ephemeral=True)
+        result = await db.fetchone("SELECT user_id, opened_at FROM active_tickets WHERE channel_id = ?", (channel.id,))
+        if result:
+            user_id_from_ticket, opened_at = result
+        else:
+            return await interaction.response.send_message("Bu bir ticket kanalı gibi görünmüyor veya veritabanında bulunamadı.", ephemeral=True)
 
+        settings = await guild_settings_cache.get(guild.id)
         if interaction.user.id != user_id_from_ticket:
-            if self.mod_role_id:
-                mod_role = guild.get_role(self.mod_role_id)
+            if settings.ticket_moderator_role_id:
+                mod_role = guild.get_role(settings.ticket_moderator_role_id)
                 if not mod_role or mod_role not in interaction.user.roles:
                     return await interaction.response.send_message("Sadece ticket sahibi veya moderatörler bu ticket'ı kapatabilir.", ephemeral=True)
             else:
@@ -236,103 +1654,116 @@ class TicketCloseView(discord.ui.View):
 
         await interaction.response.send_message("Ticket kapatılıyor... Lütfen bekleyin.")
         
-        # Transcript (mesaj geçmişi) al ve log kanalına gönder
-        log_channel_id = None
-        async with aiosqlite.connect('bot_settings.db') as db:
-            cursor = await db.execute("SELECT ticket_log_channel_id FROM ticket_settings WHERE guild_id = ?", (guild.id,))
-            log_result = await cursor.fetchone()
-            if log_result:
-                log_channel_id = log_result[0]
-
-        if log_channel_id:
-            log_channel = guild.get_channel(log_channel_id)
-            if log_channel:
-                transcript_content = f"### Ticket Transkripti (Kanal ID: {channel.id}, Kapatan: {interaction.user})\n\n"
-                async for message in channel.history(limit=None, oldest_first=True):
-                    transcript_content += f"[{message.created_at.strftime('%Y-%m-%d %H:%M:%S')}] {message.author.display_name}: {message.clean_content}\n"
-                    for attachment in message.attachments:
-                        transcript_content += f"[Ek: {attachment.url}]\n"
-                
-                transcript_file = discord.File(io.StringIO(transcript_content), filename=f"ticket-{channel.id}-transcript.txt")
+        # Transcript (mesaj geçmişi) al, arşive yaz ve log kanalına gönder
+        log_channel_id = settings.ticket_log_channel_id
+        log_channel = guild.get_channel(log_channel_id) if log_channel_id else None
+        if log_channel_id and not log_channel:
+            ticket_logger.warning("Log kanalı bulunamadı: %s", log_channel_id, extra={'guild': guild.id})
+
+        # Mesajlar sayfa sayfa geldikçe yazıcıya ve arşive aktarılır, transkript hiçbir zaman tek parça bellekte tutulmaz
+        header = f"### Ticket Transkripti (Kanal ID: {channel.id}, Kapatan: {interaction.user})"
+        writer = TranscriptWriter(f"ticket-{channel.id}-transcript", guild.filesize_limit) if log_channel else None
+        archive = TicketArchiveWriter(db, guild.id, channel, user_id_from_ticket, interaction.user.id, opened_at)
+        try:
+            await archive.start()
+            for sink in (writer, archive):
+                if sink:
+                    sink.write_line(header)
+                    sink.write_line()
+            async for message in channel.history(limit=None, oldest_first=True):
+                if writer:
+                    writer.write_message(message)
+                await archive.add_message(message)
+            await archive.finish()
+            ticket_logger.info("%s ticket'ı arşivlendi (Arşiv ID: %s, %d mesaj).", channel.name, archive.archive_id, archive.message_count, extra={'guild': guild.id, 'channel': channel.id})
+
+            if writer:
+                transcript_files = writer.finish()
                 transcript_embed = discord.Embed(
                     title="Ticket Kapatıldı",
-                    description=f"**Ticket:** {channel.name}\n**Kapatan:** {interaction.user.mention}",
+                    description=f"**Ticket:** {channel.name}\n**Kapatan:** {interaction.user.mention}\n**Arşiv ID:** {archive.archive_id}",
                     color=discord.Color.dark_red()
                 )
                 transcript_embed.timestamp = datetime.now(timezone.utc)
-                await log_channel.send(embed=transcript_embed, file=transcript_file)
-                print(f"[Ticket] {channel.name} ticket'ı kapatıldı ve log kanalına transkript gönderildi.")
-            else:
-                print(f"[Ticket Hatası] Log kanalı bulunamadı: {log_channel_id}")
+                await log_channel.send(embed=transcript_embed, file=transcript_files[0])
+                # Yükleme sınırını aşan transkriptler birden fazla parçaya bölünür, her parça ayrı mesajla gönderilir
+                for index, transcript_file in enumerate(transcript_files[1:], start=2):
+                    await log_channel.send(f"Transkript devamı ({index}/{len(transcript_files)})", file=transcript_file)
+                ticket_logger.info("%s ticket'ı kapatıldı ve log kanalına transkript gönderildi (%d mesaj, %d parça).", channel.name, writer.message_count, len(transcript_files), extra={'guild': guild.id, 'channel': channel.id})
+        finally:
+            if writer:
+                writer.close()
 
 
         # Veritabanından ticket'ı sil
-        async with aiosqlite.connect('bot_settings.db') as db:
-            await db.execute("DELETE FROM active_tickets WHERE channel_id = ?", (channel.id,))
-            await db.commit()
+        await db.execute("DELETE FROM active_tickets WHERE channel_id = ?", (channel.id,), durable=False) # Kanal birkaç saniye sonra silinecek, beklemeye gerek yok
 
-        # Kanalı 5 saniye sonra sil
-        await channel.send("Bu ticket kanalı 5 saniye içinde silinecektir.")
-        await asyncio.sleep(5)
+        # Kanalı birkaç saniye sonra sil
+        await channel.send(f"Bu ticket kanalı {TICKET_DELETE_DELAY:.0f} saniye içinde silinecektir.")
+        await asyncio.sleep(TICKET_DELETE_DELAY)
         try:
             await channel.delete()
-            print(f"[Ticket] Ticket kanalı silindi: {channel.name}")
+            ticket_logger.info("Ticket kanalı silindi: %s", channel.name, extra={'guild': guild.id, 'channel': channel.id})
         except discord.Forbidden:
-            print(f"[Ticket Hatası] Ticket kanalı silme yetkim yok: {channel.name}")
+            ticket_logger.warning("Ticket kanalı silme yetkim yok: %s", channel.name, extra={'guild': guild.id, 'channel': channel.id})
         except Exception as e:
-            print(f"[Ticket Hatası] Ticket kanalı silerken hata: {e}")
+            ticket_logger.exception("Ticket kanalı silerken hata: %s", e, extra={'guild': guild.id, 'channel': channel.id})
 
 
 # Bot Discord'a başarıyla bağlandığında çalışacak olay
 @bot.event
 async def on_ready():
-    await setup_db() # Bot hazır olduğunda veritabanını hazırla
-    print(f'🎉 {bot.user} olarak Discord\'a giriş yaptık!')
-    print(f'Botunuz şu anda {len(bot.guilds)} sunucuda aktif.')
-    
-    # Tüm sunucular için aktif TicketView'ları yükle
-    async with aiosqlite.connect('bot_settings.db') as db:
-        cursor = await db.execute("SELECT guild_id, ticket_moderator_role_id FROM ticket_settings")
-        settings_results = await cursor.fetchall()
-    
-    for guild_id, mod_role_id in settings_results:
-        # Her sunucu için ayrı bir TicketView oluşturup bota ekliyoruz.
-        # Bu, botun yeniden başlatılmasında butonların işlevsel kalmasını sağlar.
-        # view = TicketView(bot_instance=bot, mod_role_id=mod_role_id) # Bu satırda hata alıyorduk
-        # persistent view'lar için bot.add_view() yalnızca view sınıfını almalıdır.
-        # İnteraction'da View oluştururken parametreleri aktarırız.
-        
-        # Ticket Aç butonu için
-        bot.add_view(TicketView(bot_instance=bot, mod_role_id=mod_role_id))
-        # Ticket Kapat butonu için (bu genellikle bir mesajla birlikte gönderildiğinden on_ready'de ayrıca eklenmesine gerek yoktur)
-        # Ama eğer bir sebepten dolayı o da kalıcı olacaksa, onun da eklenmesi gerekir.
-        # Mevcut kullanımınızda, TicketView içinde TicketCloseView oluşturuluyor.
-        # Eğer kapat butonu mesajı da kalıcı ise, onun için de bot.add_view(TicketCloseView(...)) yapmalısınız.
-        # Eğer bu ticket kapatma butonu mesajı sürekli aynı ID'ye sahipse (mesela bir "genel ticket mesajı" gibi),
-        # o zaman her sunucu için o mesaja bir TicketCloseView yükleyebilirsiniz.
-        # Ancak genellikle kapatma butonu ticket kanalı oluşturulduğunda gönderilir ve kanal silinir,
-        # bu nedenle bu view'ın "kalıcı" olmasına gerek yoktur. Sizin kodunuzda da bu şekilde,
-        # sadece "create_ticket_button" kalıcı olması gerekiyor.
-        
-        print(f"Sunucu {guild_id} için TicketView (Ticket Aç butonu) yüklendi.")
-
+    logger.info("🎉 %s olarak Discord'a giriş yaptık!", bot.user)
+    logger.info("Botunuz şu anda %d sunucuda aktif.", len(bot.guilds))
+    if SHARDED:
+        cluster = f"Küme {CLUSTER_ID}, " if CLUSTER_ID is not None else ""
+        logger.info("%s%d/%d shard açık.", cluster, len(bot.shards), bot.shard_count)
+        for shard_id, latency, guild_count in shard_summary():
+            logger.info("Shard %d: %s, %d sunucu", shard_id, latency, guild_count, extra={'shard': shard_id})
+    if LEAN_GATEWAY:
+        uncached, saved_bytes = estimate_member_cache_savings(bot.guilds)
+        logger.info("Hafif gateway modu açık: %d üye önbelleğe alınmadı (~%.1f MB tasarruf), presence güncellemeleri kapalı.", uncached, saved_bytes / (1024 * 1024))
+    if SLASH_ONLY:
+        logger.info("Sadece slash komutları açık: prefix komutları ve message_content intent'i kapalı.")
 
     # Durum güncellendi, yeni prefix'e göre yardım komutu
-    await bot.change_presence(activity=discord.Game(name="Embedium | e!yardım"))
+    await bot.change_presence(activity=discord.Game(name=f"Embedium | {USAGE_PREFIX}yardım"))
+
+# Komut süresi ölçümü: before_invoke kontroller geçtikten sonra, after_invoke komut hata verse bile çalışır
+# Bekleme süreleri de burada harcanır: jeton yalnızca yetki ve argüman kontrollerinden geçen kullanımlardan düşülür
+@bot.before_invoke
+async def start_command_timer(ctx):
+    command_cooldowns.consume(ctx)
+    ctx.metrics_started = time.perf_counter()
+
+@bot.after_invoke
+async def record_command_timing(ctx):
+    started = getattr(ctx, 'metrics_started', None)
+    if started is not None:
+        elapsed = time.perf_counter() - started
+        metrics.observe('command', ctx.command.qualified_name, elapsed, error=ctx.command_failed)
+        command_logger.info("%s %s%s komutunu kullandı.", ctx.author, USAGE_PREFIX if ctx.interaction else COMMAND_PREFIX, ctx.command.qualified_name,
+                            extra=ctx_fields(ctx, latency_ms=round(elapsed * 1000, 2), failed=ctx.command_failed))
 
 # Hata yakalama (komutlar için)
 @bot.event
 async def on_command_error(ctx, error):
+    if isinstance(error, commands.BadFlagArgument) and isinstance(error.original, commands.BadArgument):
+        error = error.original # Bayrak değerinin neden geçersiz olduğunu (örn. aralık dışı) göster
     if isinstance(error, commands.CommandNotFound):
         # Bot kilitliyse ve sahibi değilse CommandNotFound hatası görmesin
-        is_locked = await is_bot_locked_status()
+        is_locked = is_bot_locked_status()
         # Eğer bot kilitliyse ve kullanan bot sahibi değilse, komut bulunamadı mesajı gönderme
         if is_locked and ctx.author.id != OWNER_ID:
             pass
         else:
-            await ctx.send("Üzgünüm, böyle bir komut bulamadım. `e!yardım` yazarak komutları görebilirsiniz.")
+            await ctx.send(f"Üzgünüm, böyle bir komut bulamadım. `{USAGE_PREFIX}yardım` yazarak komutları görebilirsiniz.")
     elif isinstance(error, commands.MissingRequiredArgument):
-        await ctx.send(f"Komutu yanlış kullandınız. Eksik argüman: `{error.param.name}`. `e!yardım` kontrol edin.")
+        await ctx.send(f"Komutu yanlış kullandınız. Eksik argüman: `{error.param.name}`. `{USAGE_PREFIX}yardım` kontrol edin.")
+    elif isinstance(error, commands.RangeError):
+        await ctx.send(f"Geçersiz değer: `{error.value}`. Değer {error.minimum} ile {error.maximum} arasında olmalıdır.")
+    elif isinstance(error, commands.BadArgument):
+        await ctx.send(f"Komutu yanlış kullandınız: {error} `{USAGE_PREFIX}yardım` kontrol edin.")
     elif isinstance(error, commands.MissingPermissions):
         await ctx.send("Bu komutu kullanmak için yeterli yetkiniz yok.")
     elif isinstance(error, commands.BotMissingPermissions):
@@ -356,18 +1787,65 @@ async def on_command_error(ctx, error):
         remaining = round(error.retry_after, 1)
         await ctx.send(f"Bu komutu tekrar kullanmak için `{remaining}` saniye beklemeniz gerekiyor.")
     else:
-        print(f"Bilinmeyen bir hata oluştu: {type(error).__name__} - {error}")
+        logger.error("Bilinmeyen bir hata oluştu: %s - %s", type(error).__name__, error, exc_info=error, extra=ctx_fields(ctx))
         # await ctx.send("Beklenmeyen bir hata oluştu. Lütfen geliştiriciye bildirin.")
         # raise error # Hatanın tam izini görmek için bu satırı etkinleştirebilirsiniz
 
 # --- Kilit Durumu Kontrolü Fonksiyonları ---
-async def is_bot_locked_status():
-    """Botun komutlarının kilitli olup olmadığını veritabanından döner."""
-    async with aiosqlite.connect('bot_settings.db') as db:
-        cursor = await db.execute("SELECT is_locked FROM bot_status WHERE status_name = 'command_lock'")
-        result = await cursor.fetchone()
+class CommandState:
+    """
+    Komut kontrollerinin her çağrıda veritabanına gitmemesi için kilit durumu ve sessiz kanallar bellekte tutulur.
+    Açılışta bir kez yüklenir; kilitle/kilidi aç ve sessiz kanal komutları hem veritabanını hem bu durumu günceller.
+    """
+    def __init__(self, database):
+        self.db = database
+        self.locked = False
+        self.silent_channel_ids = set()
+
+    async def load(self):
+        result = await self.db.fetchone("SELECT is_locked FROM bot_status WHERE status_name = 'command_lock'")
         # Eğer kayıt yoksa veya 1 ise kilitli (True), 0 ise açık (False)
-        return bool(result[0]) if result else False # Varsayılan olarak KİLİDİ AÇIK (False) olsun
+        self.locked = bool(result[0]) if result else False # Varsayılan olarak KİLİDİ AÇIK (False) olsun
+        rows = await self.db.fetchall("SELECT channel_id FROM silent_channels")
+        self.silent_channel_ids = {channel_id for (channel_id,) in rows}
+        logger.info("Komut durumu yüklendi: kilit=%s, %d sessiz kanal.", 'kilitli' if self.locked else 'açık', len(self.silent_channel_ids))
+
+    async def set_locked(self, locked):
+        await self.db.execute("REPLACE INTO bot_status (status_name, is_locked) VALUES (?, ?)", ('command_lock', int(locked)))
+        self.locked = locked
+
+    async def add_silent_channel(self, channel_id, guild_id):
+        await self.db.execute("INSERT OR IGNORE INTO silent_channels (channel_id, guild_id) VALUES (?, ?)",
+                              (channel_id, guild_id))
+        self.silent_channel_ids.add(channel_id)
+
+    async def remove_silent_channel(self, channel_id):
+        await self.db.execute("DELETE FROM silent_channels WHERE channel_id = ?", (channel_id,))
+        self.silent_channel_ids.discard(channel_id)
+
+    def forget_silent_channels(self, channel_ids):
+        """Veritabanından silinmiş sessiz kanalları bellekten düşürür."""
+        self.silent_channel_ids.difference_update(channel_ids)
+
+    def is_silent(self, channel_id):
+        return channel_id in self.silent_channel_ids
+
+    async def sync_locked(self, interval):
+        """Küme modunda kilit durumunu düzenli aralıklarla veritabanından yeniden okur."""
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                result = await self.db.fetchone("SELECT is_locked FROM bot_status WHERE status_name = 'command_lock'")
+                self.locked = bool(result[0]) if result else False
+            except Exception as e:
+                cluster_logger.warning("Kilit durumu okunamadı: %s", e)
+
+command_state = CommandState(db)
+CLUSTER_STATE_SYNC_INTERVAL = 5.0 # Küme işçilerinin kilit durumunu yeniden okuma aralığı (saniye)
+
+def is_bot_locked_status():
+    """Botun komutlarının kilitli olup olmadığını bellekteki durumdan döner (veritabanına gitmez)."""
+    return command_state.locked
 
 def check_bot_unlocked_or_owner():
     """
@@ -376,11 +1854,11 @@ def check_bot_unlocked_or_owner():
     Eğer bot kilitli değilse (is_locked=0) her zaman True döner.
     Aksi takdirde False döner ve hata mesajı fırlatır.
     """
-    async def predicate(ctx):
+    def predicate(ctx):
         if ctx.author.id == OWNER_ID:
             return True # Bot sahibi her zaman komutları kullanabilir
         
-        locked = await is_bot_locked_status()
+        locked = is_bot_locked_status()
         if not locked: # Eğer bot kilitli DEĞİLSE, herkes kullanabilir
             return True
         
@@ -396,202 +1874,1106 @@ def check_not_silent_channel():
     Eğer komut sessiz bir kanalda kullanılmıyorsa True döner.
     Aksi takdirde False döner ve hata mesajı fırlatır.
     """
-    async def predicate(ctx):
+    def predicate(ctx):
         if ctx.author.id == OWNER_ID:
             return True # Bot sahibi her zaman komutları kullanabilir
 
-        async with aiosqlite.connect('bot_settings.db') as db:
-            cursor = await db.execute("SELECT channel_id FROM silent_channels WHERE channel_id = ?", (ctx.channel.id,))
-            is_silent = await cursor.fetchone()
-        
-        if is_silent:
+        if command_state.is_silent(ctx.channel.id):
             raise commands.CheckFailure("Bu kanal sessiz moda alınmıştır. Burada komutlara yanıt veremiyorum.")
         return True
     return commands.check(predicate)
 
 
+# --- Komut Bekleme Süreleri ---
+# Her komutun kullanım sınırı bir jeton kovasıdır: kova en fazla `rate` jeton tutar ve `per` saniyede tamamen dolar,
+# her kullanım bir jeton harcar. Sunucular sınırları e!bekleme_ayarla ile değiştirebilir; ayarlar açılışta bir kez
+# yüklenir, kontrol tamamen bellekte yapılır. Kovalar LRU sırasıyla tutulur ve yeniden dolmuş kovalar atılır.
+COOLDOWN_SCOPES = {'kullanıcı': commands.BucketType.user, 'kanal': commands.BucketType.channel, 'sunucu': commands.BucketType.guild}
+COOLDOWN_SCOPE_ALIASES = {'kullanici': 'kullanıcı'}
+COOLDOWN_MAX_BUCKETS = 50_000 # Bellekte tutulan en fazla kova; dolunca en uzun süredir kullanılmayan atılır
+
+# Varsayılan sınırlar: komut -> (kullanım sayısı, saniye, kapsam). Listede olmayan komutlar sınırsızdır.
+DEFAULT_COOLDOWNS = {
+    'duyuru': (2, 60.0, 'kanal'),
+    'kanala_mesaj': (3, 60.0, 'sunucu'),
+    'clear': (3, 30.0, 'kanal'),
+    'zar': (5, 10.0, 'kullanıcı'),
+    'yazıtura': (5, 10.0, 'kullanıcı'),
+    '8ball': (3, 10.0, 'kullanıcı'),
+}
+
+class CooldownRule:
+    __slots__ = ('rate', 'per', 'scope')
+
+    def __init__(self, rate, per, scope):
+        self.rate = rate
+        self.per = per
+        self.scope = scope
+
+    def describe(self):
+        if not self.rate:
+            return "sınırsız"
+        return f"{self.scope} başına {self.per:g} saniyede {self.rate} kullanım"
+
+class TokenBucket:
+    __slots__ = ('tokens', 'updated', 'full_at')
+
+    def __init__(self, rate, now):
+        self.tokens = float(rate)
+        self.updated = now
+        self.full_at = now # Kovanın yeniden tamamen dolacağı an; bu andan sonra kovayı atmak bir şey değiştirmez
+
+    def take(self, rule, now):
+        """Bir jeton harcar ve 0 döner; jeton yoksa bir sonraki jetona kalan süreyi (saniye) döner."""
+        refill_rate = rule.rate / rule.per
+        self.tokens = min(rule.rate, self.tokens + (now - self.updated) * refill_rate)
+        self.updated = now
+        retry_after = 0.0
+        if self.tokens >= 1:
+            self.tokens -= 1
+        else:
+            retry_after = (1 - self.tokens) / refill_rate
+        self.full_at = now + (rule.rate - self.tokens) / refill_rate
+        return retry_after
+
+class CommandCooldowns:
+    """
+    Sunucuya özel komut sınırlarını (command_cooldowns tablosu) ve kullanıcı/kanal/sunucu başına jeton kovalarını tutar.
+    consume() sözlük aramalarından ibarettir; yeni kova açıldığında listenin başındaki dolmuş kovalar atılır,
+    böylece her kova bir kez eklenip bir kez atıldığından bellek ve iş sabit kalır.
+    """
+    def __init__(self, database, max_buckets=COOLDOWN_MAX_BUCKETS):
+        self.db = database
+        self.max_buckets = max_buckets
+        self._overrides = {}                       # guild_id -> {komut: CooldownRule}
+        self._defaults = {name: CooldownRule(*rule) for name, rule in DEFAULT_COOLDOWNS.items()}
+        self._buckets = collections.OrderedDict()  # (guild_id, komut, kapsam_id) -> TokenBucket
+        self.limited = collections.Counter()       # komut -> reddedilen kullanım sayısı
+
+    async def load(self):
+        rows = await self.db.fetchall("SELECT guild_id, command_name, rate, per, scope FROM command_cooldowns")
+        self._overrides = {}
+        for guild_id, command_name, rate, per, scope in rows:
+            self._overrides.setdefault(guild_id, {})[command_name] = CooldownRule(rate, per, scope)
+        logger.info("Komut bekleme süreleri yüklendi: %d sunucuda %d özel ayar.", len(self._overrides), len(rows))
+
+    def rule(self, guild_id, command_name):
+        """Komutun bu sunucudaki sınırı; sınır yoksa None."""
+        rule = self._overrides.get(guild_id, {}).get(command_name) or self._defaults.get(command_name)
+        return rule if rule is not None and rule.rate else None
+
+    def rules(self, guild_id):
+        """Varsayılanlar ve sunucunun kendi ayarları birleştirilmiş halde, komut adına göre sıralı (komut, kural, özel mi) listesi."""
+        overrides = self._overrides.get(guild_id, {})
+        names = sorted(set(self._defaults) | set(overrides))
+        return [(name, overrides.get(name) or self._defaults[name], name in overrides) for name in names]
+
+    async def set(self, guild_id, command_name, rate, per, scope):
+        await self.db.execute("INSERT INTO command_cooldowns (guild_id, command_name, rate, per, scope) VALUES (?, ?, ?, ?, ?) "
+                              "ON CONFLICT(guild_id, command_name) DO UPDATE SET rate = excluded.rate, per = excluded.per, scope = excluded.scope",
+                              (guild_id, command_name, rate, per, scope))
+        self._overrides.setdefault(guild_id, {})[command_name] = CooldownRule(rate, per, scope)
+
+    async def reset(self, guild_id, command_name):
+        """Sunucunun özel ayarını siler (varsayılana döner). Silinecek ayar yoksa False."""
+        overrides = self._overrides.get(guild_id, {})
+        if command_name not in overrides:
+            return False
+        await self.db.execute("DELETE FROM command_cooldowns WHERE guild_id = ? AND command_name = ?", (guild_id, command_name))
+        del overrides[command_name]
+        if not overrides:
+            del self._overrides[guild_id]
+        return True
+
+    def forget_guild(self, guild_id):
+        """Veritabanından silinmiş sunucu ayarlarını bellekten düşürür. Kovalar zamanla kendiliğinden atılır."""
+        self._overrides.pop(guild_id, None)
+
+    def consume(self, ctx):
+        """Komutun kovasından bir jeton harcar; jeton kalmadıysa CommandOnCooldown fırlatır. Bot sahibi sınırlanmaz."""
+        if ctx.author.id == OWNER_ID:
+            return
+        guild_id = ctx.guild.id if ctx.guild is not None else 0
+        command_name = ctx.command.qualified_name
+        rule = self.rule(guild_id, command_name)
+        if rule is None:
+            return
+        scope_id = ctx.author.id if rule.scope == 'kullanıcı' else ctx.channel.id if rule.scope == 'kanal' else guild_id
+        key = (guild_id, command_name, scope_id)
+        now = time.monotonic()
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            self._evict(now)
+            bucket = self._buckets[key] = TokenBucket(rule.rate, now)
+        else:
+            self._buckets.move_to_end(key)
+        retry_after = bucket.take(rule, now)
+        if retry_after:
+            self.limited[command_name] += 1
+            raise commands.CommandOnCooldown(commands.Cooldown(rule.rate, rule.per), retry_after, COOLDOWN_SCOPES[rule.scope])
+
+    def _evict(self, now):
+        while self._buckets:
+            oldest = next(iter(self._buckets.values()))
+            if oldest.full_at > now and len(self._buckets) < self.max_buckets:
+                return
+            self._buckets.popitem(last=False)
+
+    @property
+    def bucket_count(self):
+        return len(self._buckets)
+
+command_cooldowns = CommandCooldowns(db)
+
+
+# --- Otorol Kuyruğu ---
+AUTOROLE_WORKERS = 4              # Aynı anda en fazla kaç sunucuya rol verilebileceği
+AUTOROLE_MAX_PENDING = 50_000     # Kuyrukta bekleyebilecek en fazla üye sayısı
+AUTOROLE_MAX_ATTEMPTS = 5         # Hız sınırı veya sunucu hatasında en fazla deneme sayısı
+AUTOROLE_BASE_BACKOFF = 1.0       # İlk yeniden denemeden önceki bekleme (saniye), her denemede iki katına çıkar
+AUTOROLE_MAX_BACKOFF = 30.0
+AUTOROLE_THROUGHPUT_WINDOW = 60.0 # Verim (rol/saniye) hesaplanırken bakılan zaman aralığı (saniye)
+
+class AutoroleQueue:
+    """
+    Yeni üyelere otorol veren arka plan kuyruğu.
+    Rol verme isteği (PUT /guilds/{guild_id}/members/...) Discord'da sunucu başına aynı hız sınırı kovasını kullanır.
+    Bu yüzden her sunucunun kendi sırası vardır ve bir sunucu için aynı anda tek istek yapılır;
+    sunucular arasında ise AUTOROLE_WORKERS kadar işçi sırayla (round-robin) çalışır.
+    429 veya 5xx hatalarında üstel geri çekilme ile yeniden denenir.
+    """
+    def __init__(self, bot_instance, workers=AUTOROLE_WORKERS):
+        self.bot = bot_instance
+        self.worker_count = workers
+        self._pending = {}             # guild_id -> deque[(member_id, role_id)], sırada veya işleniyor
+        self._ready = asyncio.Queue()  # İşlenmeyi bekleyen sunucu ID'leri
+        self._workers = []
+        self._completed_at = collections.deque(maxlen=10_000)
+        self.depth = 0
+        self.processed = 0
+        self.failed = 0
+        self.retried = 0
+        self.dropped = 0
+
+    def start(self):
+        if self._workers:
+            return
+        self._workers = [asyncio.create_task(self._worker(), name=f"otorol-{i}") for i in range(self.worker_count)]
+
+    async def stop(self):
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        if self.depth:
+            autorole_logger.warning("Kapanışta kuyrukta %d üye bekliyordu, bunlara rol verilmedi.", self.depth)
+
+    def enqueue(self, member, role_id):
+        if self.depth >= AUTOROLE_MAX_PENDING:
+            self.dropped += 1
+            autorole_logger.warning("Kuyruk dolu (%d). %s kullanıcısına otorol verilemedi.", self.depth, member.name, extra={'guild': member.guild.id, 'user': member.id})
+            return False
+        guild_queue = self._pending.get(member.guild.id)
+        if guild_queue is None:
+            guild_queue = self._pending[member.guild.id] = collections.deque()
+            self._ready.put_nowait(member.guild.id)
+        guild_queue.append((member.id, role_id))
+        self.depth += 1
+        return True
+
+    @property
+    def guild_count(self):
+        """Sırasında bekleyen üye olan sunucu sayısı."""
+        return len(self._pending)
+
+    def throughput(self):
+        """Son AUTOROLE_THROUGHPUT_WINDOW saniyede saniye başına verilen rol sayısı."""
+        cutoff = time.monotonic() - AUTOROLE_THROUGHPUT_WINDOW
+        recent = sum(1 for completed_at in reversed(self._completed_at) if completed_at >= cutoff)
+        return recent / AUTOROLE_THROUGHPUT_WINDOW
+
+    async def _worker(self):
+        while True:
+            guild_id = await self._ready.get()
+            guild_queue = self._pending[guild_id]
+            member_id, role_id = guild_queue.popleft()
+            self.depth -= 1
+            try:
+                await self._apply(guild_id, member_id, role_id)
+            except Exception as e:
+                self.failed += 1
+                autorole_logger.error("Rol verme hatası: %s", e, extra={'guild': guild_id, 'user': member_id})
+            finally:
+                # Sunucunun sırası boşalmadıysa, diğer sunuculardan sonra tekrar işlenmek üzere sona ekle
+                if guild_queue:
+                    self._ready.put_nowait(guild_id)
+                else:
+                    del self._pending[guild_id]
+
+    async def _apply(self, guild_id, member_id, role_id):
+        guild = self.bot.get_guild(guild_id)
+        if not guild:
+            return
+        member = await member_lookup.get(guild, member_id)
+        if not member:
+            return # Üye rol verilmeden önce ayrılmış
+        role = guild.get_role(role_id)
+        if not role:
+            self.failed += 1
+            autorole_logger.warning("Veritabanındaki ID (%s) ile otorol bulunamadı. Rol silinmiş olabilir.", role_id, extra={'guild': guild.id})
+            return
+        if guild.me.top_role <= role:
+            self.failed += 1
+            autorole_logger.warning("Botun rolü '%s' rolünden düşük. Otorol verilemedi.", role.name, extra={'guild': guild.id})
+            return
+
+        for attempt in range(AUTOROLE_MAX_ATTEMPTS):
+            try:
+                await member.add_roles(role, reason="Otorol")
+                self.processed += 1
+                self._completed_at.append(time.monotonic())
+                autorole_logger.info("%s kullanıcısına '%s' rolü otomatik olarak verildi.", member.name, role.name, extra={'guild': guild_id, 'user': member_id})
+                return
+            except discord.Forbidden:
+                self.failed += 1
+                autorole_logger.warning("Yetki hatası: %s kullanıcısına '%s' rolü verilemedi. Botun rolünü kontrol edin.", member.name, role.name, extra={'guild': guild_id, 'user': member_id})
+                return
+            except discord.NotFound:
+                return # Üye veya rol bu arada silinmiş
+            except discord.HTTPException as e:
+                if e.status != 429 and e.status < 500:
+                    self.failed += 1
+                    autorole_logger.error("Rol verme hatası: %s", e, extra={'guild': guild_id, 'user': member_id})
+                    return
+                delay = min(AUTOROLE_MAX_BACKOFF, AUTOROLE_BASE_BACKOFF * 2 ** attempt)
+                self.retried += 1
+                autorole_logger.info("%s için istek reddedildi (%s), %.0f saniye sonra tekrar denenecek.", member.name, e.status, delay, extra={'guild': guild_id, 'user': member_id})
+                await asyncio.sleep(delay)
+
+        self.failed += 1
+        autorole_logger.error("%s kullanıcısına %d denemede rol verilemedi.", member.name, AUTOROLE_MAX_ATTEMPTS, extra={'guild': guild_id, 'user': member_id})
+
+autorole_queue = AutoroleQueue(bot)
+
+# --- Hoş Geldin / Ayrılık Mesajı Birleştirici ---
+MEMBER_BURST_WINDOW = 10.0     # Yoğunluğun ölçüldüğü kayan pencere (saniye)
+MEMBER_BURST_THRESHOLD = 5     # Pencere içinde bu sayıdan fazla olay olursa mesajlar özet halinde gönderilir
+MEMBER_DIGEST_INTERVAL = 10.0  # Yoğunluk sırasında özet mesajlarının gönderilme aralığı (saniye)
+MEMBER_DIGEST_MAX_LISTED = 40  # Özet mesajında isim olarak listelenecek en fazla üye sayısı
+MEMBER_BURST_STATE_LIMIT = 10_000 # Bellekte tutulacak en fazla (sunucu, olay türü) durumu
+MEMBER_DIGEST_STOP_TIMEOUT = 5.0  # Kapanışta bekleyen özetlerin gönderilmesi için beklenecek en uzun süre (saniye)
+
+def build_welcome_embed(member, guild):
+    embed = discord.Embed(
+        title=f"Sunucumuza Hoş Geldiniz, {member.display_name}!",
+        description=f"{member.mention}, {guild.name} sunucusuna katıldı! Aramıza hoş geldin! 🎉",
+        color=discord.Color.green()
+    )
+    embed.set_thumbnail(url=member.avatar.url if member.avatar else member.default_avatar.url)
+    embed.set_footer(text=f"Şu an {guild.member_count} üyeyiz.")
+    embed.timestamp = datetime.now(timezone.utc)
+    return embed
+
+def build_leave_embed(member, guild):
+    # Ayrılan üye önbellekte değilse (hafif mod) burada discord.Member değil discord.User gelir
+    embed = discord.Embed(
+        title=f"Güle Güle, {member.display_name}!",
+        description=f"{member.name} sunucudan ayrıldı. Üye sayısı: {guild.member_count}",
+        color=discord.Color.red()
+    )
+    embed.set_thumbnail(url=member.avatar.url if member.avatar else member.default_avatar.url)
+    embed.timestamp = datetime.now(timezone.utc)
+    return embed
+
+class _MemberBurst:
+    __slots__ = ('timestamps', 'names', 'count', 'channel', 'flush_task')
+
+    def __init__(self):
+        self.timestamps = collections.deque()
+        self.names = []
+        self.count = 0
+        self.channel = None
+        self.flush_task = None
+
+class MemberEventCoalescer:
+    """
+    Hoş geldin ve ayrılık mesajlarını yoğunluk anlarında birleştirir.
+    Normal trafikte her üye için ayrı embed gönderilir. Bir sunucuda MEMBER_BURST_WINDOW saniye içinde
+    MEMBER_BURST_THRESHOLD'dan fazla katılım (veya ayrılık) olursa, sonraki üyeler biriktirilir ve
+    MEMBER_DIGEST_INTERVAL saniyede bir tek bir özet embed'i ile duyurulur.
+    """
+    def __init__(self):
+        self._bursts = collections.OrderedDict() # (guild_id, kind) -> _MemberBurst
+        self._scheduled = {}                     # Zamanlanmış veya gönderilmekte olan özet görevi -> (kind, guild, burst)
+
+    def _get_burst(self, guild_id, kind):
+        key = (guild_id, kind)
+        burst = self._bursts.get(key)
+        if burst is None:
+            burst = self._bursts[key] = _MemberBurst()
+            while len(self._bursts) > MEMBER_BURST_STATE_LIMIT:
+                self._bursts.popitem(last=False)
+        else:
+            self._bursts.move_to_end(key)
+        return burst
+
+    async def publish(self, kind, channel, member, build_embed):
+        """Mesaj hemen gönderildiyse True, özet için biriktirildiyse False döner."""
+        guild = channel.guild
+        burst = self._get_burst(guild.id, kind)
+        now = time.monotonic()
+        burst.timestamps.append(now)
+        while burst.timestamps and burst.timestamps[0] < now - MEMBER_BURST_WINDOW:
+            burst.timestamps.popleft()
+
+        if burst.flush_task is None and len(burst.timestamps) <= MEMBER_BURST_THRESHOLD:
+            await channel.send(embed=build_embed(member, guild))
+            return True
+
+        # Yoğunluk var: üyeyi özete ekle, özet zamanlanmamışsa zamanla
+        burst.count += 1
+        if len(burst.names) < MEMBER_DIGEST_MAX_LISTED:
+            burst.names.append(member.mention if kind == 'join' else member.name)
+        burst.channel = channel
+        if burst.flush_task is None:
+            burst.flush_task = asyncio.create_task(self._flush_later(kind, guild, burst))
+            self._scheduled[burst.flush_task] = (kind, guild, burst)
+            burst.flush_task.add_done_callback(lambda task: self._scheduled.pop(task, None))
+        return False
+
+    async def _flush_later(self, kind, guild, burst):
+        await asyncio.sleep(MEMBER_DIGEST_INTERVAL)
+        await self._flush(kind, guild, burst)
+
+    async def _flush(self, kind, guild, burst):
+        names, count, channel = burst.names, burst.count, burst.channel
+        burst.names, burst.count, burst.flush_task = [], 0, None
+        if not count:
+            return
+
+        listed = ", ".join(names)
+        if count > len(names):
+            listed += f" ve {count - len(names)} kişi daha"
+        if kind == 'join':
+            embed = discord.Embed(
+                title=f"🎉 Son {MEMBER_DIGEST_INTERVAL:.0f} saniyede {count} yeni üye katıldı!",
+                description=f"Aramıza hoş geldiniz: {listed}",
+                color=discord.Color.green()
+            )
+            embed.set_footer(text=f"Şu an {guild.member_count} üyeyiz.")
+        else:
+            embed = discord.Embed(
+                title=f"👋 Son {MEMBER_DIGEST_INTERVAL:.0f} saniyede {count} üye ayrıldı",
+                description=f"Ayrılanlar: {listed}",
+                color=discord.Color.red()
+            )
+            embed.set_footer(text=f"Üye sayısı: {guild.member_count}")
+        embed.timestamp = datetime.now(timezone.utc)
+        try:
+            await channel.send(embed=embed)
+            member_logger.info("'%s' sunucusunda %d üye tek özet mesajında duyuruldu.", guild.name, count, extra={'guild': guild.id, 'event': kind})
+        except discord.HTTPException as e:
+            member_logger.warning("Özet mesajı gönderilemedi: %s", e, extra={'guild': guild.id, 'event': kind})
+
+    async def stop(self, timeout=MEMBER_DIGEST_STOP_TIMEOUT):
+        """Zamanlanmış özetleri beklemeden gönderir; yeniden başlatmada son pencerenin üyeleri kaybolmasın."""
+        pending = []
+        for task, (kind, guild, burst) in list(self._scheduled.items()):
+            if burst.flush_task is task:
+                # Görev hâlâ bekliyor (_flush ilk iş olarak flush_task'ı sıfırlar); iptal edip özeti hemen gönder
+                task.cancel()
+                pending.append(self._flush(kind, guild, burst))
+            else:
+                pending.append(task) # Beklemesi bitmiş, şu anda gönderiliyor
+        if not pending:
+            return
+        try:
+            await asyncio.wait_for(asyncio.gather(*pending, return_exceptions=True), timeout)
+        except asyncio.TimeoutError:
+            member_logger.warning("Kapanışta bekleyen %d özet mesajı %.0f saniyede gönderilemedi.", len(pending), timeout)
+
+member_event_coalescer = MemberEventCoalescer()
+
+# --- Baskın (Raid) Koruması ---
+# Sunucu başına katılım hızı izlenir: kayan penceredeki katılım ağırlığı (yeni hesaplar iki kat sayılır) eşiği aşar ve
+# anlık katılım hızı (hızlı EMA) sunucunun uzun vadeli ortalamasının (yavaş EMA) belirgin biçimde üstündeyse baskın sayılır.
+# Baskında sunucu kilit moduna geçer: hoş geldin mesajları ve otorol durur, ayara göre yeni gelenler atılır veya
+# karantina rolü alır, log kanalına tek bir özet mesajı gönderilir ve kilit bitince güncellenir.
+RAID_EMA_FAST_TAU = 10.0       # Anlık katılım hızının zaman sabiti (saniye)
+RAID_EMA_SLOW_TAU = 3600.0     # Sunucunun olağan katılım hızının zaman sabiti (saniye)
+RAID_EMA_SPIKE_FACTOR = 5.0    # Anlık hız olağan hızın bu katını geçmezse pencere eşiği tek başına baskın saymaz
+RAID_SUMMARY_INTERVAL = 15.0   # Kilit sırasında özet mesajının en sık güncellenme aralığı (saniye)
+
+class RaidState:
+    """Bir sunucunun katılım sayaçları ve (varsa) devam eden kilit modu."""
+    __slots__ = ('joins', 'fast_rate', 'slow_rate', 'last_join', 'lockdown')
+
+    def __init__(self, threshold):
+        self.joins = RingBuffer(threshold)   # (zaman, ağırlık, üye); ağırlıklar en az 1 olduğundan eşik kadar kayıt yeterli
+        self.fast_rate = 0.0                 # katılım/saniye
+        self.slow_rate = 0.0
+        self.last_join = None
+        self.lockdown = None
+
+class RaidLockdown:
+    __slots__ = ('started_at', 'until', 'joins', 'actioned', 'failed', 'summary', 'embed', 'pending', 'worker', 'last_summary')
+
+    def __init__(self, until):
+        self.started_at = datetime.now(timezone.utc)
+        self.until = until
+        self.joins = 0
+        self.actioned = 0
+        self.failed = 0
+        self.summary = None                  # Log kanalındaki özet mesajı
+        self.embed = None                    # Özetin gönderilen embed'i; düzenlemeler mesaj geri okunmadan bu kopyadan yapılır
+        self.pending = collections.deque()   # Atılmayı bekleyen üyeler
+        self.worker = None
+        self.last_summary = 0.0
+
+class RaidGuard:
+    def __init__(self, bot_instance):
+        self.bot = bot_instance
+        self._states = {} # guild_id -> RaidState
+
+    def is_locked(self, guild_id):
+        state = self._states.get(guild_id)
+        return state is not None and state.lockdown is not None
+
+    def observe(self, member, settings):
+        """Katılımı sayaçlara işler. Sunucu kilit modundaysa (veya bu katılım kilidi başlattıysa) True döner."""
+        if not settings.raid_enabled:
+            return False
+        guild_id = member.guild.id
+        now = time.monotonic()
+        state = self._states.get(guild_id)
+        if state is None or state.joins.capacity != settings.raid_threshold:
+            state = self._reset_state(guild_id, state, settings.raid_threshold)
+
+        if state.last_join is not None:
+            elapsed = now - state.last_join
+            state.fast_rate *= math.exp(-elapsed / RAID_EMA_FAST_TAU)
+            state.slow_rate *= math.exp(-elapsed / RAID_EMA_SLOW_TAU)
+        state.fast_rate += 1 / RAID_EMA_FAST_TAU
+        state.slow_rate += 1 / RAID_EMA_SLOW_TAU
+        state.last_join = now
+
+        young = datetime.now(timezone.utc) - member.created_at < timedelta(days=settings.raid_account_age)
+        state.joins.append((now, 2 if young else 1, member))
+        weight = sum(w for joined_at, w, _ in state.joins if now - joined_at <= settings.raid_window)
+        tripped = weight >= settings.raid_threshold and state.fast_rate >= RAID_EMA_SPIKE_FACTOR * state.slow_rate
+
+        lockdown = state.lockdown
+        if lockdown is None:
+            if not tripped:
+                return False
+            lockdown = state.lockdown = RaidLockdown(now + settings.raid_lockdown * 60)
+            flood = [joined for joined_at, _, joined in state.joins if now - joined_at <= settings.raid_window]
+            lockdown.joins = len(flood)
+            self._queue_action(lockdown, settings, flood)
+            lockdown.worker = asyncio.create_task(self._run_lockdown(member.guild, lockdown, settings), name=f"baskin-{guild_id}")
+            moderation_logger.warning("Baskın algılandı: %d saniyede %d katılım ağırlığı. Sunucu kilit moduna alındı.", settings.raid_window, weight,
+                                      extra={'guild': guild_id})
+            return True
+
+        lockdown.joins += 1
+        if tripped:
+            lockdown.until = max(lockdown.until, now + settings.raid_lockdown * 60) # Baskın sürdükçe kilit uzar
+        self._queue_action(lockdown, settings, [member])
+        return True
+
+    def _reset_state(self, guild_id, old_state, threshold):
+        state = RaidState(threshold)
+        if old_state is not None: # Eşik değiştiyse sayaçlar ve devam eden kilit korunur
+            state.fast_rate, state.slow_rate, state.last_join, state.lockdown = old_state.fast_rate, old_state.slow_rate, old_state.last_join, old_state.lockdown
+        self._states[guild_id] = state
+        return state
+
+    def _queue_action(self, lockdown, settings, members):
+        if settings.raid_action == 'kick':
+            lockdown.pending.extend(members) # Kilit görevi sırayla atar
+        elif settings.raid_action == 'karantina' and settings.raid_quarantine_role_id:
+            # Rol verme otorol kuyruğundan geçer: sunucu başına sıralı ve hız sınırına uyumlu
+            for member in members:
+                if autorole_queue.enqueue(member, settings.raid_quarantine_role_id):
+                    lockdown.actioned += 1
+
+    async def _run_lockdown(self, guild, lockdown, settings):
+        try:
+            lockdown.embed = moderation_alert_embed("🚨 Baskın Algılandı", self._summary_text(lockdown, settings), discord.Color.red())
+            lockdown.summary = await send_moderation_embed(guild, lockdown.embed)
+            lockdown.last_summary = time.monotonic()
+            while time.monotonic() < lockdown.until or lockdown.pending:
+                if lockdown.pending:
+                    await self._kick(guild, lockdown, lockdown.pending.popleft())
+                else:
+                    await asyncio.sleep(min(1.0, max(0.0, lockdown.until - time.monotonic())))
+                if time.monotonic() - lockdown.last_summary >= RAID_SUMMARY_INTERVAL:
+                    await self._update_summary(guild, lockdown, settings)
+        except asyncio.CancelledError:
+            pass # raid_bitir ile elle bitirildi veya bot kapanıyor
+        except Exception as e:
+            moderation_logger.exception("Kilit modu hatası: %s", e, extra={'guild': guild.id})
+        finally:
+            state = self._states.get(guild.id)
+            if state is not None and state.lockdown is lockdown:
+                state.lockdown = None
+            lockdown.until = time.monotonic()
+            await self._update_summary(guild, lockdown, settings, finished=True)
+            moderation_logger.warning("Kilit modu bitti: %d katılım, %d işlem, %d başarısız.", lockdown.joins, lockdown.actioned, lockdown.failed,
+                                      extra={'guild': guild.id})
+
+    async def _kick(self, guild, lockdown, member):
+        try:
+            await guild.kick(member, reason="Baskın koruması")
+            lockdown.actioned += 1
+        except discord.NotFound:
+            pass # Üye zaten ayrılmış
+        except discord.HTTPException as e:
+            lockdown.failed += 1
+            moderation_logger.warning("Baskın sırasında üye atılamadı: %s", e, extra={'guild': guild.id, 'user': member.id})
+
+    def _summary_text(self, lockdown, settings):
+        action = {'yok': "yok (sadece kilit)", 'kick': "atma", 'karantina': "karantina rolü"}[settings.raid_action]
+        status = "Kilit modu **bitti**." if lockdown.until <= time.monotonic() else \
+                 f"Kilit modu <t:{int(time.time() + lockdown.until - time.monotonic())}:R> bitecek (katılımlar sürerse uzar)."
+        return (f"Katılım hızı eşiği aşıldı. Hoş geldin mesajları ve otorol askıya alındı.\n"
+                f"**Katılım:** {lockdown.joins}\n**İşlem:** {action}, {lockdown.actioned} üye"
+                + (f", {lockdown.failed} başarısız" if lockdown.failed else "") + f"\n{status}")
+
+    async def _update_summary(self, guild, lockdown, settings, finished=False):
+        lockdown.last_summary = time.monotonic()
+        if lockdown.summary is None or lockdown.embed is None:
+            return
+        try:
+            lockdown.embed.description = self._summary_text(lockdown, settings)
+            if finished:
+                lockdown.embed.color = discord.Color.green()
+            await lockdown.summary.edit(embed=lockdown.embed)
+        except Exception as e: # Özet güncellenemezse kilit işleyişi ve kilidin kalkması etkilenmesin
+            moderation_logger.warning("Baskın özeti güncellenemedi: %s", e, extra={'guild': guild.id})
+
+    def end_lockdown(self, guild_id):
+        """Devam eden kilidi bitirir; kilit yoksa False döner."""
+        state = self._states.get(guild_id)
+        if state is None or state.lockdown is None:
+            return False
+        state.lockdown.pending.clear()
+        state.lockdown.worker.cancel()
+        return True
+
+    def stop(self):
+        for state in self._states.values():
+            if state.lockdown is not None:
+                state.lockdown.worker.cancel()
+
+raid_guard = RaidGuard(bot)
+
 # Yeni bir üye sunucuya katıldığında çalışacak olay
 @bot.event
+@timed_event('on_member_join')
 async def on_member_join(member):
     guild = member.guild
-    async with aiosqlite.connect('bot_settings.db') as db:
-        # Hoş geldin kanalı ayarını al
-        cursor = await db.execute("SELECT welcome_channel_id FROM guild_settings WHERE guild_id = ?", (guild.id,))
-        welcome_result = await cursor.fetchone()
-        
-        # Otorol ayarını al
-        cursor = await db.execute("SELECT role_id FROM autoroles WHERE guild_id = ?", (guild.id,))
-        autorole_result = await cursor.fetchone()
+    if LEAN_GATEWAY:
+        member_lookup.put(member) # Otorol kuyruğu üyeyi tekrar API'den çekmek zorunda kalmasın
+    # Hoş geldin kanalı ve otorol ayarlarını önbellekten al
+    settings = await guild_settings_cache.get(guild.id)
+
+    # Baskın sırasında (kilit modu) hoş geldin mesajı ve otorol askıya alınır
+    if raid_guard.observe(member, settings):
+        member_logger.info("%s kilit modunda katıldı; hoş geldin ve otorol atlandı.", member.name, extra={'guild': guild.id, 'user': member.id, 'event': 'join'})
+        return
 
     # Hoş geldin mesajı gönderme kısmı
-    if welcome_result:
-        welcome_channel_id = welcome_result[0]
+    if settings.welcome_channel_id:
+        welcome_channel_id = settings.welcome_channel_id
         welcome_channel = guild.get_channel(welcome_channel_id)
 
         if welcome_channel:
-            embed = discord.Embed(
-                title=f"Sunucumuza Hoş Geldiniz, {member.display_name}!",
-                description=f"{member.mention}, {guild.name} sunucusuna katıldı! Aramıza hoş geldin! 🎉",
-                color=discord.Color.green()
-            )
-            embed.set_thumbnail(url=member.avatar.url if member.avatar else member.default_avatar.url)
-            embed.set_footer(text=f"Şu an {guild.member_count} üyeyiz.")
-            embed.timestamp = datetime.now(timezone.utc)
-
-            await welcome_channel.send(embed=embed)
-            print(f"[Hoş Geldin] {member.name} sunucuya katıldı. Mesaj '{welcome_channel.name}' kanalına gönderildi.")
+            if await member_event_coalescer.publish('join', welcome_channel, member, build_welcome_embed):
+                member_logger.info("%s sunucuya katıldı. Mesaj '%s' kanalına gönderildi.", member.name, welcome_channel.name, extra={'guild': guild.id, 'user': member.id, 'event': 'join'})
+            else:
+                member_logger.info("%s sunucuya katıldı. Yoğunluk nedeniyle özet mesajına eklendi.", member.name, extra={'guild': guild.id, 'user': member.id, 'event': 'join'})
         else:
-            print(f"[Hoş Geldin Hatası] Veritabanındaki ID ({welcome_channel_id}) ile hoş geldin kanalı bulunamadı. Kanal silinmiş olabilir.")
+            member_logger.warning("Veritabanındaki ID (%s) ile hoş geldin kanalı bulunamadı. Kanal silinmiş olabilir.", welcome_channel_id, extra={'guild': guild.id, 'event': 'join'})
     else:
-        print(f"[Hoş Geldin] {member.name} sunucuya katıldı. Bu sunucu için hoş geldin kanalı ayarlanmamış.")
+        member_logger.debug("%s sunucuya katıldı. Bu sunucu için hoş geldin kanalı ayarlanmamış.", member.name, extra={'guild': guild.id, 'user': member.id, 'event': 'join'})
 
     # Otorol verme kısmı
-    if autorole_result:
-        role_id = autorole_result[0]
+    if settings.autorole_id:
+        role_id = settings.autorole_id
         role = guild.get_role(role_id)
         
         if role:
             # Botun rol hiyerarşisi kontrolü
             if guild.me.top_role <= role:
-                print(f"[Otorol Hatası] Botun rolü '{role.name}' rolünden düşük. Otorol verilemedi.")
+                autorole_logger.warning("Botun rolü '%s' rolünden düşük. Otorol verilemedi.", role.name, extra={'guild': guild.id})
                 # Bu hata mesajını kullanıcıya göndermemek daha iyi, çünkü on_member_join arka planda çalışır.
                 return
             
-            try:
-                await member.add_roles(role)
-                print(f"[Otorol] {member.name} kullanıcısına '{role.name}' rolü otomatik olarak verildi.")
-            except discord.Forbidden:
-                print(f"[Otorol Hatası] Yetki hatası: {member.name} kullanıcısına '{role.name}' rolü verilemedi. Botun rolünü kontrol edin.")
-            except Exception as e:
-                print(f"[Otorol Hatası] Rol verme hatası: {e}")
+            # Rol burada verilmez, kuyruğa eklenir; böylece toplu katılımlarda olay döngüsü rol isteklerini beklemez
+            autorole_queue.enqueue(member, role.id)
         else:
-            print(f"[Otorol Hatası] Veritabanındaki ID ({role_id}) ile otorol bulunamadı. Rol silinmiş olabilir.")
+            autorole_logger.warning("Veritabanındaki ID (%s) ile otorol bulunamadı. Rol silinmiş olabilir.", role_id, extra={'guild': guild.id})
 
 # Bir üye sunucudan ayrıldığında çalışacak olay
+# on_member_remove sadece önbellekteki üyeler için tetiklenir; hafif modda da çalışması için raw olayı kullanıyoruz
 @bot.event
-async def on_member_remove(member):
-    guild = member.guild
-    async with aiosqlite.connect('bot_settings.db') as db:
-        cursor = await db.execute("SELECT welcome_channel_id FROM guild_settings WHERE guild_id = ?", (guild.id,))
-        result = await cursor.fetchone()
+@timed_event('on_raw_member_remove')
+async def on_raw_member_remove(payload):
+    guild = bot.get_guild(payload.guild_id)
+    if not guild:
+        return
+    member = payload.user # Önbellekteyse discord.Member, değilse discord.User
+    member_lookup.invalidate(guild.id, member.id)
+    settings = await guild_settings_cache.get(guild.id)
+
+    if settings.welcome_channel_id:
+        leave_log_channel_id = settings.welcome_channel_id # Genellikle hoş geldin kanalı log kanalı olarak da kullanılır
+        leave_channel = guild.get_channel(leave_log_channel_id)
+
+        if leave_channel:
+            if await member_event_coalescer.publish('leave', leave_channel, member, build_leave_embed):
+                member_logger.info("%s sunucudan ayrıldı. Mesaj '%s' kanalına gönderildi.", member.name, leave_channel.name, extra={'guild': guild.id, 'user': member.id, 'event': 'leave'})
+            else:
+                member_logger.info("%s sunucudan ayrıldı. Yoğunluk nedeniyle özet mesajına eklendi.", member.name, extra={'guild': guild.id, 'user': member.id, 'event': 'leave'})
+        else:
+            member_logger.warning("Veritabanındaki ID (%s) ile ayrılık kanalı bulunamadı. Kanal silinmiş olabilir.", leave_log_channel_id, extra={'guild': guild.id, 'event': 'leave'})
+    else:
+        member_logger.debug("%s sunucudan ayrıldı. Bu sunucu için ayrılık kanalı ayarlanmamış (varsayılan hoş geldin kanalı kullanıldı).", member.name, extra={'guild': guild.id, 'user': member.id, 'event': 'leave'})
+
+# --- Moderasyon Uyarıları ---
+def moderation_alert_embed(title, description, color=discord.Color.orange()):
+    embed = discord.Embed(title=title, description=description, color=color)
+    embed.timestamp = datetime.now(timezone.utc)
+    return embed
+
+async def send_moderation_alert(guild, title, description, color=discord.Color.orange()):
+    """
+    Otomatik moderasyon uyarısını sunucunun log kanalına gönderir ve mesajı döner (kanal yoksa None).
+    Ayrı bir moderasyon log kanalı olmadığından ticket log kanalı kullanılır.
+    """
+    return await send_moderation_embed(guild, moderation_alert_embed(title, description, color))
+
+async def send_moderation_embed(guild, embed):
+    settings = await guild_settings_cache.get(guild.id)
+    channel = guild.get_channel(settings.ticket_log_channel_id) if settings.ticket_log_channel_id else None
+    if channel is None:
+        return None
+    try:
+        return await channel.send(embed=embed)
+    except discord.HTTPException as e:
+        moderation_logger.warning("Moderasyon uyarısı gönderilemedi: %s", e, extra={'guild': guild.id})
+        return None
+
+# --- Spam Koruması ---
+# on_message'da komutlar işlenmeden önce çalışan otomatik moderasyon. Her kullanıcı ve kanal için sabit boyutlu halka
+# tamponlar (RingBuffer) tutulur, tablolar da LRU ile sınırlıdır; bu yüzden mesaj başına iş ve bellek sabittir.
+ANTI_SPAM_ENABLED = os.getenv('ANTI_SPAM', '1').lower() in ('1', 'true', 'evet')
+SPAM_WINDOW = 5.0                    # Mesaj hızının ölçüldüğü kayan pencere (saniye)
+SPAM_USER_MAX_MESSAGES = 6           # Bir kullanıcının pencere içinde gönderebileceği en fazla mesaj
+SPAM_CHANNEL_MAX_MESSAGES = 25       # Bir kanala pencere içinde gelebilecek en fazla mesaj; aşılırsa uyarı verilir
+SPAM_DUPLICATE_WINDOW = 30.0         # Tekrarlanan mesajlara bakılan süre (saniye)
+SPAM_DUPLICATE_MAX = 3               # Pencere içinde aynı (veya neredeyse aynı) mesajın en fazla gönderilme sayısı
+SPAM_DUPLICATE_HISTORY = 8           # Kullanıcı başına tutulan son mesaj özeti sayısı
+SPAM_DUPLICATE_MIN_LENGTH = 8        # Özeti bundan kısa mesajlar ("ok", "evet", "xd") tekrar sayılmaz
+SPAM_HASH_PREFIX = 256               # Özet çıkarılırken bakılan en fazla karakter, uzun mesajlar işi büyütmesin
+SPAM_TRACKED_USERS = 10_000          # Bellekte tutulan en fazla kullanıcı; dolunca en uzun süredir yazmayan atılır
+SPAM_TRACKED_CHANNELS = 5_000
+SPAM_TIMEOUT = timedelta(minutes=5)  # Spam yapan üyeye verilen zaman aşımı
+SPAM_ACTION_COOLDOWN = 30.0          # Aynı kullanıcı veya kanal için tekrar işlem yapılmadan önce beklenen süre (saniye)
+
+_SPAM_NOISE = re.compile(r'[\W_]+')      # Boşluk, noktalama ve emojiler
+_SPAM_REPEATS = re.compile(r'(.)(?=\1)') # Tekrarlanan harfin sonuncusu dışındakiler: "selaaaam" -> "selam"
+
+def spam_fingerprint(content):
+    """
+    Büyük/küçük harf, boşluk, noktalama ve uzatılmış harf farklarını yok sayan mesaj özeti.
+    Kısa sohbet cevapları sık tekrarlandığından SPAM_DUPLICATE_MIN_LENGTH karakterden kısa özetler için None döner.
+    """
+    text = _SPAM_REPEATS.sub('', _SPAM_NOISE.sub('', content[:SPAM_HASH_PREFIX].casefold()))
+    return hash(text) if len(text) >= SPAM_DUPLICATE_MIN_LENGTH else None
+
+class RingBuffer:
+    """Sabit kapasiteli halka tampon; dolunca en eski öğenin üzerine yazar. Küçük kapasitelerde deque'den çok daha az yer kaplar."""
+    __slots__ = ('_items', '_next', '_count')
+
+    def __init__(self, capacity):
+        self._items = [None] * capacity
+        self._next = 0
+        self._count = 0
+
+    def append(self, item):
+        self._items[self._next] = item
+        self._next = (self._next + 1) % len(self._items)
+        if self._count < len(self._items):
+            self._count += 1
+
+    @property
+    def capacity(self):
+        return len(self._items)
+
+    @property
+    def full(self):
+        return self._count == len(self._items)
+
+    def oldest(self):
+        return self._items[self._next] if self.full else self._items[0]
+
+    def __len__(self):
+        return self._count
+
+    def __iter__(self):
+        start = self._next if self.full else 0
+        for offset in range(self._count):
+            yield self._items[(start + offset) % len(self._items)]
+
+class SpamUserState:
+    __slots__ = ('recent', 'fingerprints', 'last_action')
+
+    def __init__(self):
+        self.recent = RingBuffer(SPAM_USER_MAX_MESSAGES + 1)        # (zaman, kanal_id, mesaj_id)
+        self.fingerprints = RingBuffer(SPAM_DUPLICATE_HISTORY)       # (zaman, özet, kanal_id, mesaj_id)
+        self.last_action = -math.inf
+
+class SpamChannelState:
+    __slots__ = ('recent', 'last_action')
+
+    def __init__(self):
+        self.recent = RingBuffer(SPAM_CHANNEL_MAX_MESSAGES + 1)     # Mesaj zamanları
+        self.last_action = -math.inf
+
+class AntiSpam:
+    """
+    Kullanıcı bazında mesaj hızı ve tekrarlanan mesaj, kanal bazında toplam mesaj hızı sınırlarını denetler.
+    Sınır aşıldığında mesajlar komut olarak işlenmez; silme, zaman aşımı ve uyarı arka planda yapılır ki
+    on_message beklemesin. Mesajları yönetme yetkisi olan üyeler ve botlar denetlenmez. Komut mesajları tekrar
+    sayılmaz (komut bekleme süreleri onları zaten sınırlar); tekrarlanan mesajlarda sunucu spam_tekrar ile
+    cezayı açmadıysa sadece uyarı gönderilir.
+    """
+    def __init__(self, max_users=SPAM_TRACKED_USERS, max_channels=SPAM_TRACKED_CHANNELS):
+        self.max_users = max_users
+        self.max_channels = max_channels
+        self._users = collections.OrderedDict()     # (guild_id, user_id) -> SpamUserState
+        self._channels = collections.OrderedDict()  # channel_id -> SpamChannelState
+        self._tasks = set()
+        self.actions = collections.Counter()        # işlem türü -> sayı
+
+    async def check(self, message):
+        """Mesaj spam olarak değerlendirildiyse True döner (komut olarak işlenmemeli)."""
+        if not ANTI_SPAM_ENABLED or message.guild is None or message.author.bot:
+            return False
+        now = time.monotonic()
+        self._check_channel(message, now)
+
+        state = self._lookup(self._users, (message.guild.id, message.author.id), SpamUserState, self.max_users)
+        state.recent.append((now, message.channel.id, message.id))
+        flooding = state.recent.full and now - state.recent.oldest()[0] <= SPAM_WINDOW
+
+        fingerprint = None if await self._is_command(message) else spam_fingerprint(message.content)
+        duplicates = []
+        if fingerprint is not None:
+            duplicates = [(channel_id, message_id) for seen_at, seen, channel_id, message_id in state.fingerprints
+                          if seen == fingerprint and now - seen_at <= SPAM_DUPLICATE_WINDOW]
+            state.fingerprints.append((now, fingerprint, message.channel.id, message.id))
+        repeating = len(duplicates) + 1 > SPAM_DUPLICATE_MAX
+
+        if not (flooding or repeating):
+            return False
+        if message.channel.permissions_for(message.author).manage_messages:
+            return False # Yetkililer (ve sunucu sahibi) muaf; bu hesap sadece sınır aşıldığında yapılır
+        if now - state.last_action >= SPAM_ACTION_COOLDOWN:
+            state.last_action = now
+            if flooding:
+                reason = f"{SPAM_WINDOW:.0f} saniyede {len(state.recent)} mesaj"
+                targets = [(channel_id, message_id) for _, channel_id, message_id in state.recent]
+            else:
+                reason = f"aynı mesaj {len(duplicates) + 1} kez tekrarlandı"
+                targets = duplicates + [(message.channel.id, message.id)]
+            self._spawn(self._punish(message.author, reason, targets, duplicate=not flooding))
+        return True
+
+    @staticmethod
+    async def _is_command(message):
+        # Botun kendi önek çözümlemesi kullanılır; etiketle (<@id> ve <@!id>) yazılan komutlar da tanınır
+        if not message.content:
+            return False
+        prefixes = await bot.get_prefix(message)
+        if isinstance(prefixes, str):
+            prefixes = [prefixes]
+        return message.content.startswith((*prefixes, *commands.when_mentioned(bot, message)))
+
+    def _check_channel(self, message, now):
+        state = self._lookup(self._channels, message.channel.id, SpamChannelState, self.max_channels)
+        state.recent.append(now)
+        if state.recent.full and now - state.recent.oldest() <= SPAM_WINDOW \
+                and now - state.last_action >= SPAM_ACTION_COOLDOWN:
+            state.last_action = now
+            self.actions['channel_flood'] += 1
+            moderation_logger.warning("'%s' kanalında mesaj seli: %d saniyede %d mesaj.", message.channel.name, SPAM_WINDOW, len(state.recent),
+                                      extra={'guild': message.guild.id, 'channel': message.channel.id})
+            self._spawn(send_moderation_alert(message.guild, "🛡️ Spam Koruması",
+                                              f"{message.channel.mention} kanalında mesaj seli: {SPAM_WINDOW:.0f} saniyede "
+                                              f"{len(state.recent)}+ mesaj. Yavaş mod açmayı düşünebilirsiniz."))
+
+    @staticmethod
+    def _lookup(table, key, factory, max_size):
+        state = table.get(key)
+        if state is None:
+            state = table[key] = factory()
+            if len(table) > max_size:
+                table.popitem(last=False) # En uzun süredir mesaj atmayanı at
+        else:
+            table.move_to_end(key)
+        return state
+
+    def _spawn(self, coro):
+        task = asyncio.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _punish(self, member, reason, targets, duplicate=False):
+        guild = member.guild
+        by_channel = collections.defaultdict(list)
+        for channel_id, message_id in targets:
+            by_channel[channel_id].append(message_id)
+        deleted = 0
+        try:
+            if duplicate and not (await guild_settings_cache.get(guild.id)).spam_punish_duplicates:
+                self.actions['duplicate_alert'] += 1
+                moderation_logger.info("Spam koruması: %s (%s), sadece uyarı verildi.", member, reason, extra={'guild': guild.id, 'user': member.id})
+                await send_moderation_alert(guild, "🛡️ Spam Koruması", f"{member.mention} aynı mesajı tekrarlıyor ({reason}). "
+                                            f"Mesajları silip zaman aşımı vermem için `{USAGE_PREFIX}spam_tekrar ceza` kullanın.")
+                return
+            for channel_id, message_ids in by_channel.items():
+                channel = guild.get_channel_or_thread(channel_id)
+                if channel is not None:
+                    engine = PurgeEngine(channel, len(message_ids), None)
+                    deleted += await engine.delete_known([channel.get_partial_message(message_id) for message_id in message_ids])
+            self.actions['delete'] += 1
+
+            timed_out = False
+            try:
+                await member.timeout(SPAM_TIMEOUT, reason=f"Spam koruması: {reason}")
+                timed_out = True
+                self.actions['timeout'] += 1
+            except discord.Forbidden:
+                moderation_logger.warning("%s kullanıcısına zaman aşımı verme yetkim yok.", member, extra={'guild': guild.id, 'user': member.id})
 
-    if result:
-        leave_log_channel_id = result[0] # Genellikle hoş geldin kanalı log kanalı olarak da kullanılır
-        leave_channel = guild.get_channel(leave_log_channel_id)
+            moderation_logger.warning("Spam koruması: %s (%s), %d mesaj silindi%s.", member, reason, deleted, ", zaman aşımı verildi" if timed_out else "",
+                                      extra={'guild': guild.id, 'user': member.id})
+            await send_moderation_alert(guild, "🛡️ Spam Koruması", f"{member.mention} spam yaptı ({reason}). {deleted} mesaj silindi"
+                                     + (f", {int(SPAM_TIMEOUT.total_seconds() // 60)} dakika zaman aşımı verildi." if timed_out else "."))
+        except Exception as e:
+            moderation_logger.exception("Spam koruması işlem hatası: %s", e, extra={'guild': guild.id, 'user': member.id})
 
-        if leave_channel:
-            embed = discord.Embed(
-                title=f"Güle Güle, {member.display_name}!",
-                description=f"{member.name} sunucudan ayrıldı. Üye sayısı: {guild.member_count}",
-                color=discord.Color.red()
-            )
-            embed.set_thumbnail(url=member.avatar.url if member.avatar else member.default_avatar.url)
-            embed.timestamp = datetime.now(timezone.utc)
-            await leave_channel.send(embed=embed)
-            print(f"[Ayrılık] {member.name} sunucudan ayrıldı. Mesaj '{leave_channel.name}' kanalına gönderildi.")
-        else:
-            print(f"[Ayrılık Hatası] Veritabanındaki ID ({leave_log_channel_id}) ile ayrılık kanalı bulunamadı. Kanal silinmiş olabilir.")
-    else:
-        print(f"[Ayrılık] {member.name} sunucudan ayrıldı. Bu sunucu için ayrılık kanalı ayarlanmamış (varsayılan hoş geldin kanalı kullanıldı).")
+    @property
+    def tracked_users(self):
+        return len(self._users)
+
+anti_spam = AntiSpam()
 
-# on_message olayı sadece komutları işlemek için kullanılır
+# on_message olayı spam kontrolünden geçen mesajlardaki komutları işler
 # Artık sessiz kanal veya kilitli bot kontrolleri direkt komut decorator'larında yapılıyor
 @bot.event
+@timed_event('on_message')
 async def on_message(message):
     # Botun kendi mesajlarını yok say
     if message.author == bot.user:
         return
     
-    # Komutları işlemek için
-    await bot.process_commands(message)
+    # Spam olarak işaretlenen mesajlar komut olarak işlenmez
+    if await anti_spam.check(message):
+        return
+
+    # Komutları işlemek için (sadece slash modunda mesajlar komut olarak ayrıştırılmaz)
+    if not SLASH_ONLY:
+        await bot.process_commands(message)
+
+# --- Yardım Menüsü ---
+# Yardım içeriği her çağrıda bot.commands üzerinden yeniden üretilmez. Komutlar kaydedildiğinde (veya değiştiğinde)
+# bir kez hesaplanır; kilit durumu ve sahip/üye ayrımı için hazır sayfa listeleri bellekte tutulur.
+HELP_CATEGORIES = [
+    # (başlık, komut adları, sadece sahip mi)
+    ("Genel Komutlar", ['ping', 'yardım'], False),
+    ("Moderasyon Komutları", ['kick', 'ban', 'unban', 'toplu_ban', 'toplu_kick', 'toplu_unban', 'clear', 'kanala_mesaj', 'duyuru', 'ticket_ara', 'ticket_arsiv'], False),
+    ("Eğlence Komutları", ['zar', 'yazıtura', '8ball'], False),
+    ("Bilgi Komutları", ['sunucu_bilgi', 'kullanıcı_bilgi'], False),
+    ("Ayarlar", ['ayarla_hosgeldin', 'sifirla_hosgeldin', 'reaksiyon_rolu_ayarla',
+                 'sessiz_kanal_ayarla', 'sessiz_kanal_sifirla',
+                 'otorol_ayarla', 'otorol_sifirla', 'raid_ayarla', 'raid_bitir', 'spam_tekrar',
+                 'bekleme_ayarla', 'bekleme_sifirla', 'bekleme_listesi',
+                 'ayarla_ticket', 'ticket_aç', 'ticket_kapat',
+                 'gönder_ticket_butonu'], False),
+    ("Sahibe Özel Komutlar", ['kapat', 'değiştir_durum', 'kilitle_bot', 'kilidi_aç_bot', 'otorol_kuyruk', 'istatistik'], True),
+]
+HELP_OTHER_CATEGORY = "Diğer Komutlar" # Hiçbir kategoriye uymayan komutlar
+HELP_FIELD_LIMIT = 1024      # Discord'un embed alanı değer sınırı
+HELP_PAGE_MAX_FIELDS = 8     # Sayfa başına en fazla alan
+HELP_PAGE_CHAR_LIMIT = 4000  # Sayfa başına toplam karakter (Discord'un embed sınırı 6000)
+
+def split_help_lines(lines, limit=HELP_FIELD_LIMIT):
+    """Satırları, hiçbir satırı bölmeden her biri limit karakteri aşmayan parçalara ayırır."""
+    chunks, current, size = [], [], 0
+    for line in lines:
+        if len(line) > limit:
+            line = line[:limit - 1] + "…"
+        if current and size + len(line) + 1 > limit:
+            chunks.append("\n".join(current))
+            current, size = [], 0
+        current.append(line)
+        size += len(line) + 1
+    if current:
+        chunks.append("\n".join(current))
+    return chunks
+
+class HelpCatalog:
+    """
+    Kategorilere ayrılmış, sayfalanmış yardım embed'leri. Komut eklenip çıkarıldığında geçersiz kılınır ve
+    ilk ihtiyaçta yeniden hesaplanır; yardım komutu yalnızca hazır sayfaları döner.
+    """
+    def __init__(self, bot_instance):
+        self.bot = bot_instance
+        self._pages = None # {(kilitli_görünüm, sahip): [discord.Embed, ...]}
+
+    def invalidate(self):
+        self._pages = None
+
+    def pages(self, locked, is_owner):
+        if self._pages is None:
+            self._pages = self._build()
+        # Sahip, kilitli olsa da olmasa da tüm komutları görür
+        return self._pages[(locked and not is_owner, is_owner)]
+
+    def _build(self):
+        category_of = {name: (title, owner_only) for title, names, owner_only in HELP_CATEGORIES for name in names}
+        position = {name: index for index, name in enumerate(category_of)} # Kategori içinde HELP_CATEGORIES sırası korunur
+        order = [title for title, _, _ in HELP_CATEGORIES] + [HELP_OTHER_CATEGORY]
+        lines = {True: collections.defaultdict(list), False: collections.defaultdict(list)} # sahip mi -> kategori -> satırlar
+        for command in sorted(self.bot.commands, key=lambda c: (position.get(c.name, len(position)), c.name)):
+            title, owner_only = category_of.get(command.name, (HELP_OTHER_CATEGORY, False))
+            line = f"`{USAGE_PREFIX}{command.name}`: {usage_text(command.help or 'Açıklama yok.')}"
+            lines[True][title].append(line)
+            # Gizli komutları ve sahibe özel kategoriyi sahibinden başkasına gösterme
+            if not command.hidden and not owner_only:
+                lines[False][title].append(line)
+
+        owner_commands = ", ".join(f"`{USAGE_PREFIX}{name}`" for name in category_of if category_of[name][1] and self.bot.get_command(name))
+        locked_embed = discord.Embed(
+            title="Bot Komutları",
+            description="Bot şu anda geliştirme modunda kilitlidir. Komutları sadece bot sahibi kullanabilir.\n\n",
+            color=discord.Color.blue()
+        )
+        locked_embed.add_field(name="Sadece Sahibe Özel Komutlar", value=owner_commands or "Yok", inline=False)
+
+        return {
+            (True, False): [locked_embed],
+            (False, False): self._paginate([(title, lines[False][title]) for title in order]),
+            (False, True): self._paginate([(title, lines[True][title]) for title in order]),
+        }
+
+    def _paginate(self, categories):
+        fields = []
+        for title, category_lines in categories:
+            chunks = split_help_lines(category_lines)
+            for index, chunk in enumerate(chunks):
+                fields.append((title if index == 0 else f"{title} (devam)", chunk))
+
+        pages, current, size = [], [], 0
+        for name, value in fields:
+            if current and (len(current) >= HELP_PAGE_MAX_FIELDS or size + len(name) + len(value) > HELP_PAGE_CHAR_LIMIT):
+                pages.append(current)
+                current, size = [], 0
+            current.append((name, value))
+            size += len(name) + len(value)
+        pages.append(current)
+
+        embeds = []
+        for number, page_fields in enumerate(pages, start=1):
+            embed = discord.Embed(title="Bot Komutları", description="İşte kullanabileceğim komutlar:", color=discord.Color.blue())
+            for name, value in page_fields:
+                embed.add_field(name=name, value=value, inline=False)
+            if len(pages) > 1:
+                embed.set_footer(text=f"Sayfa {number}/{len(pages)}")
+            embeds.append(embed)
+        return embeds
+
+help_catalog = HelpCatalog(bot)
+
+class HelpPageView(discord.ui.View):
+    """Yardım sayfaları arasında gezinmek için önceki/sonraki butonları."""
+    def __init__(self, author_id, pages):
+        super().__init__(timeout=120)
+        self.author_id = author_id
+        self.pages = pages
+        self.page = 0
+        self._update_buttons()
+
+    def _update_buttons(self):
+        self.previous_page.disabled = self.page <= 0
+        self.next_page.disabled = self.page >= len(self.pages) - 1
+
+    async def interaction_check(self, interaction: discord.Interaction):
+        if interaction.user.id != self.author_id:
+            await interaction.response.send_message("Bu yardım menüsünde sadece komutu kullanan kişi gezinebilir.", ephemeral=True)
+            return False
+        return True
+
+    async def _show_page(self, interaction):
+        self._update_buttons()
+        await interaction.response.edit_message(embed=self.pages[self.page], view=self)
+
+    @discord.ui.button(label="Önceki", style=discord.ButtonStyle.secondary, emoji="◀️")
+    async def previous_page(self, interaction: discord.Interaction, button: discord.ui.Button):
+        self.page -= 1
+        await self._show_page(interaction)
+
+    @discord.ui.button(label="Sonraki", style=discord.ButtonStyle.secondary, emoji="▶️")
+    async def next_page(self, interaction: discord.Interaction, button: discord.ui.Button):
+        self.page += 1
+        await self._show_page(interaction)
 
 # --- Genel Komutlar ---
 
-@bot.command(name='ping', help='Botun gecikmesini gösterir.')
+PING_MAX_LISTED_SHARDS = 25 # Mesaj 2000 karakter sınırını aşmasın
+
+def format_latency(latency):
+    # Shard henüz heartbeat göndermediyse gecikme nan/inf olur
+    if math.isnan(latency) or math.isinf(latency):
+        return "bilinmiyor"
+    return f"{round(latency * 1000)}ms"
+
+def shard_summary():
+    """Bu işlemdeki her shard için (shard_id, gecikme, sunucu sayısı) listesi."""
+    guild_counts = collections.Counter(guild.shard_id for guild in bot.guilds)
+    return [(shard_id, format_latency(latency), guild_counts[shard_id]) for shard_id, latency in sorted(bot.latencies)]
+
+@bot.hybrid_command(name='ping', help='Botun gecikmesini gösterir.')
 # Ping komutu, botun çalışıp çalışmadığını kontrol etmek için her zaman erişilebilir olmalı.
 # O yüzden sessiz kanal veya bot kilidi kontrolü eklenmez.
 async def ping(ctx):
-    await ctx.send(f'Pong! Gecikme: {round(bot.latency * 1000)}ms')
-    print(f"[{ctx.author}] e!ping komutunu kullandı.")
+    if not SHARDED:
+        await ctx.send(f'Pong! Gecikme: {format_latency(bot.latency)}')
+    else:
+        lines = [f"Pong! Ortalama gecikme: {format_latency(bot.latency)} (bu sunucu: shard {ctx.guild.shard_id if ctx.guild else 0})"]
+        summary = shard_summary()
+        for shard_id, latency, guild_count in summary[:PING_MAX_LISTED_SHARDS]:
+            lines.append(f"Shard {shard_id}: {latency}, {guild_count} sunucu")
+        if len(summary) > PING_MAX_LISTED_SHARDS:
+            lines.append(f"... ve {len(summary) - PING_MAX_LISTED_SHARDS} shard daha")
+        await ctx.send("\n".join(lines))
 
-@bot.command(name='yardım', help='Kullanılabilir komutları listeler ve açıklar.')
+@bot.hybrid_command(name='yardım', help='Kullanılabilir komutları listeler ve açıklar.')
 # Yardım komutu, bot kilitliyse bile (farklı bir mesajla) her zaman çalışmalı.
 # Sessiz kanal kontrolü de burada uygulanmaz.
 async def yardim(ctx):
-    print(f"DEBUG: 'yardım' komutu çağrıldı. Kullanıcı: {ctx.author.name}, ID: {ctx.author.id}")
-    
-    # Bot kilitli mi kontrol et
-    locked = await is_bot_locked_status()
-    
-    embed = discord.Embed(
-        title="Bot Komutları",
-        description="İşte kullanabileceğim komutlar:",
-        color=discord.Color.blue()
-    )
-
-    if locked and ctx.author.id != OWNER_ID:
-        # Eğer bot kilitliyse ve kullanan sahip değilse
-        embed.description = "Bot şu anda geliştirme modunda kilitlidir. Komutları sadece bot sahibi kullanabilir.\n\n"
-        embed.add_field(name="Sadece Sahibe Özel Komutlar", 
-                             value="`e!kilitle_bot`, `e!kilidi_aç_bot`, `e!kapat`, `e!değiştir_durum`", 
-                             inline=False)
-    else:
-        # Bot kilitli değilse veya sahibi kullanıyorsa tüm komutları göster
-        genel_komutlar = ""
-        moderasyon_komutlar = ""
-        eğlence_komutlar = ""
-        bilgi_komutlar = ""
-        ayar_komutlar = ""
-        sahibe_ozel_komutlar = ""
-
-        # Kategorize edilmemiş komutlar için boş bir dize başlat
-        kategorize_edilmemis_komutlar = ""
-
-        for command in bot.commands:
-            # Gizli komutları sahibinden başkasına gösterme
-            if command.hidden and ctx.author.id != OWNER_ID:
-                continue 
-
-            cmd_info = f"`e!{command.name}`: {command.help or 'Açıklama yok.'}\n"
-            
-            # Komutları kategorize et
-            if command.name in ['ping', 'yardım']:
-                genel_komutlar += cmd_info
-            elif command.name in ['kick', 'ban', 'unban', 'clear', 'kanala_mesaj', 'duyuru']: 
-                moderasyon_komutlar += cmd_info
-            elif command.name in ['zar', 'yazıtura', '8ball']:
-                eğlence_komutlar += cmd_info
-            elif command.name in ['sunucu_bilgi', 'kullanıcı_bilgi']:
-                bilgi_komutlar += cmd_info
-            elif command.name in ['ayarla_hosgeldin', 'sifirla_hosgeldin', 'reaksiyon_rolu_ayarla', 
-                                     'sessiz_kanal_ayarla', 'sessiz_kanal_sifirla', 
-                                     'otorol_ayarla', 'otorol_sifirla', 
-                                     'ayarla_ticket', 'ticket_aç', 'ticket_kapat',
-                                     'gönder_ticket_butonu']: 
-                ayar_komutlar += cmd_info
-            elif command.name in ['kapat', 'değiştir_durum', 'kilitle_bot', 'kilidi_aç_bot']: 
-                # Sahibe özel komutları sadece sahip görsün
-                if ctx.author.id == OWNER_ID:
-                    sahibe_ozel_komutlar += cmd_info
-            else:
-                # Hiçbir kategoriye uymayan komutlar için
-                kategorize_edilmemis_komutlar += cmd_info
-            
-        # 1024 karakter limitini aşmamak için kontrol ekleyelim
-        if genel_komutlar: embed.add_field(name="Genel Komutlar", value=genel_komutlar[:1020], inline=False)
-        if moderasyon_komutlar: embed.add_field(name="Moderasyon Komutları", value=moderasyon_komutlar[:1020], inline=False)
-        if eğlence_komutlar: embed.add_field(name="Eğlence Komutları", value=eğlence_komutlar[:1020], inline=False)
-        if bilgi_komutlar: embed.add_field(name="Bilgi Komutları", value=bilgi_komutlar[:1020], inline=False)
-        if ayar_komutlar: embed.add_field(name="Ayarlar", value=ayar_komutlar[:1020], inline=False)
-        if sahibe_ozel_komutlar: embed.add_field(name="Sahibe Özel Komutlar", value=sahibe_ozel_komutlar[:1020], inline=False)
-        if kategorize_edilmemis_komutlar: embed.add_field(name="Diğer Komutlar", value=kategorize_edilmemis_komutlar[:1020], inline=False)
-
-    await ctx.send(embed=embed)
-    print(f"[{ctx.author}] e!yardım komutunu kullandı.")
+    # Kilit durumu bellekten okunur; sayfalar komutlar kaydedilirken hazırlanmıştır
+    pages = help_catalog.pages(is_bot_locked_status(), ctx.author.id == OWNER_ID)
+    view = HelpPageView(ctx.author.id, pages) if len(pages) > 1 else None
+    await ctx.send(embed=pages[0], view=view)
 
 # --- Bilgilendirme Komutları ---
 
-@bot.command(name='sunucu_bilgi', aliases=['sunucu', 'sbilgi'], help='Sunucu hakkında bilgi gösterir.')
+@bot.hybrid_command(name='sunucu_bilgi', aliases=['sunucu', 'sbilgi'], help='Sunucu hakkında bilgi gösterir.')
 @check_bot_unlocked_or_owner()
 @check_not_silent_channel() # Sessiz kanalda çalışmasın
 async def serverinfo(ctx):
@@ -604,7 +2986,7 @@ async def serverinfo(ctx):
     if guild.icon:
         embed.set_thumbnail(url=guild.icon.url)
     
-    embed.add_field(name="Sunucu Sahibi", value=guild.owner.mention if guild.owner else "Bilinmiyor", inline=True)
+    embed.add_field(name="Sunucu Sahibi", value=f"<@{guild.owner_id}>" if guild.owner_id else "Bilinmiyor", inline=True) # guild.owner hafif modda önbellekte olmayabilir
     embed.add_field(name="Üye Sayısı", value=guild.member_count, inline=True)
     embed.add_field(name="Kanal Sayısı", value=len(guild.channels), inline=True)
     embed.add_field(name="Rol Sayısı", value=len(guild.roles), inline=True)
@@ -613,12 +2995,11 @@ async def serverinfo(ctx):
     embed.add_field(name="ID", value=guild.id, inline=True)
     
     await ctx.send(embed=embed)
-    print(f"[{ctx.author}] e!sunucu_bilgi komutunu kullandı.")
 
-@bot.command(name='kullanıcı_bilgi', aliases=['kullanici', 'kbilgi'], help='Bir kullanıcı hakkında bilgi gösterir. Kullanım: `e!kullanıcı_bilgi [@kullanıcı]`')
+@bot.hybrid_command(name='kullanıcı_bilgi', aliases=['kullanici', 'kbilgi'], help='Bir kullanıcı hakkında bilgi gösterir. Kullanım: `e!kullanıcı_bilgi [@kullanıcı]`')
 @check_bot_unlocked_or_owner()
 @check_not_silent_channel() # Sessiz kanalda çalışmasın
-async def userinfo(ctx, member: discord.Member = None):
+async def userinfo(ctx, member: CachedMemberConverter = None):
     if member is None:
         member = ctx.author # Eğer belirtilmezse komutu kullananı göster
 
@@ -651,18 +3032,19 @@ async def userinfo(ctx, member: discord.Member = None):
         embed.add_field(name="Roller", value="Yok", inline=False)
     
     embed.add_field(name="Bot Mu?", value="Evet" if member.bot else "Hayır", inline=True)
-    embed.add_field(name="Durum", value=str(member.status).capitalize(), inline=True) # Çevrimiçi, Boşta vb.
+    if not LEAN_GATEWAY: # Hafif modda presence alınmadığından herkes çevrimdışı görünürdü
+        embed.add_field(name="Durum", value=str(member.status).capitalize(), inline=True) # Çevrimiçi, Boşta vb.
 
     await ctx.send(embed=embed)
-    print(f"[{ctx.author}] e!kullanıcı_bilgi komutunu kullandı. Kullanıcı: {member.name}")
+    command_logger.debug("Kullanıcı bilgisi gösterildi: %s", member.name, extra=ctx_fields(ctx, target=member.id))
 
 # --- Moderasyon Komutları ---
 
-@bot.command(name='kick', help='Bir üyeyi sunucudan atar. Kullanım: `e!kick @kullanıcı [sebep]`')
+@bot.hybrid_command(name='kick', help='Bir üyeyi sunucudan atar. Kullanım: `e!kick @kullanıcı [sebep]`')
 @commands.has_permissions(kick_members=True) # Üye atma yetkisi olanlar kullanabilir
 @check_bot_unlocked_or_owner() # Bot kilitli değilse veya sahipse çalışır
 @check_not_silent_channel() # Sessiz kanalda çalışmasın
-async def kick(ctx, member: discord.Member, *, reason: str = "Belirtilmemiş"):
+async def kick(ctx, member: CachedMemberConverter, *, reason: str = "Belirtilmemiş"):
     if member.id == ctx.author.id:
         await ctx.send("Kendinizi atamazsınız!")
         return
@@ -673,7 +3055,7 @@ async def kick(ctx, member: discord.Member, *, reason: str = "Belirtilmemiş"):
         await ctx.send("Bot sahibini atamazsınız!")
         return
     # Yetki hiyerarşisi kontrolü (sahip her zaman atabilir)
-    if ctx.author.top_role <= member.top_role and ctx.author.id != ctx.guild.owner.id:
+    if ctx.author.top_role <= member.top_role and ctx.author.id != ctx.guild.owner_id:
         await ctx.send("Bu üyeyi atmak için yeterli yetkiniz yok (rolünüz onunkinden düşük veya eşit).")
         return
 
@@ -688,18 +3070,18 @@ async def kick(ctx, member: discord.Member, *, reason: str = "Belirtilmemiş"):
         embed.add_field(name="Yetkili", value=ctx.author.mention, inline=False)
         embed.set_footer(text=f"ID: {member.id}")
         await ctx.send(embed=embed)
-        print(f"[{ctx.author}] '{member.name}' adlı üyeyi attı. Sebep: {reason}")
+        moderation_logger.info("%s '%s' adlı üyeyi attı. Sebep: %s", ctx.author, member.name, reason, extra=ctx_fields(ctx, target=member.id))
     except discord.Forbidden:
         await ctx.send("Bu üyeyi atmak için yetkim yok. Rol hiyerarşimi ve yetkilerimi kontrol edin.")
     except Exception as e:
         await ctx.send(f"Üye atarken bir hata oluştu: {e}")
-        print(f"Kick hatası: {e}")
+        moderation_logger.exception("Kick hatası: %s", e, extra=ctx_fields(ctx, target=member.id))
 
-@bot.command(name='ban', help='Bir üyeyi sunucudan yasaklar. Kullanım: `e!ban @kullanıcı [sebep]`')
+@bot.hybrid_command(name='ban', help='Bir üyeyi sunucudan yasaklar. Kullanım: `e!ban @kullanıcı [sebep]`')
 @commands.has_permissions(ban_members=True) # Üye yasaklama yetkisi olanlar kullanabilir
 @check_bot_unlocked_or_owner() # Bot kilitli değilse veya sahipse çalışır
 @check_not_silent_channel() # Sessiz kanalda çalışmasın
-async def ban(ctx, member: discord.Member, *, reason: str = "Belirtilmemiş"):
+async def ban(ctx, member: CachedMemberConverter, *, reason: str = "Belirtilmemiş"):
     if member.id == ctx.author.id:
         await ctx.send("Kendinizi yasaklayamazsınız!")
         return
@@ -710,7 +3092,7 @@ async def ban(ctx, member: discord.Member, *, reason: str = "Belirtilmemiş"):
         await ctx.send("Bot sahibini yasaklayamazsınız!")
         return
     # Yetki hiyerarşisi kontrolü (sahip her zaman yasaklayabilir)
-    if ctx.author.top_role <= member.top_role and ctx.author.id != ctx.guild.owner.id:
+    if ctx.author.top_role <= member.top_role and ctx.author.id != ctx.guild.owner_id:
         await ctx.send("Bu üyeyi yasaklamak için yeterli yetkiniz yok (rolünüz onunkinden düşük veya eşit).")
         return
 
@@ -725,64 +3107,508 @@ async def ban(ctx, member: discord.Member, *, reason: str = "Belirtilmemiş"):
         embed.add_field(name="Yetkili", value=ctx.author.mention, inline=False)
         embed.set_footer(text=f"ID: {member.id}")
         await ctx.send(embed=embed)
-        print(f"[{ctx.author}] '{member.name}' adlı üyeyi yasakladı. Sebep: {reason}")
+        moderation_logger.info("%s '%s' adlı üyeyi yasakladı. Sebep: %s", ctx.author, member.name, reason, extra=ctx_fields(ctx, target=member.id))
     except discord.Forbidden:
         await ctx.send("Bu üyeyi yasaklamak için yetkim yok. Rol hiyerarşimi ve yetkilerimi kontrol edin.")
     except Exception as e:
         await ctx.send(f"Üye yasaklarken bir hata oluştu: {e}")
-        print(f"Ban hatası: {e}")
+        moderation_logger.exception("Ban hatası: %s", e, extra=ctx_fields(ctx, target=member.id))
 
-@bot.command(name='unban', help='Yasaklı bir kullanıcının yasağını kaldırır. Kullanım: `e!unban <kullanıcı_ID> [sebep]`')
+@bot.hybrid_command(name='unban', help='Yasaklı bir kullanıcının yasağını kaldırır. Kullanım: `e!unban <kullanıcı_ID> [sebep]`')
 @commands.has_permissions(ban_members=True) # Üye yasaklama yetkisi olanlar kullanabilir
 @check_bot_unlocked_or_owner() # Bot kilitli değilse veya sahipse çalışır
 @check_not_silent_channel() # Sessiz kanalda çalışmasın
-async def unban(ctx, user_id: int, *, reason: str = "Belirtilmemiş"):
+async def unban(ctx, user_id: SnowflakeConverter, *, reason: str = "Belirtilmemiş"):
+    # Yasak ID ile kaldırılır; kullanıcı önbellekte değilse adı için fetch_user isteği yapılmaz
+    user = bot.get_user(user_id)
+    name = f"<@{user_id}>" + (f" ({user.name})" if user else "")
     try:
-        user = await bot.fetch_user(user_id) # ID'den kullanıcıyı çek
-        await ctx.guild.unban(user, reason=reason)
+        await ctx.guild.unban(discord.Object(id=user_id), reason=reason)
         embed = discord.Embed(
             title="Yasak Kaldırıldı",
-            description=f"{user.mention} ({user.name}) kullanıcısının yasağı kaldırıldı.",
+            description=f"{name} kullanıcısının yasağı kaldırıldı.",
             color=discord.Color.green()
         )
         embed.add_field(name="Sebep", value=reason, inline=False)
         embed.add_field(name="Yetkili", value=ctx.author.mention, inline=False)
-        embed.set_footer(text=f"ID: {user.id}")
+        embed.set_footer(text=f"ID: {user_id}")
         await ctx.send(embed=embed)
-        print(f"[{ctx.author}] '{user.name}' ({user.id}) adlı kullanıcının yasağını kaldırdı. Sebep: {reason}")
+        moderation_logger.info("%s '%s' (%s) adlı kullanıcının yasağını kaldırdı. Sebep: %s", ctx.author, user.name if user else "?", user_id, reason, extra=ctx_fields(ctx, target=user_id))
     except discord.NotFound:
         await ctx.send(f"ID'si `{user_id}` olan yasaklı bir kullanıcı bulunamadı.")
     except discord.Forbidden:
         await ctx.send("Yasak kaldırmak için yetkim yok.")
     except Exception as e:
         await ctx.send(f"Yasak kaldırırken bir hata oluştu: {e}")
-        print(f"Unban hatası: {e}")
+        moderation_logger.exception("Unban hatası: %s", e, extra=ctx_fields(ctx, target=user_id))
+
+# --- Toplu Moderasyon ---
+# Baskın sonrası temizlik için ID listesi, ekli dosya veya katılım zamanıyla seçilen kullanıcılara tek komutla
+# ban/kick/unban. Yasaklar Discord'un toplu ban isteğiyle 200'lük gruplar halinde, atma ve yasak kaldırma ise sınırlı
+# sayıda eşzamanlı istekle yapılır: discord.py hız sınırı kovalarını kendisi bekler, eşzamanlılık sınırı da isteklerin
+# tek bir kovanın önünde yığılmasını önler. Sonuçta her kullanıcı için ayrı mesaj yerine tek bir özet rapor gönderilir.
+MASS_MODERATION_MAX_TARGETS = 1000        # Tek komutta işlenebilecek en fazla kullanıcı
+MASS_MODERATION_CONCURRENCY = 5           # Atma ve yasak kaldırmada aynı anda yapılan en fazla istek
+MASS_BAN_BATCH_SIZE = 200                 # Discord'un toplu ban isteğindeki kullanıcı sınırı
+MASS_MEMBER_QUERY_SIZE = 100              # Gateway üye sorgusundaki ID sınırı
+MASS_MODERATION_FILE_LIMIT = 512 * 1024   # Okunacak en büyük ID dosyası (bayt)
+MASS_MODERATION_CONFIRM_TIMEOUT = 60      # Onay butonlarının bekleme süresi (saniye)
+MASS_MODERATION_PROGRESS_INTERVAL = 3.0   # Durum mesajının en sık düzenlenme aralığı (saniye)
+MASS_MODERATION_ACTIONS = {
+    # işlem: (başlık, hedef için fiil)
+    'ban': ("Toplu Yasaklama", "yasaklanacak"),
+    'kick': ("Toplu Atma", "atılacak"),
+    'unban': ("Toplu Yasak Kaldırma", "yasağı kaldırılacak"),
+}
+_SNOWFLAKE_PATTERN = re.compile(r'\d{15,20}') # Düz ID'ler ve <@123...> etiketleri
+
+# Aynı sunucuda aynı anda iki toplu işlem çalışmasın
+active_mass_moderations = set()
+
+class MassModerationFlags(commands.FlagConverter):
+    """e!toplu_unban için hedef seçimi. Örnek: `e!toplu_unban idler: 123 456 sebep: itiraz kabul edildi`"""
+    idler: Optional[str] = commands.flag(default=None)      # Boşluk, virgül veya satırla ayrılmış ID'ler ya da etiketler
+    sebep: str = commands.flag(default="Belirtilmemiş")
+
+class MassMemberFlags(MassModerationFlags):
+    """e!toplu_ban ve e!toplu_kick için hedef seçimi. Örnek: `e!toplu_kick son: 15 sebep: baskın`"""
+    son: commands.Range[int, 1, 10080] = commands.flag(default=None) # Son bu kadar dakikada katılan üyeler
+
+def moderation_target_error(ctx, user_id, member):
+    """Tekil kick/ban komutlarındaki kontroller; hedef işlenemiyorsa nedenini, işlenebiliyorsa None döner."""
+    if user_id == ctx.author.id:
+        return "komutu kullanan kişi"
+    if user_id == bot.user.id:
+        return "bot"
+    if user_id == OWNER_ID:
+        return "bot sahibi"
+    if member is not None:
+        if ctx.author.top_role <= member.top_role and ctx.author.id != ctx.guild.owner_id:
+            return "rolü sizinkinden yüksek veya eşit"
+        if ctx.guild.me.top_role <= member.top_role:
+            return "rolü benimkinden yüksek veya eşit"
+    return None
+
+class MassModerationConfirmView(discord.ui.View):
+    """Toplu işlem başlamadan önce komutu kullanan kişiden onay alır."""
+    def __init__(self, author_id):
+        super().__init__(timeout=MASS_MODERATION_CONFIRM_TIMEOUT)
+        self.author_id = author_id
+        self.confirmed = False
+
+    async def interaction_check(self, interaction: discord.Interaction):
+        if interaction.user.id != self.author_id:
+            await interaction.response.send_message("Bu işlemi sadece komutu kullanan kişi onaylayabilir.", ephemeral=True)
+            return False
+        return True
+
+    @discord.ui.button(label="Onayla", style=discord.ButtonStyle.danger, emoji="✅")
+    async def confirm(self, interaction: discord.Interaction, button: discord.ui.Button):
+        self.confirmed = True
+        await interaction.response.edit_message(content="⏳ İşlem başladı...", embed=None, view=None)
+        self.stop()
+
+    @discord.ui.button(label="İptal", style=discord.ButtonStyle.secondary, emoji="✖️")
+    async def cancel(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await interaction.response.edit_message(content="İşlem iptal edildi.", embed=None, view=None)
+        self.stop()
+
+class MassModerationEngine:
+    """
+    Bir kullanıcı listesine aynı moderasyon işlemini uygular ve her kullanıcının sonucunu toplar.
+    Hedefler önce tekil komutlardaki kontrollerden geçirilir; önbellekte olmayan üyeler fetch_member ile tek tek
+    değil, gateway üzerinden 100'erli sorgularla bulunur. Yasak kaldırmada kullanıcı bilgisi hiç çekilmez.
+    """
+    def __init__(self, ctx, action, reason):
+        self.ctx = ctx
+        self.guild = ctx.guild
+        self.action = action
+        self.reason = reason
+        self.status_message = None
+        self.results = {} # user_id -> (durum, ayrıntı); durum 'başarılı', 'atlandı' veya 'başarısız'
+        self.requested = 0 # Komutla verilen kullanıcı sayısı; özetteki üç sayının toplamı buna eşittir
+        self.total = 0     # Kontrollerden geçip işlenecek hedef sayısı
+        self.processed = 0 # Sonucu (başarılı, atlandı veya başarısız) belli olan hedef sayısı
+        self._started = None
+        self._last_report = 0.0
+
+    async def resolve(self, user_ids):
+        """Kontrolden geçemeyenleri atlanmış sayar ve işlenecek hedefleri (Member veya discord.Object) döner."""
+        self.requested = len(user_ids)
+        members = {}
+        if self.action != 'unban':
+            missing = []
+            for user_id in user_ids:
+                member = self.guild.get_member(user_id)
+                if member is not None:
+                    members[user_id] = member
+                else:
+                    missing.append(user_id)
+            if missing and not self.guild.chunked: # Üye listesi önbellekte değil (hafif mod), sunucuya sor
+                for start in range(0, len(missing), MASS_MEMBER_QUERY_SIZE):
+                    for member in await self.guild.query_members(user_ids=missing[start:start + MASS_MEMBER_QUERY_SIZE], cache=False):
+                        members[member.id] = member
+
+        targets = []
+        for user_id in user_ids:
+            member = members.get(user_id)
+            error = moderation_target_error(self.ctx, user_id, member) if self.action != 'unban' else None
+            if error is None and self.action == 'kick' and member is None:
+                error = "sunucuda değil"
+            if error is not None:
+                self.results[user_id] = ('atlandı', error)
+            else:
+                targets.append(member or discord.Object(id=user_id))
+        self.total = len(targets)
+        return targets
+
+    async def run(self, targets):
+        self._started = time.monotonic()
+        if self.action == 'ban':
+            await self._ban_in_batches(targets)
+        else:
+            await self._apply_concurrently(targets)
+
+    async def _ban_in_batches(self, targets):
+        for start in range(0, len(targets), MASS_BAN_BATCH_SIZE):
+            batch = targets[start:start + MASS_BAN_BATCH_SIZE]
+            try:
+                result = await self.guild.bulk_ban(batch, reason=self.reason)
+            except discord.Forbidden:
+                # Toplu ban botun Sunucuyu Yönet yetkisini de ister; yoksa kalanlar tek tek yasaklanır
+                await self._apply_concurrently(targets[start:])
+                return
+            except discord.HTTPException as e:
+                for user in batch:
+                    self._record(user.id, 'başarısız', f"HTTP {e.status}")
+                continue
+            banned = {user.id for user in result.banned}
+            for user in batch:
+                # Discord'un yanıtında hiç geçmeyen kullanıcılar da başarısız sayılır ki özet toplamı tutsun
+                self._record(user.id, 'başarılı' if user.id in banned else 'başarısız', None if user.id in banned else "Discord yasaklamadı")
+            await self._report_progress()
+
+    async def _apply_concurrently(self, targets):
+        semaphore = asyncio.Semaphore(MASS_MODERATION_CONCURRENCY)
+        async def apply(user):
+            async with semaphore:
+                await self._apply(user)
+                await self._report_progress()
+        await asyncio.gather(*(apply(user) for user in targets))
+
+    async def _apply(self, user):
+        try:
+            if self.action == 'ban':
+                await self.guild.ban(user, reason=self.reason)
+            elif self.action == 'kick':
+                await self.guild.kick(user, reason=self.reason)
+            else:
+                await self.guild.unban(user, reason=self.reason)
+            self._record(user.id, 'başarılı')
+        except discord.NotFound:
+            self._record(user.id, 'atlandı', "yasaklı değil" if self.action == 'unban' else "sunucuda değil")
+        except discord.Forbidden:
+            self._record(user.id, 'başarısız', "yetkim yok")
+        except discord.HTTPException as e:
+            self._record(user.id, 'başarısız', f"HTTP {e.status}")
+
+    def _record(self, user_id, status, detail=None):
+        """İşlenen bir hedefin sonucunu kaydeder; ilerleme her sonuçta (atlanan ve başarısızlar dahil) ilerler."""
+        self.results[user_id] = (status, detail)
+        self.processed += 1
+
+    async def _report_progress(self):
+        if not self.status_message:
+            return
+        now = time.monotonic()
+        if now - self._last_report < MASS_MODERATION_PROGRESS_INTERVAL:
+            return
+        self._last_report = now
+        counts = self.counts()
+        try:
+            await self.status_message.edit(content=f"⏳ İşleniyor... **{self.processed}/{self.total}** "
+                                                    f"(✅ {counts['başarılı']} • ⏭️ {counts['atlandı']} atlandı • ❌ {counts['başarısız']} başarısız)")
+        except discord.HTTPException:
+            pass # İlerleme mesajı düzenlenemezse işlem devam etsin
+
+    def counts(self):
+        return collections.Counter(status for status, _ in self.results.values())
+
+    def summary_embed(self):
+        title, _ = MASS_MODERATION_ACTIONS[self.action]
+        counts = self.counts()
+        embed = discord.Embed(title=f"{title} Raporu", description=f"**{self.requested}** kullanıcı verildi.",
+                              color=discord.Color.orange() if counts['başarısız'] else discord.Color.green())
+        embed.add_field(name="Başarılı", value=str(counts['başarılı']), inline=True)
+        embed.add_field(name="Atlandı", value=str(counts['atlandı']), inline=True)
+        embed.add_field(name="Başarısız", value=str(counts['başarısız']), inline=True)
+        reasons = collections.Counter(f"{status}: {detail}" for status, detail in self.results.values() if detail)
+        if reasons:
+            embed.add_field(name="Nedenler", value="\n".join(f"{reason} ({count})" for reason, count in reasons.most_common(10)), inline=False)
+        embed.add_field(name="Sebep", value=self.reason[:1024], inline=False)
+        embed.add_field(name="Yetkili", value=self.ctx.author.mention, inline=False)
+        if self._started is not None:
+            embed.set_footer(text=f"{time.monotonic() - self._started:.1f} saniye sürdü • Ayrıntılar ekteki dosyada")
+        return embed
+
+    def report_file(self):
+        lines = [f"{user_id}\t{status}\t{detail or ''}" for user_id, (status, detail) in self.results.items()]
+        return discord.File(io.BytesIO("\n".join(lines).encode()), filename=f"toplu_{self.action}_raporu.txt")
+
+async def collect_mass_targets(ctx, attachment, flags):
+    """Komut argümanlarından hedef ID listesini çıkarır. Hata durumunda (None, hata mesajı) döner."""
+    text = flags.idler or ""
+    if attachment is not None:
+        if attachment.size > MASS_MODERATION_FILE_LIMIT:
+            return None, f"Dosya çok büyük (en fazla {MASS_MODERATION_FILE_LIMIT // 1024} KB)."
+        text += "\n" + (await attachment.read()).decode('utf-8', errors='ignore')
+    user_ids = [int(match) for match in _SNOWFLAKE_PATTERN.findall(text)]
+
+    minutes = getattr(flags, 'son', None)
+    if minutes:
+        if not ctx.guild.chunked:
+            return None, "Üye listesi önbellekte olmadığından katılım zamanına göre seçim yapılamıyor. ID listesi veya dosya kullanın."
+        cutoff = datetime.now(timezone.utc) - timedelta(minutes=minutes)
+        user_ids += [member.id for member in ctx.guild.members if not member.bot and member.joined_at and member.joined_at >= cutoff]
+
+    user_ids = list(dict.fromkeys(user_ids)) # Sırayı koruyarak tekrarları at
+    if not user_ids:
+        return None, "Hedef bulunamadı. `idler:` ile ID listesi verin, ID'leri içeren bir dosya ekleyin veya `son:` ile katılım süresi belirtin."
+    if len(user_ids) > MASS_MODERATION_MAX_TARGETS:
+        return None, f"Tek seferde en fazla {MASS_MODERATION_MAX_TARGETS} kullanıcı işlenebilir ({len(user_ids)} verildi). Listeyi bölün."
+    return user_ids, None
+
+async def run_mass_moderation(ctx, action, attachment, flags):
+    if ctx.guild.id in active_mass_moderations:
+        return await ctx.send("Bu sunucuda zaten devam eden bir toplu işlem var. Lütfen bitmesini bekleyin.")
+    await ctx.defer() # Dosya okuma ve üye sorguları slash komutunun 3 saniyelik yanıt süresini aşabilir
+    user_ids, error = await collect_mass_targets(ctx, attachment, flags)
+    if error:
+        return await ctx.send(error)
+
+    active_mass_moderations.add(ctx.guild.id)
+    try:
+        engine = MassModerationEngine(ctx, action, flags.sebep)
+        targets = await engine.resolve(user_ids)
+        title, verb = MASS_MODERATION_ACTIONS[action]
+        if not targets:
+            return await ctx.send(embed=engine.summary_embed(), file=engine.report_file())
+
+        view = MassModerationConfirmView(ctx.author.id)
+        prompt = discord.Embed(title=title, color=discord.Color.red(),
+                               description=f"**{len(targets)}** kullanıcı {verb}." + (f" {len(engine.results)} kullanıcı atlanacak." if engine.results else "")
+                                           + f"\n**Sebep:** {flags.sebep}\n\nOnaylıyor musunuz?")
+        engine.status_message = await ctx.send(embed=prompt, view=view)
+        if await view.wait(): # Süre doldu
+            try:
+                await engine.status_message.edit(content="Onay süresi doldu, işlem iptal edildi.", embed=None, view=None)
+            except discord.HTTPException:
+                pass
+            return
+        if not view.confirmed:
+            return
+
+        await engine.run(targets)
+        counts = engine.counts()
+        moderation_logger.warning("%s '%s' sunucusunda %s: %d başarılı, %d atlandı, %d başarısız. Sebep: %s", ctx.author, ctx.guild.name, title.lower(),
+                                  counts['başarılı'], counts['atlandı'], counts['başarısız'], flags.sebep, extra=ctx_fields(ctx))
+        try:
+            await engine.status_message.edit(content=None, embed=engine.summary_embed(), attachments=[engine.report_file()])
+        except discord.HTTPException:
+            # Slash komutunun yanıt mesajı 15 dakika sonra düzenlenemez; rapor kanala ayrıca gönderilir
+            await ctx.channel.send(embed=engine.summary_embed(), file=engine.report_file())
+    finally:
+        active_mass_moderations.discard(ctx.guild.id)
 
-@bot.command(name='clear', aliases=['temizle'], help='Belirtilen sayıdaki mesajı siler. Kullanım: `e!clear <sayı>`')
+@bot.hybrid_command(name='toplu_ban', help='Birden çok kullanıcıyı tek seferde yasaklar. Kullanım: `e!toplu_ban [idler: ID ID ...] [son: dakika] [sebep: metin]` (ID listesi dosya olarak da eklenebilir)')
+@commands.has_permissions(ban_members=True)
+@commands.bot_has_permissions(ban_members=True)
+@check_bot_unlocked_or_owner()
+@check_not_silent_channel() # Sessiz kanalda çalışmasın
+async def mass_ban(ctx, dosya: Optional[discord.Attachment] = None, *, flags: MassMemberFlags):
+    await run_mass_moderation(ctx, 'ban', dosya, flags)
+
+@bot.hybrid_command(name='toplu_kick', help='Birden çok üyeyi tek seferde sunucudan atar. Kullanım: `e!toplu_kick [idler: ID ID ...] [son: dakika] [sebep: metin]` (ID listesi dosya olarak da eklenebilir)')
+@commands.has_permissions(kick_members=True)
+@commands.bot_has_permissions(kick_members=True)
+@check_bot_unlocked_or_owner()
+@check_not_silent_channel() # Sessiz kanalda çalışmasın
+async def mass_kick(ctx, dosya: Optional[discord.Attachment] = None, *, flags: MassMemberFlags):
+    await run_mass_moderation(ctx, 'kick', dosya, flags)
+
+@bot.hybrid_command(name='toplu_unban', help='Birden çok kullanıcının yasağını tek seferde kaldırır. Kullanım: `e!toplu_unban idler: ID ID ... [sebep: metin]` (ID listesi dosya olarak da eklenebilir)')
+@commands.has_permissions(ban_members=True)
+@commands.bot_has_permissions(ban_members=True)
+@check_bot_unlocked_or_owner()
+@check_not_silent_channel() # Sessiz kanalda çalışmasın
+async def mass_unban(ctx, dosya: Optional[discord.Attachment] = None, *, flags: MassModerationFlags):
+    await run_mass_moderation(ctx, 'unban', dosya, flags)
+
+# --- Toplu Mesaj Silme Motoru ---
+PURGE_BULK_SIZE = 100                                         # Discord toplu silme (bulk delete) tek seferde en fazla 100 mesaj alır
+PURGE_BULK_MAX_AGE = timedelta(days=14) - timedelta(minutes=1) # Bulk delete 14 günden eski mesajları silemez (küçük bir güvenlik payı ile)
+PURGE_SINGLE_DELETE_DELAY = 1.0                               # Eski mesajlar tek tek silinirken her silme arasındaki bekleme (saniye)
+PURGE_PROGRESS_INTERVAL = 3.0                                 # Durum mesajının en sık hangi aralıkla düzenleneceği (saniye)
+PURGE_MAX_SCAN = 100_000                                      # Filtreli silmede taranacak en fazla mesaj sayısı
+
+# Aynı kanalda aynı anda iki silme işlemi çalışmasın
+active_purges = set()
+
+class PurgeFlags(commands.FlagConverter):
+    """e!clear için isteğe bağlı filtreler. Örnek: `e!clear 500 kullanıcı: @üye içerir: reklam`"""
+    kullanıcı: Optional[discord.User] = commands.flag(default=None, aliases=['kullanici'])
+    içerir: Optional[str] = commands.flag(default=None, aliases=['icerir'])
+    botlar: bool = commands.flag(default=False)
+    önce: SnowflakeConverter = commands.flag(default=None, aliases=['once'])
+    sonra: SnowflakeConverter = commands.flag(default=None)
+
+    def matches(self, message):
+        if self.kullanıcı and message.author.id != self.kullanıcı.id:
+            return False
+        if self.botlar and not message.author.bot:
+            return False
+        if self.içerir and self.içerir.lower() not in message.content.lower():
+            return False
+        return True
+
+class PurgeEngine:
+    """
+    Kanal geçmişini sayfa sayfa tarayıp eşleşen mesajları siler.
+    14 günden yeni mesajlar 100'lük gruplar halinde bulk delete ile, daha eskileri ise
+    hız sınırına takılmamak için aralarında bekleyerek tek tek silinir.
+    İlerleme her grup için yeni mesaj atmak yerine tek bir durum mesajı düzenlenerek bildirilir.
+    """
+    def __init__(self, channel, amount, check, before=None, after=None, status_message=None):
+        self.channel = channel
+        self.amount = amount
+        self.check = check
+        self.before = before
+        self.after = after
+        self.status_message = status_message
+        self.scanned = 0
+        self.deleted = 0
+        self.failed = 0
+        self._last_report = 0.0
+
+    async def run(self):
+        cutoff = datetime.now(timezone.utc) - PURGE_BULK_MAX_AGE
+        batch = []
+        # Mesajlar her zaman yeniden eskiye gelir; böylece 14 günlük sınır geçildiğinde geri kalan her şey eskidir
+        async for message in self.channel.history(limit=PURGE_MAX_SCAN, before=self.before, after=self.after, oldest_first=False):
+            self.scanned += 1
+            if self.status_message and message.id == self.status_message.id:
+                continue
+            if self.check(message):
+                if message.created_at > cutoff:
+                    batch.append(message)
+                    if len(batch) >= PURGE_BULK_SIZE:
+                        await self._bulk_delete(batch)
+                        batch = []
+                else:
+                    if batch:
+                        await self._bulk_delete(batch)
+                        batch = []
+                    await self._single_delete(message)
+                if self.deleted + len(batch) >= self.amount:
+                    break
+            await self._report_progress()
+
+        if batch:
+            await self._bulk_delete(batch)
+        return self.deleted
+
+    async def delete_known(self, messages):
+        """Kimliği zaten bilinen (14 günden yeni) mesajları geçmişi taramadan gruplar halinde siler. Silinen sayıyı döner."""
+        for start in range(0, len(messages), PURGE_BULK_SIZE):
+            await self._bulk_delete(messages[start:start + PURGE_BULK_SIZE])
+        return self.deleted
+
+    async def _bulk_delete(self, batch):
+        try:
+            await self.channel.delete_messages(batch)
+            self.deleted += len(batch)
+        except discord.NotFound:
+            # Gruptaki bir mesaj bu arada silinmiş olabilir, bu durumda grubu tek tek sil
+            for message in batch:
+                await self._single_delete(message)
+        await self._report_progress()
+
+    async def _single_delete(self, message):
+        try:
+            await message.delete()
+            self.deleted += 1
+        except discord.NotFound:
+            pass # Zaten silinmiş
+        except discord.HTTPException as e:
+            self.failed += 1
+            moderation_logger.warning("Mesaj silinemedi (%s): %s", message.id, e, extra={'guild': self.channel.guild.id, 'channel': self.channel.id})
+        await asyncio.sleep(PURGE_SINGLE_DELETE_DELAY)
+
+    async def _report_progress(self):
+        if not self.status_message:
+            return
+        now = asyncio.get_running_loop().time()
+        if now - self._last_report < PURGE_PROGRESS_INTERVAL:
+            return
+        self._last_report = now
+        try:
+            await self.status_message.edit(content=f"🧹 Mesajlar siliniyor... **{self.deleted}/{self.amount}** silindi, {self.scanned} mesaj tarandı.")
+        except discord.HTTPException:
+            pass # İlerleme mesajı düzenlenemezse silme işlemi devam etsin
+
+@bot.hybrid_command(name='clear', aliases=['temizle'], help='Belirtilen sayıdaki mesajı siler. Kullanım: `e!clear <sayı> [kullanıcı: @üye] [içerir: metin] [botlar: evet] [önce: mesaj_id] [sonra: mesaj_id]`')
 @commands.has_permissions(manage_messages=True) # Mesajları yönetme yetkisi olanlar kullanabilir
+@commands.bot_has_permissions(manage_messages=True, read_message_history=True)
 @check_bot_unlocked_or_owner() # Bot kilitli değilse veya sahipse çalışır
 @check_not_silent_channel() # Sessiz kanalda çalışmasın
-async def clear(ctx, amount: int):
+async def clear(ctx, amount: int, *, flags: PurgeFlags):
     if amount <= 0:
         await ctx.send("Lütfen 0'dan büyük bir sayı girin.")
         return
-    if amount > 100: # Discord API limiti 100'dür (purge komutu tek seferde 100'den fazla silmez)
-        await ctx.send("Bir seferde en fazla 100 mesaj silebilirsiniz.")
-        amount = 100
+    if flags.içerir and not bot.intents.message_content:
+        # Mesaj içeriği izni olmadan (SLASH_ONLY) diğer üyelerin mesajları boş gelir; filtre hiçbir şeyle eşleşmezdi
+        await ctx.send("`içerir:` filtresi bu modda kullanılamaz: bot mesaj içeriklerini okuyamıyor. `kullanıcı:`, `botlar:`, `önce:` veya `sonra:` filtrelerini kullanın.")
+        return
+    if ctx.channel.id in active_purges:
+        await ctx.send("Bu kanalda zaten devam eden bir silme işlemi var. Lütfen bitmesini bekleyin.")
+        return
 
+    active_purges.add(ctx.channel.id)
     try:
-        # ctx.message.channel.purge ile mesajları sil. limit=amount+1 kendi komut mesajını da siler
-        deleted = await ctx.channel.purge(limit=amount + 1)
-        await ctx.send(f"✅ Başarıyla **{len(deleted) - 1}** mesaj silindi.", delete_after=5) # Kendi komut mesajı hariç
-        print(f"[{ctx.author}] '{ctx.channel.name}' kanalında {len(deleted) - 1} mesaj sildi.")
+        # Komut mesajının kendisini sil, sayıma dahil etme (slash komutlarında silinecek bir mesaj yok)
+        if ctx.interaction is None:
+            try:
+                await ctx.message.delete()
+            except discord.NotFound:
+                pass
+
+        status_message = await ctx.send("🧹 Mesajlar taranıyor...")
+        engine = PurgeEngine(
+            ctx.channel,
+            amount,
+            flags.matches,
+            before=discord.Object(id=flags.önce) if flags.önce else ctx.message,
+            after=discord.Object(id=flags.sonra) if flags.sonra else None,
+            status_message=status_message
+        )
+        await engine.run()
+
+        summary = f"✅ Başarıyla **{engine.deleted}** mesaj silindi ({engine.scanned} mesaj tarandı)."
+        if engine.failed:
+            summary += f" {engine.failed} mesaj silinemedi."
+        await status_message.edit(content=summary)
+        await status_message.delete(delay=5)
+        moderation_logger.info("%s '%s' kanalında %d mesaj sildi (%d tarandı).", ctx.author, ctx.channel.name, engine.deleted, engine.scanned, extra=ctx_fields(ctx, channel=ctx.channel.id))
     except discord.Forbidden:
         await ctx.send("Mesajları silmek için yetkim yok. Rol hiyerarşimi ve yetkilerimi kontrol edin.")
     except Exception as e:
         await ctx.send(f"Mesaj silerken bir hata oluştu: {e}")
-        print(f"Clear hatası: {e}")
+        moderation_logger.exception("Clear hatası: %s", e, extra=ctx_fields(ctx, channel=ctx.channel.id))
+    finally:
+        active_purges.discard(ctx.channel.id)
 
 # --- Kanal Duyuru Komutu (Özel Kanala Gönderir) ---
-@bot.command(name='kanala_mesaj', help='Belirtilen kanala embed mesajı gönderir. Kullanım: `e!kanala_mesaj #kanal <mesajınız>` (Kanal Yönetme yetkisi gerekir)')
+@bot.hybrid_command(name='kanala_mesaj', help='Belirtilen kanala embed mesajı gönderir. Kullanım: `e!kanala_mesaj #kanal <mesajınız>` (Kanal Yönetme yetkisi gerekir)')
 @commands.has_permissions(manage_channels=True) # Kanal yönetme yetkisi olanlar kullanabilir
 @check_bot_unlocked_or_owner()
 @check_not_silent_channel() # Sessiz kanalda çalışmasın
@@ -805,16 +3631,16 @@ async def send_message_to_channel(ctx, channel: discord.TextChannel, *, message_
 
         await channel.send(embed=embed)
         await ctx.send(f"Mesaj başarıyla {channel.mention} kanalına gönderildi!")
-        print(f"[{ctx.author}] '{channel.name}' kanalına bir mesaj gönderdi. İçerik: '{message_content[:50]}...'")
+        moderation_logger.info("%s '%s' kanalına bir mesaj gönderdi. İçerik: '%s...'", ctx.author, channel.name, message_content[:50], extra=ctx_fields(ctx, channel=channel.id))
 
     except discord.Forbidden:
         await ctx.send(f"**Hata:** {channel.mention} kanalına mesaj gönderme yetkim yok. Kanal yetkilerimi kontrol edin.")
     except Exception as e:
         await ctx.send(f"Bir hata oluştu: {e}")
-        print(f"Kanal mesajı gönderme hatası: {e}")
+        moderation_logger.exception("Kanal mesajı gönderme hatası: %s", e, extra=ctx_fields(ctx))
 
 # --- Duyuru Komutu (Sadece Kullanıldığı Kanala Gönderir) ---
-@bot.command(name='duyuru', help='Kullanıldığı kanala gönderen bilgisiyle embed duyuru mesajı atar. Kullanım: `e!duyuru <mesajınız>` (Mesajları Yönet yetkisi gerekir)')
+@bot.hybrid_command(name='duyuru', help='Kullanıldığı kanala gönderen bilgisiyle embed duyuru mesajı atar. Kullanım: `e!duyuru <mesajınız>` (Mesajları Yönet yetkisi gerekir)')
 @commands.has_permissions(manage_messages=True) # Mesajları Yönet yetkisi olanlar kullanabilir
 @check_bot_unlocked_or_owner()
 @check_not_silent_channel() # Sessiz kanalda çalışmasın
@@ -840,20 +3666,21 @@ async def duyuru(ctx, *, message: str):
         # Mesajı direkt komutun kullanıldığı kanala gönderiyoruz
         await ctx.send(embed=embed)
         
-        # Kullanıcının komut mesajını silebiliriz, duyuru embed'i yeterli
-        await ctx.message.delete() 
+        # Kullanıcının komut mesajını silebiliriz, duyuru embed'i yeterli (slash komutunda duyuru yanıtın kendisidir)
+        if ctx.interaction is None:
+            await ctx.message.delete()
 
-        print(f"[{ctx.author}] '{ctx.channel.name}' kanalına bir duyuru gönderdi. İçerik: '{message[:50]}...'")
+        moderation_logger.info("%s '%s' kanalına bir duyuru gönderdi. İçerik: '%s...'", ctx.author, ctx.channel.name, message[:50], extra=ctx_fields(ctx, channel=ctx.channel.id))
 
     except discord.Forbidden:
         await ctx.send(f"**Hata:** {ctx.channel.mention} kanalına mesaj gönderme yetkim yok. Kanal yetkilerimi kontrol edin.")
     except Exception as e:
         await ctx.send(f"Duyuru gönderirken bir hata oluştu: {e}")
-        print(f"Duyuru komutu hatası: {e}")
+        moderation_logger.exception("Duyuru komutu hatası: %s", e, extra=ctx_fields(ctx))
 
 # --- Eğlence Komutları ---
 
-@bot.command(name='zar', help='Rastgele bir sayı atar. Kullanım: `e!zar` veya `e!zar <max_sayı>`')
+@bot.hybrid_command(name='zar', help='Rastgele bir sayı atar. Kullanım: `e!zar` veya `e!zar <max_sayı>`')
 @check_bot_unlocked_or_owner()
 @check_not_silent_channel() # Sessiz kanalda çalışmasın
 async def zar(ctx, max_number: int = 6):
@@ -862,18 +3689,18 @@ async def zar(ctx, max_number: int = 6):
         return
     result = random.randint(1, max_number)
     await ctx.send(f"🎲 Zar atıldı! Sonuç: **{result}**")
-    print(f"[{ctx.author}] e!zar komutunu kullandı. Sonuç: {result}")
+    command_logger.debug("Zar sonucu: %s", result, extra=ctx_fields(ctx))
 
-@bot.command(name='yazıtura', aliases=['yt'], help='Yazı tura atar.')
+@bot.hybrid_command(name='yazıtura', aliases=['yt'], help='Yazı tura atar.')
 @check_bot_unlocked_or_owner()
 @check_not_silent_channel() # Sessiz kanalda çalışmasın
 async def yazitura(ctx):
     choices = ["Yazı", "Tura"]
     result = random.choice(choices)
     await ctx.send(f"🪙 Yazı tura atıldı! Sonuç: **{result}**")
-    print(f"[{ctx.author}] e!yazıtura komutunu kullandı. Sonuç: {result}")
+    command_logger.debug("Yazı tura sonucu: %s", result, extra=ctx_fields(ctx))
 
-@bot.command(name='8ball', aliases=['sekiztop'], help='Sihirli 8 topa soru sorun. Kullanım: `e!8ball <sorunuz>`')
+@bot.hybrid_command(name='8ball', aliases=['sekiztop'], help='Sihirli 8 topa soru sorun. Kullanım: `e!8ball <sorunuz>`')
 @check_bot_unlocked_or_owner()
 @check_not_silent_channel() # Sessiz kanalda çalışmasın
 async def eightball(ctx, *, question: str):
@@ -906,40 +3733,94 @@ async def eightball(ctx, *, question: str):
     embed.add_field(name="Sorunuz", value=question, inline=False)
     embed.add_field(name="Cevap", value=random.choice(responses), inline=False)
     await ctx.send(embed=embed)
-    print(f"[{ctx.author}] e!8ball komutunu kullandı. Soru: '{question}'")
+    command_logger.debug("8ball sorusu: '%s'", question, extra=ctx_fields(ctx))
 
 
 # --- Ayar Komutları ---
 
-@bot.command(name='ayarla_hosgeldin', help='Hoş geldin mesajlarının gönderileceği kanalı ayarlar. Kullanım: `e!ayarla_hosgeldin #kanal`')
+@bot.hybrid_command(name='ayarla_hosgeldin', help='Hoş geldin mesajlarının gönderileceği kanalı ayarlar. Kullanım: `e!ayarla_hosgeldin #kanal`')
 @commands.has_permissions(manage_guild=True) # Sunucuyu yönetme yetkisi olanlar kullanabilir
 @check_bot_unlocked_or_owner()
 @check_not_silent_channel() # Sessiz kanalda çalışmasın
 async def set_welcome_channel(ctx, channel: discord.TextChannel):
-    async with aiosqlite.connect('bot_settings.db') as db:
-        await db.execute("INSERT OR REPLACE INTO guild_settings (guild_id, welcome_channel_id) VALUES (?, ?)",
-                         (ctx.guild.id, channel.id))
-        await db.commit()
+    await db.execute("INSERT OR REPLACE INTO guild_settings (guild_id, welcome_channel_id) VALUES (?, ?)",
+                     (ctx.guild.id, channel.id))
+    guild_settings_cache.update(ctx.guild.id, welcome_channel_id=channel.id)
     await ctx.send(f"✅ Hoş geldin mesajları artık {channel.mention} kanalına gönderilecek.")
-    print(f"[{ctx.author}] '{ctx.guild.name}' sunucusunda hoş geldin kanalını '{channel.name}' olarak ayarladı.")
+    moderation_logger.info("%s '%s' sunucusunda hoş geldin kanalını '%s' olarak ayarladı.", ctx.author, ctx.guild.name, channel.name, extra=ctx_fields(ctx, channel=channel.id))
 
-@bot.command(name='sifirla_hosgeldin', help='Hoş geldin mesajlarının gönderileceği kanalı sıfırlar.')
+@bot.hybrid_command(name='sifirla_hosgeldin', help='Hoş geldin mesajlarının gönderileceği kanalı sıfırlar.')
 @commands.has_permissions(manage_guild=True)
 @check_bot_unlocked_or_owner()
 @check_not_silent_channel() # Sessiz kanalda çalışmasın
 async def reset_welcome_channel(ctx):
-    async with aiosqlite.connect('bot_settings.db') as db:
-        await db.execute("DELETE FROM guild_settings WHERE guild_id = ?", (ctx.guild.id,))
-        await db.commit()
+    await db.execute("DELETE FROM guild_settings WHERE guild_id = ?", (ctx.guild.id,))
+    guild_settings_cache.update(ctx.guild.id, welcome_channel_id=None)
     await ctx.send("✅ Hoş geldin kanalı ayarı sıfırlandı. Artık hoş geldin mesajı gönderilmeyecek.")
-    print(f"[{ctx.author}] '{ctx.guild.name}' sunucusunda hoş geldin kanalını sıfırladı.")
+    moderation_logger.info("%s '%s' sunucusunda hoş geldin kanalını sıfırladı.", ctx.author, ctx.guild.name, extra=ctx_fields(ctx))
 
-@bot.command(name='reaksiyon_rolu_ayarla', help='Reaksiyon rolü mesajı oluşturur. Kullanım: `e!reaksiyon_rolu_ayarla <mesaj_id> <emoji> <@rol>`')
+# --- Reaksiyon Rolü İndeksi ---
+class ReactionRoleIndex:
+    """
+    reaction_roles tablosunun bellekteki kopyası, (guild_id, message_id, emoji) -> role_id.
+    Ayarlı olmayan mesajlara gelen reaksiyonlar tek bir küme kontrolüyle, veritabanına gitmeden elenir.
+    """
+    def __init__(self, database):
+        self.db = database
+        self._roles = {}
+        self._message_ids = set()
+
+    async def load(self):
+        rows = await self.db.fetchall("SELECT guild_id, message_id, emoji, role_id FROM reaction_roles")
+        self._roles = {(guild_id, message_id, emoji): role_id for guild_id, message_id, emoji, role_id in rows}
+        self._message_ids = {message_id for (_, message_id, _) in self._roles}
+        reaction_role_logger.info("Reaksiyon rolü indeksi yüklendi: %d kayıt, %d mesaj.", len(self._roles), len(self._message_ids))
+
+    async def set(self, guild_id, message_id, emoji, role_id):
+        await self.db.execute("INSERT OR REPLACE INTO reaction_roles (guild_id, message_id, emoji, role_id) VALUES (?, ?, ?, ?)",
+                              (guild_id, message_id, emoji, role_id))
+        self._roles[(guild_id, message_id, emoji)] = role_id
+        self._message_ids.add(message_id)
+
+    async def remove_message(self, message_id):
+        """Silinen bir mesajın tüm reaksiyon rollerini kaldırır ve kaldırılan kayıt sayısını döner."""
+        keys = [key for key in self._roles if key[1] == message_id]
+        if keys:
+            await self.db.execute("DELETE FROM reaction_roles WHERE message_id = ?", (message_id,))
+            self.forget(keys)
+        return len(keys)
+
+    async def remove_role(self, guild_id, role_id):
+        """Silinen bir rolü veren reaksiyon rollerini kaldırır ve kaldırılan kayıt sayısını döner."""
+        keys = [key for key, value in self._roles.items() if key[0] == guild_id and value == role_id]
+        if keys:
+            await self.db.execute("DELETE FROM reaction_roles WHERE guild_id = ? AND role_id = ?", (guild_id, role_id))
+            self.forget(keys)
+        return len(keys)
+
+    def forget(self, keys):
+        """Veritabanından silinmiş kayıtları bellekten düşürür."""
+        for key in keys:
+            self._roles.pop(key, None)
+        self._message_ids = {message_id for (_, message_id, _) in self._roles}
+
+    def forget_guild(self, guild_id):
+        self.forget([key for key in self._roles if key[0] == guild_id])
+
+    def is_tracked(self, message_id):
+        return message_id in self._message_ids
+
+    def get_role_id(self, guild_id, message_id, emoji):
+        return self._roles.get((guild_id, message_id, emoji))
+
+reaction_role_index = ReactionRoleIndex(db)
+
+@bot.hybrid_command(name='reaksiyon_rolu_ayarla', help='Reaksiyon rolü mesajı oluşturur. Kullanım: `e!reaksiyon_rolu_ayarla <mesaj_id> <emoji> <@rol>`')
 @commands.has_permissions(manage_roles=True) # Rolleri yönetme yetkisi olanlar kullanabilir
 @commands.bot_has_permissions(manage_roles=True) # Botun rol yönetme yetkisi olmalı
 @check_bot_unlocked_or_owner()
 @check_not_silent_channel() # Sessiz kanalda çalışmasın
-async def set_reaction_role(ctx, message_id: int, emoji: str, role: discord.Role):
+async def set_reaction_role(ctx, message_id: SnowflakeConverter, emoji: str, role: discord.Role):
     try:
         message = await ctx.channel.fetch_message(message_id)
     except discord.NotFound:
@@ -956,10 +3837,7 @@ async def set_reaction_role(ctx, message_id: int, emoji: str, role: discord.Role
     if ctx.guild.me.top_role <= role:
         return await ctx.send(f"Ayarlamaya çalıştığınız '{role.name}' rolü, benim rolümden yüksek veya eşit. Bu rolü atayamam.")
 
-    async with aiosqlite.connect('bot_settings.db') as db:
-        await db.execute("INSERT OR REPLACE INTO reaction_roles (guild_id, message_id, emoji, role_id) VALUES (?, ?, ?, ?)",
-                         (ctx.guild.id, message_id, emoji, role.id))
-        await db.commit()
+    await reaction_role_index.set(ctx.guild.id, message_id, emoji, role.id)
     
     try:
         await message.add_reaction(emoji)
@@ -967,95 +3845,90 @@ async def set_reaction_role(ctx, message_id: int, emoji: str, role: discord.Role
         return await ctx.send("Emojiye tepki eklerken bir hata oluştu. Belki de bu emojiye tepki ekleyemiyorum?")
 
     await ctx.send(f"✅ Mesaj ID `{message_id}` için `{emoji}` reaksiyonu `{role.name}` rolü ile ayarlandı.")
-    print(f"[{ctx.author}] '{ctx.guild.name}' sunucusunda reaksiyon rolü ayarladı: Mesaj ID {message_id}, Emoji: {emoji}, Rol: {role.name}")
+    moderation_logger.info("%s '%s' sunucusunda reaksiyon rolü ayarladı: Mesaj ID %s, Emoji: %s, Rol: %s", ctx.author, ctx.guild.name, message_id, emoji, role.name, extra=ctx_fields(ctx))
 
 @bot.event
+@timed_event('on_raw_reaction_add')
 async def on_raw_reaction_add(payload):
+    if not reaction_role_index.is_tracked(payload.message_id):
+        return # Reaksiyon rolü ayarlanmamış bir mesaj, hiçbir iş yapmadan çık
     if payload.member.bot:
         return # Bot kendi reaksiyonlarını yok say
 
-    async with aiosqlite.connect('bot_settings.db') as db:
-        cursor = await db.execute("SELECT role_id FROM reaction_roles WHERE guild_id = ? AND message_id = ? AND emoji = ?",
-                                 (payload.guild_id, payload.message_id, str(payload.emoji)))
-        result = await cursor.fetchone()
+    role_id = reaction_role_index.get_role_id(payload.guild_id, payload.message_id, str(payload.emoji))
 
-    if result:
+    if role_id:
         guild = bot.get_guild(payload.guild_id)
         if not guild: return
         
-        role = guild.get_role(result[0])
-        member = guild.get_member(payload.user_id) # payload.member kullanamıyoruz, raw event
-        
+        role = guild.get_role(role_id)
+        member = payload.member # Sunucu reaksiyonlarında eklenen olayla birlikte üye bilgisi de gelir
+
         if role and member:
             try:
                 # Botun rol hiyerarşisi kontrolü
                 if guild.me.top_role <= role:
-                    print(f"[Reaksiyon Rolü Hatası] Botun rolü '{role.name}' rolünden düşük. Rol verilemedi.")
+                    reaction_role_logger.warning("Botun rolü '%s' rolünden düşük. Rol verilemedi.", role.name, extra={'guild': guild.id})
                     return # Rol verilemiyorsa devam etme
 
                 await member.add_roles(role)
-                print(f"[Reaksiyon Rolü] {member.name} kullanıcısına '{role.name}' rolü verildi.")
+                reaction_role_logger.info("%s kullanıcısına '%s' rolü verildi.", member.name, role.name, extra={'guild': guild.id, 'user': member.id})
             except discord.Forbidden:
-                print(f"[Reaksiyon Rolü Hatası] '{member.name}' kullanıcısına '{role.name}' rolü verme yetkim yok.")
+                reaction_role_logger.warning("'%s' kullanıcısına '%s' rolü verme yetkim yok.", member.name, role.name, extra={'guild': guild.id, 'user': member.id})
             except Exception as e:
-                print(f"[Reaksiyon Rolü Hatası] Rol verirken hata: {e}")
+                reaction_role_logger.exception("Rol verirken hata: %s", e, extra={'guild': guild.id, 'user': member.id})
 
 @bot.event
+@timed_event('on_raw_reaction_remove')
 async def on_raw_reaction_remove(payload):
+    if not reaction_role_index.is_tracked(payload.message_id):
+        return # Reaksiyon rolü ayarlanmamış bir mesaj, hiçbir iş yapmadan çık
     if payload.member and payload.member.bot:
         return # Bot kendi reaksiyonlarını yok say
 
-    async with aiosqlite.connect('bot_settings.db') as db:
-        cursor = await db.execute("SELECT role_id FROM reaction_roles WHERE guild_id = ? AND message_id = ? AND emoji = ?",
-                                 (payload.guild_id, payload.message_id, str(payload.emoji)))
-        result = await cursor.fetchone()
+    role_id = reaction_role_index.get_role_id(payload.guild_id, payload.message_id, str(payload.emoji))
 
-    if result:
+    if role_id:
         guild = bot.get_guild(payload.guild_id)
         if not guild: return
 
-        role = guild.get_role(result[0])
-        member = guild.get_member(payload.user_id) # payload.member kullanamıyoruz, raw event
+        role = guild.get_role(role_id)
+        member = await member_lookup.get(guild, payload.user_id) # Kaldırma olayında üye bilgisi gelmez
 
         if role and member:
             try:
                 # Botun rol hiyerarşisi kontrolü
                 if guild.me.top_role <= role:
-                    print(f"[Reaksiyon Rolü Hatası] Botun rolü '{role.name}' rolünden düşük. Rol kaldırılamadı.")
+                    reaction_role_logger.warning("Botun rolü '%s' rolünden düşük. Rol kaldırılamadı.", role.name, extra={'guild': guild.id})
                     return # Rol kaldırılamıyorsa devam etme
 
                 await member.remove_roles(role)
-                print(f"[Reaksiyon Rolü] {member.name} kullanıcısından '{role.name}' rolü kaldırıldı.")
+                reaction_role_logger.info("%s kullanıcısından '%s' rolü kaldırıldı.", member.name, role.name, extra={'guild': guild.id, 'user': member.id})
             except discord.Forbidden:
-                print(f"[Reaksiyon Rolü Hatası] '{member.name}' kullanıcısından '{role.name}' rolünü kaldırma yetkim yok.")
+                reaction_role_logger.warning("'%s' kullanıcısından '%s' rolünü kaldırma yetkim yok.", member.name, role.name, extra={'guild': guild.id, 'user': member.id})
             except Exception as e:
-                print(f"[Reaksiyon Rolü Hatası] Rol kaldırırken hata: {e}")
+                reaction_role_logger.exception("Rol kaldırırken hata: %s", e, extra={'guild': guild.id, 'user': member.id})
 
 
-@bot.command(name='sessiz_kanal_ayarla', help='Belirtilen kanalı sessiz moda alır. Bot bu kanalda komutlara yanıt vermez. Kullanım: `e!sessiz_kanal_ayarla #kanal`')
+@bot.hybrid_command(name='sessiz_kanal_ayarla', help='Belirtilen kanalı sessiz moda alır. Bot bu kanalda komutlara yanıt vermez. Kullanım: `e!sessiz_kanal_ayarla #kanal`')
 @commands.has_permissions(manage_channels=True)
 @check_bot_unlocked_or_owner()
 @check_not_silent_channel() # Bu komutun kendisi sessiz kanalda ayarlanamasın
 async def set_silent_channel(ctx, channel: discord.TextChannel):
-    async with aiosqlite.connect('bot_settings.db') as db:
-        await db.execute("INSERT OR IGNORE INTO silent_channels (channel_id, guild_id) VALUES (?, ?)",
-                         (channel.id, ctx.guild.id))
-        await db.commit()
+    await command_state.add_silent_channel(channel.id, ctx.guild.id)
     await ctx.send(f"✅ {channel.mention} kanalı artık sessiz moda alındı. Bot bu kanalda komutlara yanıt vermeyecek.")
-    print(f"[{ctx.author}] '{ctx.guild.name}' sunucusunda '{channel.name}' kanalını sessiz olarak ayarladı.")
+    moderation_logger.info("%s '%s' sunucusunda '%s' kanalını sessiz olarak ayarladı.", ctx.author, ctx.guild.name, channel.name, extra=ctx_fields(ctx, channel=channel.id))
 
-@bot.command(name='sessiz_kanal_sifirla', help='Belirtilen kanalı sessiz moddan çıkarır. Kullanım: `e!sessiz_kanal_sifirla #kanal`')
+@bot.hybrid_command(name='sessiz_kanal_sifirla', help='Belirtilen kanalı sessiz moddan çıkarır. Kullanım: `e!sessiz_kanal_sifirla #kanal`')
 @commands.has_permissions(manage_channels=True)
 @check_bot_unlocked_or_owner()
 @check_not_silent_channel() # Bu komutun kendisi sessiz kanalda sıfırlanamasın
 async def reset_silent_channel(ctx, channel: discord.TextChannel):
-    async with aiosqlite.connect('bot_settings.db') as db:
-        await db.execute("DELETE FROM silent_channels WHERE channel_id = ?", (channel.id,))
-        await db.commit()
+    await command_state.remove_silent_channel(channel.id)
     await ctx.send(f"✅ {channel.mention} kanalı sessiz moddan çıkarıldı. Bot artık bu kanalda komutlara yanıt verecek.")
-    print(f"[{ctx.author}] '{ctx.guild.name}' sunucusunda '{channel.name}' kanalını sessiz moddan çıkardı.")
+    moderation_logger.info("%s '%s' sunucusunda '%s' kanalını sessiz moddan çıkardı.", ctx.author, ctx.guild.name, channel.name, extra=ctx_fields(ctx, channel=channel.id))
 
-@bot.command(name='otorol_ayarla', help='Sunucuya yeni katılan üyelere otomatik olarak rol atar. Kullanım: `e!otorol_ayarla @rol`')
+@bot.hybrid_command(name='otorol_ayarla', help='Sunucuya yeni katılan üyelere otomatik olarak rol atar. Kullanım: `e!otorol_ayarla @rol`')
 @commands.has_permissions(manage_roles=True)
 @commands.bot_has_permissions(manage_roles=True)
 @check_bot_unlocked_or_owner()
@@ -1066,78 +3939,494 @@ async def set_autorole(ctx, role: discord.Role):
         await ctx.send(f"Ayarlamaya çalıştığınız '{role.name}' rolü, benim rolümden yüksek veya eşit. Bu rolü atayamam.")
         return
     
-    async with aiosqlite.connect('bot_settings.db') as db:
-        await db.execute("INSERT OR REPLACE INTO autoroles (guild_id, role_id) VALUES (?, ?)",
-                         (ctx.guild.id, role.id))
-        await db.commit()
+    await db.execute("INSERT OR REPLACE INTO autoroles (guild_id, role_id) VALUES (?, ?)",
+                     (ctx.guild.id, role.id))
+    guild_settings_cache.update(ctx.guild.id, autorole_id=role.id)
     await ctx.send(f"✅ Yeni katılan üyelere otomatik olarak `{role.name}` rolü verilecek.")
-    print(f"[{ctx.author}] '{ctx.guild.name}' sunucusunda otorolü '{role.name}' olarak ayarladı.")
+    moderation_logger.info("%s '%s' sunucusunda otorolü '%s' olarak ayarladı.", ctx.author, ctx.guild.name, role.name, extra=ctx_fields(ctx))
 
-@bot.command(name='otorol_sifirla', help='Otorol ayarını sıfırlar.')
+@bot.hybrid_command(name='otorol_sifirla', help='Otorol ayarını sıfırlar.')
 @commands.has_permissions(manage_roles=True)
 @check_bot_unlocked_or_owner()
 @check_not_silent_channel() # Sessiz kanalda çalışmasın
 async def reset_autorole(ctx):
-    async with aiosqlite.connect('bot_settings.db') as db:
-        await db.execute("DELETE FROM autoroles WHERE guild_id = ?", (ctx.guild.id,))
-        await db.commit()
+    await db.execute("DELETE FROM autoroles WHERE guild_id = ?", (ctx.guild.id,))
+    guild_settings_cache.update(ctx.guild.id, autorole_id=None)
     await ctx.send("✅ Otorol ayarı sıfırlandı. Artık yeni üyelere otomatik rol verilmeyecek.")
-    print(f"[{ctx.author}] '{ctx.guild.name}' sunucusunda otorolü sıfırladı.")
+    moderation_logger.info("%s '%s' sunucusunda otorolü sıfırladı.", ctx.author, ctx.guild.name, extra=ctx_fields(ctx))
+
+class RaidFlags(commands.FlagConverter):
+    """e!raid_ayarla için isteğe bağlı ayarlar. Örnek: `e!raid_ayarla eşik: 15 süre: 10 işlem: karantina rol: @Karantina`"""
+    durum: Optional[str] = commands.flag(default=None)                                 # açık / kapalı
+    eşik: commands.Range[int, 2, 500] = commands.flag(default=None, aliases=['esik'])
+    süre: commands.Range[int, 1, 300] = commands.flag(default=None, aliases=['sure'])    # saniye
+    hesap_yaşı: commands.Range[int, 0, 365] = commands.flag(default=None, aliases=['hesap_yasi'])  # gün
+    işlem: Optional[str] = commands.flag(default=None, aliases=['islem'])              # yok / kick / karantina
+    rol: Optional[discord.Role] = commands.flag(default=None)                          # karantina rolü
+    kilit: commands.Range[int, 1, 1440] = commands.flag(default=None)        # dakika
+
+def describe_raid_settings(guild, settings):
+    role = guild.get_role(settings.raid_quarantine_role_id) if settings.raid_quarantine_role_id else None
+    return (f"**Durum:** {'açık' if settings.raid_enabled else 'kapalı'}"
+            f"{' (şu anda kilit modunda)' if raid_guard.is_locked(guild.id) else ''}\n"
+            f"**Eşik:** {settings.raid_window} saniyede {settings.raid_threshold} katılım ({settings.raid_account_age} günden yeni hesaplar 2 sayılır)\n"
+            f"**İşlem:** {settings.raid_action}" + (f" ({role.mention})" if role else "") + "\n"
+            f"**Kilit süresi:** {settings.raid_lockdown} dakika")
+
+@bot.hybrid_command(name='raid_ayarla', help='Baskın korumasını ayarlar. Kullanım: `e!raid_ayarla [durum: açık|kapalı] [eşik: sayı] [süre: saniye] [hesap_yaşı: gün] [işlem: yok|kick|karantina] [rol: @rol] [kilit: dakika]`')
+@commands.has_permissions(manage_guild=True)
+@check_bot_unlocked_or_owner()
+@check_not_silent_channel() # Sessiz kanalda çalışmasın
+async def set_raid_protection(ctx, *, flags: RaidFlags):
+    fields = {} # raid_settings sütunu -> (değer, GuildSettings alanı)
+    if flags.durum is not None:
+        if flags.durum.lower() not in ('açık', 'acik', 'kapalı', 'kapali'):
+            return await ctx.send("Durum `açık` veya `kapalı` olmalıdır.")
+        fields['enabled'] = (int(flags.durum.lower() in ('açık', 'acik')), 'raid_enabled')
+    if flags.işlem is not None:
+        if flags.işlem.lower() not in RAID_ACTIONS:
+            return await ctx.send(f"İşlem şunlardan biri olmalıdır: {', '.join(RAID_ACTIONS)}")
+        fields['action'] = (flags.işlem.lower(), 'raid_action')
+    for column, value, attribute in (('join_threshold', flags.eşik, 'raid_threshold'), ('window_seconds', flags.süre, 'raid_window'),
+                                     ('min_account_age_days', flags.hesap_yaşı, 'raid_account_age'), ('lockdown_minutes', flags.kilit, 'raid_lockdown')):
+        if value is not None:
+            fields[column] = (value, attribute)
+    if flags.rol is not None:
+        if ctx.guild.me.top_role <= flags.rol:
+            return await ctx.send("Karantina rolü botun rolünden düşük olmalıdır.")
+        fields['quarantine_role_id'] = (flags.rol.id, 'raid_quarantine_role_id')
+
+    if fields:
+        columns = list(fields)
+        await db.execute(f"INSERT INTO raid_settings (guild_id, {', '.join(columns)}) VALUES (?{', ?' * len(columns)}) "
+                         f"ON CONFLICT(guild_id) DO UPDATE SET {', '.join(f'{column} = excluded.{column}' for column in columns)}",
+                         (ctx.guild.id, *(value for value, _ in fields.values())))
+        guild_settings_cache.invalidate(ctx.guild.id) # Boş değerlerin varsayılanları GuildSettings'te uygulanır
+        moderation_logger.info("%s '%s' sunucusunda baskın korumasını güncelledi: %s", ctx.author, ctx.guild.name,
+                               {column: value for column, (value, _) in fields.items()}, extra=ctx_fields(ctx))
+
+    settings = await guild_settings_cache.get(ctx.guild.id)
+    if settings.raid_action == 'karantina' and not settings.raid_quarantine_role_id:
+        await ctx.send("⚠️ Karantina işlemi için `rol: @rol` ile bir karantina rolü ayarlayın.")
+    embed = discord.Embed(title="🛡️ Baskın Koruması" + (" güncellendi" if fields else ""), description=describe_raid_settings(ctx.guild, settings),
+                          color=discord.Color.green() if fields else discord.Color.blue())
+    await ctx.send(embed=embed)
+
+@bot.hybrid_command(name='raid_bitir', help='Devam eden baskın kilidini bitirir; hoş geldin mesajları ve otorol yeniden başlar.')
+@commands.has_permissions(manage_guild=True)
+@check_bot_unlocked_or_owner()
+@check_not_silent_channel() # Sessiz kanalda çalışmasın
+async def end_raid_lockdown(ctx):
+    if raid_guard.end_lockdown(ctx.guild.id):
+        await ctx.send("✅ Kilit modu bitirildi. Hoş geldin mesajları ve otorol yeniden etkin.")
+        moderation_logger.warning("%s '%s' sunucusunda kilit modunu bitirdi.", ctx.author, ctx.guild.name, extra=ctx_fields(ctx))
+    else:
+        await ctx.send("Bu sunucuda devam eden bir kilit modu yok.")
+
+SPAM_DUPLICATE_MODES = {'uyarı': 0, 'uyari': 0, 'ceza': 1}
+
+@bot.hybrid_command(name='spam_tekrar', help='Tekrarlanan mesajlarda spam korumasının ne yapacağını ayarlar. Kullanım: `e!spam_tekrar [uyarı|ceza]` (varsayılan: uyarı)')
+@commands.has_permissions(manage_guild=True)
+@check_bot_unlocked_or_owner()
+@check_not_silent_channel() # Sessiz kanalda çalışmasın
+async def set_spam_duplicate_mode(ctx, mod: Optional[str] = None):
+    if mod is not None:
+        if mod.lower() not in SPAM_DUPLICATE_MODES:
+            return await ctx.send("Mod `uyarı` veya `ceza` olmalıdır.")
+        punish = SPAM_DUPLICATE_MODES[mod.lower()]
+        await db.execute("INSERT INTO spam_settings (guild_id, punish_duplicates) VALUES (?, ?) "
+                         "ON CONFLICT(guild_id) DO UPDATE SET punish_duplicates = excluded.punish_duplicates", (ctx.guild.id, punish))
+        guild_settings_cache.update(ctx.guild.id, spam_punish_duplicates=bool(punish))
+        moderation_logger.info("%s '%s' sunucusunda tekrarlanan mesaj modunu '%s' yaptı.", ctx.author, ctx.guild.name, mod.lower(), extra=ctx_fields(ctx))
+    settings = await guild_settings_cache.get(ctx.guild.id)
+    if settings.spam_punish_duplicates:
+        await ctx.send("🛡️ Tekrarlanan mesajlar silinir ve gönderen üyeye zaman aşımı verilir.")
+    else:
+        await ctx.send(f"🛡️ Tekrarlanan mesajlar için sadece moderasyon uyarısı gönderilir. Ceza için `{USAGE_PREFIX}spam_tekrar ceza` kullanın.")
+
+def resolve_cooldown_command(name):
+    """Takma adları da kabul ederek sınırı ayarlanabilecek komutun adını döner; sahibe özel veya olmayan komutlar için None."""
+    command = bot.get_command(name.lower())
+    if command is None or command.hidden:
+        return None
+    return command.qualified_name
+
+@bot.hybrid_command(name='bekleme_ayarla', help='Bir komutun kullanım sınırını ayarlar. Kullanım: `e!bekleme_ayarla <komut> <kullanım_sayısı> <saniye> [kullanıcı|kanal|sunucu]` (0 kullanım sınırı kaldırır)')
+@commands.has_permissions(manage_guild=True)
+@check_bot_unlocked_or_owner()
+@check_not_silent_channel() # Sessiz kanalda çalışmasın
+async def set_command_cooldown(ctx, command_name: str, rate: commands.Range[int, 0, 100], per: commands.Range[float, 1, 86400], scope: str = 'kullanıcı'):
+    name = resolve_cooldown_command(command_name)
+    if name is None:
+        return await ctx.send(f"`{command_name}` adında bir komut bulamadım.")
+    scope = COOLDOWN_SCOPE_ALIASES.get(scope.lower(), scope.lower())
+    if scope not in COOLDOWN_SCOPES:
+        return await ctx.send(f"Kapsam şunlardan biri olmalıdır: {', '.join(COOLDOWN_SCOPES)}")
+    await command_cooldowns.set(ctx.guild.id, name, rate, per, scope)
+    await ctx.send(f"✅ `{USAGE_PREFIX}{name}` için sınır ayarlandı: {CooldownRule(rate, per, scope).describe()}.")
+    moderation_logger.info("%s '%s' sunucusunda e!%s sınırını ayarladı: %d/%g sn (%s)", ctx.author, ctx.guild.name, name, rate, per, scope,
+                           extra=ctx_fields(ctx))
+
+@bot.hybrid_command(name='bekleme_sifirla', help='Bir komutun kullanım sınırını varsayılana döndürür. Kullanım: `e!bekleme_sifirla <komut>`')
+@commands.has_permissions(manage_guild=True)
+@check_bot_unlocked_or_owner()
+@check_not_silent_channel() # Sessiz kanalda çalışmasın
+async def reset_command_cooldown(ctx, command_name: str):
+    name = resolve_cooldown_command(command_name) or command_name
+    if await command_cooldowns.reset(ctx.guild.id, name):
+        rule = command_cooldowns.rule(ctx.guild.id, name)
+        await ctx.send(f"✅ `{USAGE_PREFIX}{name}` sınırı varsayılana döndü: {rule.describe() if rule else 'sınırsız'}.")
+        moderation_logger.info("%s '%s' sunucusunda e!%s sınırını sıfırladı.", ctx.author, ctx.guild.name, name, extra=ctx_fields(ctx))
+    else:
+        await ctx.send(f"`{USAGE_PREFIX}{name}` için bu sunucuya özel bir sınır ayarlanmamış.")
+
+@bot.hybrid_command(name='bekleme_listesi', help='Bu sunucudaki komut kullanım sınırlarını listeler.')
+@commands.has_permissions(manage_guild=True)
+@check_bot_unlocked_or_owner()
+@check_not_silent_channel() # Sessiz kanalda çalışmasın
+async def list_command_cooldowns(ctx):
+    lines = [f"`{USAGE_PREFIX}{name}`: {rule.describe()}" + (" *(sunucuya özel)*" if custom else "")
+             for name, rule, custom in command_cooldowns.rules(ctx.guild.id)]
+    embed = discord.Embed(title="⏱️ Komut Kullanım Sınırları", description="\n".join(lines)[:4096], color=discord.Color.blue())
+    embed.set_footer(text=f"Sınırlar {USAGE_PREFIX}bekleme_ayarla ile değiştirilebilir. Bot sahibi sınırlanmaz.")
+    await ctx.send(embed=embed)
 
 # --- Ticket Sistemi Komutları ---
 
-@bot.command(name='ayarla_ticket', help='Ticket sistemini ayarlar. Kullanım: `e!ayarla_ticket <#kategori_kanal_adı> <#log_kanalı_adı> <@moderatör_rolü>`')
+@bot.hybrid_command(name='ayarla_ticket', help='Ticket sistemini ayarlar. Kullanım: `e!ayarla_ticket <#kategori_kanal_adı> <#log_kanalı_adı> <@moderatör_rolü>`')
 @commands.has_permissions(manage_channels=True, manage_roles=True)
 @commands.bot_has_permissions(manage_channels=True, manage_roles=True)
 @check_bot_unlocked_or_owner()
 @check_not_silent_channel()
 async def setup_ticket(ctx, category: discord.CategoryChannel, log_channel: discord.TextChannel, mod_role: discord.Role):
-    async with aiosqlite.connect('bot_settings.db') as db:
-        await db.execute("INSERT OR REPLACE INTO ticket_settings (guild_id, ticket_category_id, ticket_log_channel_id, ticket_moderator_role_id) VALUES (?, ?, ?, ?)",
-                         (ctx.guild.id, category.id, log_channel.id, mod_role.id))
-        await db.commit()
+    await db.execute("INSERT OR REPLACE INTO ticket_settings (guild_id, ticket_category_id, ticket_log_channel_id, ticket_moderator_role_id) VALUES (?, ?, ?, ?)",
+                     (ctx.guild.id, category.id, log_channel.id, mod_role.id))
+    guild_settings_cache.update(ctx.guild.id, ticket_category_id=category.id, ticket_log_channel_id=log_channel.id, ticket_moderator_role_id=mod_role.id)
     await ctx.send(f"✅ Ticket sistemi başarıyla ayarlandı:\n"
                    f"Kategori: {category.mention}\n"
                    f"Log Kanalı: {log_channel.mention}\n"
                    f"Moderatör Rolü: {mod_role.mention}")
-    print(f"[{ctx.author}] '{ctx.guild.name}' sunucusunda ticket sistemini ayarladı.")
+    moderation_logger.info("%s '%s' sunucusunda ticket sistemini ayarladı.", ctx.author, ctx.guild.name, extra=ctx_fields(ctx))
 
-@bot.command(name='gönder_ticket_butonu', help='Ticket açma butonunu belirtilen kanala gönderir. Kullanım: `e!gönder_ticket_butonu #kanal`')
+@bot.hybrid_command(name='gönder_ticket_butonu', help='Ticket açma butonunu belirtilen kanala gönderir. Kullanım: `e!gönder_ticket_butonu #kanal`')
 @commands.has_permissions(manage_channels=True)
 @commands.bot_has_permissions(send_messages=True, embed_links=True)
 @check_bot_unlocked_or_owner()
 @check_not_silent_channel()
 async def send_ticket_button(ctx, channel: discord.TextChannel):
-    async with aiosqlite.connect('bot_settings.db') as db:
-        cursor = await db.execute("SELECT ticket_moderator_role_id FROM ticket_settings WHERE guild_id = ?", (ctx.guild.id,))
-        result = await cursor.fetchone()
-        if not result:
-            return await ctx.send("Ticket sistemi bu sunucuda ayarlanmamış. Lütfen önce `e!ayarla_ticket` komutunu kullanın.")
-        mod_role_id = result[0]
+    settings = await guild_settings_cache.get(ctx.guild.id)
+    if not settings.has_ticket_settings:
+        return await ctx.send(f"Ticket sistemi bu sunucuda ayarlanmamış. Lütfen önce `{USAGE_PREFIX}ayarla_ticket` komutunu kullanın.")
 
     embed = discord.Embed(
         title="Destek Talebi Oluştur",
         description="Aşağıdaki butona tıklayarak bir destek talebi oluşturabilirsiniz. Lütfen sorununuzu açıkça belirtin.",
         color=discord.Color.blue()
     )
-    # Butonun gönderildiği yerde TicketView'ı başlatıyoruz
-    # Her mesaja özel bir View instance'ı kullanırız, bu View'ın kendisi kalıcı olmalıdır.
-    view = TicketView(bot_instance=bot, mod_role_id=mod_role_id)
-    await channel.send(embed=embed, view=view)
+    # Tüm sunucular aynı kalıcı TicketView örneğini kullanır, sunucu ayarları tıklama anında çözülür
+    await channel.send(embed=embed, view=bot.ticket_view)
     await ctx.send(f"✅ Ticket açma butonu {channel.mention} kanalına gönderildi.")
-    print(f"[{ctx.author}] '{ctx.guild.name}' sunucusunda ticket açma butonunu '{channel.name}' kanalına gönderdi.")
+    moderation_logger.info("%s '%s' sunucusunda ticket açma butonunu '%s' kanalına gönderdi.", ctx.author, ctx.guild.name, channel.name, extra=ctx_fields(ctx, channel=channel.id))
+
+
+# --- Ticket Arşivi Komutları ---
+
+def build_archive_search_embed(query, total, rows, page, page_count):
+    embed = discord.Embed(
+        title="🔎 Ticket Arşivi Araması",
+        description=f"**Arama:** `{query}`\n**Sonuç:** {total} mesaj",
+        color=discord.Color.blue()
+    )
+    for ticket_id, channel_name, author, timestamp, snippet in rows:
+        embed.add_field(name=f"#{ticket_id} • {channel_name} • {author} • {timestamp}", value=snippet[:1020] or "(boş mesaj)", inline=False)
+    embed.set_footer(text=f"Sayfa {page + 1}/{page_count} • Transkript için: {USAGE_PREFIX}ticket_arsiv <arşiv_id>")
+    return embed
+
+class ArchiveSearchView(discord.ui.View):
+    """Arşiv arama sonuçlarında sayfalar arasında gezinmek için önceki/sonraki butonları."""
+    def __init__(self, author_id, guild_id, query, total):
+        super().__init__(timeout=120)
+        self.author_id = author_id
+        self.guild_id = guild_id
+        self.query = query
+        self.total = total
+        self.page = 0
+        self._update_buttons()
+
+    @property
+    def page_count(self):
+        return max(1, -(-self.total // ARCHIVE_PAGE_SIZE))
+
+    def _update_buttons(self):
+        self.previous_page.disabled = self.page <= 0
+        self.next_page.disabled = self.page >= self.page_count - 1
+
+    async def interaction_check(self, interaction: discord.Interaction):
+        if interaction.user.id != self.author_id:
+            await interaction.response.send_message("Bu arama sonuçlarında sadece aramayı yapan kişi gezinebilir.", ephemeral=True)
+            return False
+        return True
+
+    async def _show_page(self, interaction):
+        self.total, rows = await search_ticket_archive(self.guild_id, self.query, self.page)
+        self._update_buttons()
+        embed = build_archive_search_embed(self.query, self.total, rows, self.page, self.page_count)
+        await interaction.response.edit_message(embed=embed, view=self)
+
+    @discord.ui.button(label="Önceki", style=discord.ButtonStyle.secondary, emoji="◀️")
+    async def previous_page(self, interaction: discord.Interaction, button: discord.ui.Button):
+        self.page -= 1
+        await self._show_page(interaction)
 
+    @discord.ui.button(label="Sonraki", style=discord.ButtonStyle.secondary, emoji="▶️")
+    async def next_page(self, interaction: discord.Interaction, button: discord.ui.Button):
+        self.page += 1
+        await self._show_page(interaction)
+
+@bot.hybrid_command(name='ticket_ara', help='Kapatılan ticket\'ların arşivinde arama yapar. Kullanım: `e!ticket_ara <aranacak kelimeler>`')
+@commands.has_permissions(manage_messages=True)
+@check_bot_unlocked_or_owner()
+@check_not_silent_channel()
+async def search_tickets(ctx, *, query: str):
+    if not query.strip():
+        return await ctx.send("Lütfen aranacak kelimeleri belirtin.")
+
+    total, rows = await search_ticket_archive(ctx.guild.id, query, 0)
+    if not total:
+        return await ctx.send(f"`{query}` için ticket arşivinde sonuç bulunamadı.")
+
+    view = ArchiveSearchView(ctx.author.id, ctx.guild.id, query, total)
+    embed = build_archive_search_embed(query, total, rows, 0, view.page_count)
+    await ctx.send(embed=embed, view=view if view.page_count > 1 else None)
+    ticket_logger.info("%s '%s' sunucusunda ticket arşivinde arama yaptı: '%s' (%d sonuç)", ctx.author, ctx.guild.name, query, total, extra=ctx_fields(ctx))
+
+@bot.hybrid_command(name='ticket_arsiv', help='Arşivlenmiş bir ticket\'ın transkriptini gönderir. Kullanım: `e!ticket_arsiv <arşiv_id>`')
+@commands.has_permissions(manage_messages=True)
+@check_bot_unlocked_or_owner()
+@check_not_silent_channel()
+async def send_archived_ticket(ctx, archive_id: int):
+    result = await db.fetchone("SELECT channel_name, transcript, message_count, closed_at FROM ticket_archive WHERE id = ? AND guild_id = ?",
+                               (archive_id, ctx.guild.id))
+    if not result or result[1] is None:
+        return await ctx.send(f"Bu sunucuda `{archive_id}` ID'li arşivlenmiş bir ticket bulunamadı.")
+
+    channel_name, transcript, message_count, closed_at = result
+    if len(transcript) > ctx.guild.filesize_limit:
+        return await ctx.send("Bu transkript, sunucunun dosya yükleme sınırından büyük olduğu için gönderilemiyor.")
+
+    transcript_file = discord.File(io.BytesIO(transcript), filename=f"ticket-arsiv-{archive_id}-transcript.txt.gz")
+    await ctx.send(f"📁 **{channel_name}** (Arşiv ID: {archive_id}, {message_count} mesaj, kapanış: {closed_at})", file=transcript_file)
+    ticket_logger.info("%s '%s' sunucusunda %s ID'li ticket arşivini görüntüledi.", ctx.author, ctx.guild.name, archive_id, extra=ctx_fields(ctx))
+
+
+# --- Çöp Kayıt Temizliği ---
+# Bot dışında silinen kanal, rol ve mesajlara ya da botun ayrıldığı sunuculara ait kayıtlar iki yoldan temizlenir:
+# ilgili Discord olayı geldiğinde hemen, bot kapalıyken kaçırılan olaylar için de düzenli çalışan artımlı bir tarayıcıyla.
+ORPHAN_SWEEP_INTERVAL = 6 * 3600  # Tam taramalar arasındaki süre (saniye)
+ORPHAN_SWEEP_START_DELAY = 300    # Açılıştan sonra ilk taramadan önce bekleme (saniye); sunucular yüklensin diye
+ORPHAN_SWEEP_BATCH_SIZE = 200     # Tek seferde okunan satır sayısı
+ORPHAN_SWEEP_BATCH_DELAY = 0.5    # Partiler arası bekleme (saniye); tarama veritabanını ve olay döngüsünü meşgul etmez
+ORPHAN_GRACE_PERIOD = 60          # Bu kadar saniyeden yeni ticket'lar atlanır (kanal henüz önbelleğe gelmemiş olabilir)
+
+# Sunucuya bağlı tablolar; bot bir sunucudan ayrıldığında bu tablolardaki kayıtları silinir.
+# ticket_archive bilinçli olarak listede yok: kapatılmış ticket'ların arşivi sunucudan ayrılınca da saklanır.
+GUILD_SCOPED_TABLES = ('guild_settings', 'autoroles', 'ticket_settings', 'raid_settings', 'spam_settings', 'command_cooldowns',
+                       'reaction_roles', 'silent_channels', 'active_tickets')
+
+def _ticket_is_orphan(guild, row):
+    _, channel_id, opened_at = row
+    if opened_at:
+        opened = datetime.fromisoformat(opened_at)
+        if opened.tzinfo is None:
+            opened = opened.replace(tzinfo=timezone.utc)
+        if (datetime.now(timezone.utc) - opened).total_seconds() < ORPHAN_GRACE_PERIOD:
+            return False
+    return guild.get_channel(channel_id) is None
+
+# Taranan tablolar: (tablo, okunan sütunlar (ilki guild_id), silme anahtarı sütunları, sunucu hâlâ varken satır çöp mü?)
+# Kontrol None ise satır yalnızca bot sunucudan ayrıldığında çöp sayılır.
+ORPHAN_SWEEP_TABLES = [
+    ('active_tickets', ('guild_id', 'channel_id', 'opened_at'), ('channel_id',), _ticket_is_orphan),
+    ('silent_channels', ('guild_id', 'channel_id'), ('channel_id',), lambda guild, row: guild.get_channel(row[1]) is None),
+    ('reaction_roles', ('guild_id', 'message_id', 'emoji', 'role_id'), ('guild_id', 'message_id', 'emoji'),
+     lambda guild, row: guild.get_role(row[3]) is None),
+    ('autoroles', ('guild_id', 'role_id'), ('guild_id',), lambda guild, row: row[1] is not None and guild.get_role(row[1]) is None),
+    ('guild_settings', ('guild_id',), ('guild_id',), None),
+    ('ticket_settings', ('guild_id',), ('guild_id',), None),
+    ('raid_settings', ('guild_id',), ('guild_id',), None),
+    ('spam_settings', ('guild_id',), ('guild_id',), None),
+    ('command_cooldowns', ('guild_id', 'command_name'), ('guild_id', 'command_name'), None),
+]
+
+def owns_guild(guild_id):
+    """Sunucu bu işlemin shard'larından birindeyse True. Küme modunda diğer işçilerin sunucuları ayrılmış sayılmamalı."""
+    shard_count = bot.shard_count or 1
+    if shard_count <= 1:
+        return True
+    shard_ids = getattr(bot, 'shard_ids', None)
+    return shard_ids is None or (guild_id >> 22) % shard_count in shard_ids
+
+class OrphanCollector:
+    """
+    Silinmiş Discord nesnelerine işaret eden veritabanı kayıtlarını ve bellekteki kopyalarını temizler.
+    Olay işleyicileri tek tek nesneler için çağırır; tarayıcı ise tabloları rowid sırasıyla küçük partiler halinde
+    okuyup önbellekle karşılaştırır. Tarayıcı yalnızca önbellekten karar verir, Discord'a istek atmaz; bu yüzden bot
+    kapalıyken silinen mesajlar tarayıcı tarafından değil, ancak rolleri de silinmişse temizlenir.
+    """
+    def __init__(self, bot_instance, database):
+        self.bot = bot_instance
+        self.db = database
+        self._task = None
+        self.removed = collections.Counter() # tablo -> silinen satır sayısı
+        self.last_sweep_at = None
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(), name="cop-toplayici")
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    # --- Olay kaynaklı temizlik ---
+
+    async def channel_deleted(self, channel):
+        self.removed['active_tickets'] += await self.db.execute("DELETE FROM active_tickets WHERE channel_id = ?", (channel.id,))
+        if command_state.is_silent(channel.id):
+            await command_state.remove_silent_channel(channel.id)
+            self.removed['silent_channels'] += 1
+
+    async def role_deleted(self, role):
+        removed = await reaction_role_index.remove_role(role.guild.id, role.id)
+        self.removed['reaction_roles'] += removed
+        settings = await guild_settings_cache.get(role.guild.id)
+        if settings.autorole_id == role.id:
+            await self.db.execute("DELETE FROM autoroles WHERE guild_id = ? AND role_id = ?", (role.guild.id, role.id))
+            guild_settings_cache.update(role.guild.id, autorole_id=None)
+            self.removed['autoroles'] += 1
+
+    async def messages_deleted(self, message_ids):
+        for message_id in message_ids:
+            if reaction_role_index.is_tracked(message_id): # Sıradan mesaj silmeleri veritabanına gitmez
+                self.removed['reaction_roles'] += await reaction_role_index.remove_message(message_id)
+
+    async def guild_removed(self, guild_id):
+        silent_rows = await self.db.fetchall("SELECT channel_id FROM silent_channels WHERE guild_id = ?", (guild_id,))
+        for table in GUILD_SCOPED_TABLES:
+            self.removed[table] += await self.db.execute(f"DELETE FROM {table} WHERE guild_id = ?", (guild_id,))
+        command_state.forget_silent_channels(channel_id for (channel_id,) in silent_rows)
+        reaction_role_index.forget_guild(guild_id)
+        command_cooldowns.forget_guild(guild_id)
+        guild_settings_cache.invalidate(guild_id)
+        db_logger.info("Ayrılınan sunucunun kayıtları silindi.", extra={'guild': guild_id})
+
+    # --- Artımlı tarama ---
+
+    async def _run(self):
+        await self.bot.wait_until_ready()
+        await asyncio.sleep(ORPHAN_SWEEP_START_DELAY)
+        while True:
+            try:
+                await self.sweep()
+            except Exception as e:
+                db_logger.exception("Çöp kayıt taraması başarısız: %s", e)
+            await asyncio.sleep(ORPHAN_SWEEP_INTERVAL)
+
+    async def sweep(self):
+        """Tüm tabloları bir kez tarar ve silinen satır sayısını döner."""
+        started = time.monotonic()
+        total = 0
+        for table, columns, key_columns, is_orphan in ORPHAN_SWEEP_TABLES:
+            total += await self._sweep_table(table, columns, key_columns, is_orphan)
+        self.last_sweep_at = datetime.now(timezone.utc)
+        db_logger.info("Çöp kayıt taraması bitti: %d kayıt silindi (%.1f sn).", total, time.monotonic() - started)
+        return total
+
+    async def _sweep_table(self, table, columns, key_columns, is_orphan):
+        select_sql = f"SELECT rowid, {', '.join(columns)} FROM {table} WHERE rowid > ? ORDER BY rowid LIMIT ?"
+        delete_sql = f"DELETE FROM {table} WHERE {' AND '.join(f'{column} = ?' for column in key_columns)}"
+        key_indexes = [columns.index(column) for column in key_columns]
+        removed = 0
+        last_rowid = 0
+        while True:
+            rows = await self.db.fetchall(select_sql, (last_rowid, ORPHAN_SWEEP_BATCH_SIZE))
+            if not rows:
+                return removed
+            last_rowid = rows[-1][0]
+            orphans = [row[1:] for row in rows if self._is_orphan(row[1:], is_orphan)]
+            if orphans:
+                await self.db.executemany(delete_sql, [tuple(row[i] for i in key_indexes) for row in orphans])
+                self._forget(table, orphans)
+                removed += len(orphans)
+                self.removed[table] += len(orphans)
+            if len(rows) < ORPHAN_SWEEP_BATCH_SIZE:
+                return removed
+            await asyncio.sleep(ORPHAN_SWEEP_BATCH_DELAY)
+
+    def _is_orphan(self, row, is_orphan):
+        guild_id = row[0]
+        if not owns_guild(guild_id):
+            return False # Başka bir küme işçisinin sunucusu
+        guild = self.bot.get_guild(guild_id)
+        if guild is None:
+            return True # Bot sunucudan ayrılmış
+        if guild.unavailable:
+            return False # Kanal ve rol listesi henüz gelmedi, karar verilemez
+        return is_orphan is not None and is_orphan(guild, row)
+
+    def _forget(self, table, rows):
+        """Silinen satırların bellekteki kopyalarını düşürür."""
+        if table == 'silent_channels':
+            command_state.forget_silent_channels(channel_id for (_, channel_id) in rows)
+        elif table == 'reaction_roles':
+            reaction_role_index.forget((guild_id, message_id, emoji) for guild_id, message_id, emoji, _ in rows)
+        elif table in ('autoroles', 'guild_settings', 'ticket_settings', 'raid_settings', 'spam_settings'):
+            for row in rows:
+                guild_settings_cache.invalidate(row[0])
+        elif table == 'command_cooldowns':
+            for guild_id in {row[0] for row in rows}:
+                command_cooldowns.forget_guild(guild_id)
+
+orphan_collector = OrphanCollector(bot, db)
+
+@bot.event
+@timed_event('on_guild_channel_delete')
+async def on_guild_channel_delete(channel):
+    await orphan_collector.channel_deleted(channel)
+
+@bot.event
+@timed_event('on_guild_role_delete')
+async def on_guild_role_delete(role):
+    await orphan_collector.role_deleted(role)
+
+@bot.event
+@timed_event('on_raw_message_delete')
+async def on_raw_message_delete(payload):
+    await orphan_collector.messages_deleted((payload.message_id,))
+
+@bot.event
+@timed_event('on_raw_bulk_message_delete')
+async def on_raw_bulk_message_delete(payload):
+    await orphan_collector.messages_deleted(payload.message_ids)
+
+@bot.event
+@timed_event('on_guild_remove')
+async def on_guild_remove(guild):
+    await orphan_collector.guild_removed(guild.id)
 
 # --- Bot Sahibi Komutları (Hidden) ---
 
-@bot.command(name='kapat', help='Botu kapatır.', hidden=True)
+@bot.hybrid_command(name='kapat', help='Botu kapatır.', hidden=True)
 @commands.is_owner() # Sadece bot sahibi kullanabilir
 async def shutdown(ctx):
     await ctx.send("Kapanıyorum...")
-    print(f"[{ctx.author}] Botu kapattı.")
+    logger.warning("%s botu kapattı.", ctx.author, extra=ctx_fields(ctx))
+    await db.flush() # Bekleyen yazmalar bağlantılar kapanmadan önce commit edilsin
     await bot.close()
 
-@bot.command(name='değiştir_durum', help='Botun durumunu değiştirir. Kullanım: `e!değiştir_durum <oynuyor|dinliyor|izliyor> <mesaj>`', hidden=True)
+@bot.hybrid_command(name='değiştir_durum', help='Botun durumunu değiştirir. Kullanım: `e!değiştir_durum <oynuyor|dinliyor|izliyor> <mesaj>`', hidden=True)
 @commands.is_owner()
 async def change_status(ctx, activity_type: str, *, message: str):
     activity_type = activity_type.lower()
@@ -1153,26 +4442,126 @@ async def change_status(ctx, activity_type: str, *, message: str):
 
     await bot.change_presence(activity=activity)
     await ctx.send(f"Botun durumu başarıyla `{activity_type.capitalize()}: {message}` olarak ayarlandı.")
-    print(f"[{ctx.author}] Botun durumunu '{activity_type}: {message}' olarak değiştirdi.")
+    logger.info("%s botun durumunu '%s: %s' olarak değiştirdi.", ctx.author, activity_type, message, extra=ctx_fields(ctx))
+
+@bot.hybrid_command(name='otorol_kuyruk', help='Otorol kuyruğunun durumunu gösterir.', hidden=True)
+@commands.is_owner()
+async def autorole_queue_status(ctx):
+    embed = discord.Embed(title="Otorol Kuyruğu", color=discord.Color.blurple())
+    embed.add_field(name="Bekleyen", value=autorole_queue.depth, inline=True)
+    embed.add_field(name="Bekleyen Sunucu", value=autorole_queue.guild_count, inline=True)
+    embed.add_field(name="Verim", value=f"{autorole_queue.throughput():.2f} rol/sn", inline=True)
+    embed.add_field(name="Verilen", value=autorole_queue.processed, inline=True)
+    embed.add_field(name="Yeniden Denenen", value=autorole_queue.retried, inline=True)
+    embed.add_field(name="Başarısız / Düşürülen", value=f"{autorole_queue.failed} / {autorole_queue.dropped}", inline=True)
+    await ctx.send(embed=embed)
+
+STATS_TOP_N = 5 # İstatistik komutunda her tür için gösterilecek en yavaş kayıt sayısı
+
+@bot.hybrid_command(name='istatistik', help='Komut, olay ve veritabanı sorgusu sürelerini gösterir.', hidden=True)
+@commands.is_owner()
+async def metrics_stats(ctx):
+    embed = discord.Embed(title="Performans İstatistikleri", color=discord.Color.blurple())
+    embed.description = "p95 değerine göre en yavaş kayıtlar (süreler histogram kovalarına göre yaklaşık)."
+    for kind, title in (('command', 'Komutlar'), ('event', 'Olaylar'), ('db', 'Veritabanı')):
+        entries = sorted(metrics.by_kind(kind), key=lambda item: item[1].quantile(0.95), reverse=True)[:STATS_TOP_N]
+        lines = []
+        for name, histogram in entries:
+            short_name = name if len(name) <= 40 else name[:37] + "..."
+            lines.append(f"`{short_name}` ort {histogram.total / histogram.count * 1000:.1f}ms, "
+                         f"p95 ≤{histogram.quantile(0.95) * 1000:.0f}ms, {histogram.count} çağrı, {histogram.errors} hata")
+        total_errors = sum(histogram.errors for _, histogram in metrics.by_kind(kind))
+        embed.add_field(name=f"{title} ({metrics.rate(kind):.2f}/sn, {total_errors} hata)",
+                        value="\n".join(lines)[:1024] if lines else "Henüz veri yok.", inline=False)
+    if db.commits:
+        embed.set_footer(text=f"Group commit: {db.commits} commit, commit başına ortalama {db.committed_writes / db.commits:.1f} yazma")
+    await ctx.send(embed=embed)
 
-@bot.command(name='kilitle_bot', help='Botun tüm komutlarını (sahibe özeller hariç) kilitler.', hidden=True)
+@bot.hybrid_command(name='kilitle_bot', help='Botun tüm komutlarını (sahibe özeller hariç) kilitler.', hidden=True)
 @commands.is_owner()
 async def lock_bot(ctx):
-    async with aiosqlite.connect('bot_settings.db') as db:
-        await db.execute("REPLACE INTO bot_status (status_name, is_locked) VALUES (?, ?)", ('command_lock', 1))
-        await db.commit()
+    await command_state.set_locked(True)
     await ctx.send("🔒 Botun komutları kilitlendi. Sadece bot sahibi komutları kullanabilir.")
-    print(f"[{ctx.author}] Botun komutlarını kilitledi.")
+    logger.warning("%s botun komutlarını kilitledi.", ctx.author, extra=ctx_fields(ctx))
 
-@bot.command(name='kilidi_aç_bot', help='Botun komutlarının kilidini açar.', hidden=True)
+@bot.hybrid_command(name='kilidi_aç_bot', help='Botun komutlarının kilidini açar.', hidden=True)
 @commands.is_owner()
 async def unlock_bot(ctx):
-    async with aiosqlite.connect('bot_settings.db') as db:
-        await db.execute("REPLACE INTO bot_status (status_name, is_locked) VALUES (?, ?)", ('command_lock', 0))
-        await db.commit()
+    await command_state.set_locked(False)
     await ctx.send("🔓 Botun komutlarının kilidi açıldı. Herkes komutları kullanabilir.")
-    print(f"[{ctx.author}] Botun komutlarının kilidini açtı.")
+    logger.warning("%s botun komutlarının kilidini açtı.", ctx.author, extra=ctx_fields(ctx))
+
+
+# --- Küme (Cluster) Başlatıcı ---
+CLUSTER_RESTART_DELAY = 5.0 # Çöken bir işçinin yeniden başlatılmadan önce beklenecek süre (saniye)
 
+def split_shards(shard_count, cluster_count):
+    """0..shard_count-1 shard'larını en fazla cluster_count ardışık gruba böler."""
+    per_cluster, extra = divmod(shard_count, cluster_count)
+    groups, start = [], 0
+    for i in range(cluster_count):
+        size = per_cluster + (1 if i < extra else 0)
+        if size:
+            groups.append(list(range(start, start + size)))
+        start += size
+    return groups
 
-# Botu çalıştır
-bot.run(TOKEN)
\ No newline at end of file
+async def fetch_recommended_shard_count():
+    http = discord.http.HTTPClient(asyncio.get_running_loop())
+    try:
+        await http.static_login(TOKEN)
+        shard_count, _, _ = await http.get_bot_gateway()
+    finally:
+        await http.close()
+    return shard_count
+
+async def run_cluster_worker(cluster_id, shard_ids, shard_count, writer_address, secret):
+    env = dict(os.environ,
+               EMBEDIUM_CLUSTER_ID=str(cluster_id),
+               EMBEDIUM_SHARD_IDS=",".join(map(str, shard_ids)),
+               SHARD_COUNT=str(shard_count),
+               EMBEDIUM_DB_WRITER=writer_address,
+               EMBEDIUM_DB_SECRET=secret)
+    while True:
+        cluster_logger.info("İşçi %d başlatılıyor (shard %d-%d).", cluster_id, shard_ids[0], shard_ids[-1], extra={'cluster': cluster_id})
+        process = await asyncio.create_subprocess_exec(sys.executable, os.path.abspath(__file__), env=env)
+        try:
+            code = await process.wait()
+        except asyncio.CancelledError:
+            process.terminate()
+            await process.wait()
+            raise
+        if code == 0:
+            cluster_logger.info("İşçi %d kapandı.", cluster_id, extra={'cluster': cluster_id})
+            return
+        cluster_logger.error("İşçi %d %d koduyla çöktü, %.0f saniye sonra yeniden başlatılacak.", cluster_id, code, CLUSTER_RESTART_DELAY, extra={'cluster': cluster_id})
+        await asyncio.sleep(CLUSTER_RESTART_DELAY)
+
+async def run_cluster_launcher():
+    """Shard'ları CLUSTER_COUNT işçi işleme dağıtır ve veritabanının tek yazıcısı olarak çalışır."""
+    shard_count = SHARD_COUNT or await fetch_recommended_shard_count()
+    clusters = split_shards(shard_count, CLUSTER_COUNT)
+    await db.connect()
+    await setup_db()
+    secret = secrets.token_hex(32)
+    server = await asyncio.start_server(DatabaseWriterServer(db, secret).handle, '127.0.0.1', 0) # Sadece yerel bağlantılar
+    host, port = server.sockets[0].getsockname()[:2]
+    cluster_logger.info("%d shard %d işleme dağıtılıyor. Veritabanı yazıcısı %s:%s adresinde.", shard_count, len(clusters), host, port)
+    try:
+        async with server:
+            await asyncio.gather(*(run_cluster_worker(cluster_id, shard_ids, shard_count, f"{host}:{port}", secret)
+                                   for cluster_id, shard_ids in enumerate(clusters)))
+    finally:
+        await db.close()
+
+# Botu çalıştır (benchmark.py gibi araçlar main.py'yi botu başlatmadan içe aktarabilsin diye __main__ kontrolü)
+if __name__ == '__main__':
+    if '--check-plans' in sys.argv[1:]:
+        sys.exit(asyncio.run(run_query_plan_check()))
+    if IS_CLUSTER_LAUNCHER:
+        try:
+            asyncio.run(run_cluster_launcher())
+        except KeyboardInterrupt:
+            cluster_logger.info("Başlatıcı kapatıldı.")
+    else:
+        bot.run(TOKEN, log_handler=None) # discord.py kendi handler'ını kurmasın; kayıtları yukarıdaki log kuyruğu işliyor
\ No newline at end of file
@@ -0,0 +1,53 @@
+"""
+Embedium birim testleri için ortak ayarlar.
+
+main.py botu başlatmadan içe aktarılır (benchmark.py ile aynı ortam değişkenleriyle). Testler ağa bağlanmaz;
+veritabanı gerektirenler her test için geçici bir dosya kullanır. pytest-asyncio gerekmesin diye eşzamansız
+senaryolar test içinde asyncio.run ile çalıştırılır.
+"""
+import os
+import sys
+import time
+
+# main.py içe aktarılmadan önce: sahte token, dosyaya log yok, ölçüm uç noktası kapalı, tek işlem
+os.environ.setdefault('DISCORD_TOKEN', 'test')
+os.environ['LOG_FILE'] = ''
+os.environ.setdefault('LOG_LEVEL', 'WARNING')
+os.environ['METRICS_PORT'] = '0'
+for name in ('CLUSTER_COUNT', 'SHARD_COUNT', 'SHARDED', 'EMBEDIUM_CLUSTER_ID', 'EMBEDIUM_DB_WRITER', 'ANTI_SPAM', 'SLASH_ONLY'):
+    os.environ.pop(name, None)
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import pytest
+
+import main
+
+class FakeClock:
+    """main.time yerine geçer: monotonic() elle ilerletilen saati döner, diğer her şey gerçek time modülüne gider."""
+    def __init__(self, start=1000.0):
+        self.now = start
+
+    def monotonic(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+    def __getattr__(self, name):
+        return getattr(time, name)
+
+@pytest.fixture
+def clock(monkeypatch):
+    # Sadece main'in gördüğü time değiştirilir; olay döngüsü gerçek saati kullanmaya devam eder
+    fake = FakeClock()
+    monkeypatch.setattr(main, 'time', fake)
+    return fake
+
+@pytest.fixture
+def database(tmp_path, monkeypatch):
+    """Geçici dosyada, henüz bağlanmamış bir Database; main.db de bu örneğe yönlendirilir."""
+    instance = main.Database(str(tmp_path / 'bot_settings.db'))
+    monkeypatch.setattr(main, 'db', instance)
+    return instance
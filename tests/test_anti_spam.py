@@ -0,0 +1,86 @@
+import asyncio
+import itertools
+from types import SimpleNamespace
+
+import pytest
+
+import main
+
+BOT_ID = 900
+_message_ids = itertools.count(1)
+
+@pytest.fixture(autouse=True)
+def enabled(monkeypatch):
+    # Etiketle yazılan komutların tanınması için botun giriş yapmış gibi bir kullanıcısı olmalı
+    monkeypatch.setattr(main, 'ANTI_SPAM_ENABLED', True)
+    monkeypatch.setattr(main.bot._connection, 'user', SimpleNamespace(id=BOT_ID))
+
+@pytest.fixture
+def anti_spam(clock):
+    """Yaptırımları uygulamak yerine (sebep, hedefler, tekrar mı) olarak kaydeden bir AntiSpam."""
+    engine = main.AntiSpam()
+    engine.punished = []
+    engine._punish = lambda member, reason, targets, duplicate=False: (reason, targets, duplicate)
+    engine._spawn = engine.punished.append
+    return engine
+
+def make_message(content, user_id=1, channel_id=10, manage_messages=False):
+    author = SimpleNamespace(id=user_id, bot=False, mention=f"<@{user_id}>")
+    channel = SimpleNamespace(id=channel_id, name='genel', mention=f"<#{channel_id}>",
+                              permissions_for=lambda member: SimpleNamespace(manage_messages=manage_messages))
+    return SimpleNamespace(id=next(_message_ids), content=content, author=author, channel=channel, guild=SimpleNamespace(id=5))
+
+def send(anti_spam, clock, contents, interval=2.0, **kwargs):
+    """Mesajları interval saniye arayla (hız sınırına takılmadan) gönderir; her mesajın check() sonucunu döner."""
+    results = []
+    for content in contents:
+        results.append(asyncio.run(anti_spam.check(make_message(content, **kwargs))))
+        clock.advance(interval)
+    return results
+
+def test_duplicate_messages_are_flagged_after_the_limit(anti_spam, clock):
+    results = send(anti_spam, clock, ["bedava nitro burada"] * (main.SPAM_DUPLICATE_MAX + 1))
+
+    assert results == [False] * main.SPAM_DUPLICATE_MAX + [True]
+    (reason, targets, duplicate), = anti_spam.punished
+    assert duplicate
+    assert len(targets) == main.SPAM_DUPLICATE_MAX + 1 # Tekrarlanan mesajların hepsi silinmek üzere hedeflenir
+
+def test_near_duplicates_share_a_fingerprint(anti_spam, clock):
+    results = send(anti_spam, clock, ["Bedava NITRO burada!!", "bedava nitro buradaaaa", "bedava  nitro, burada", "BEDAVA NİTRO BURADA"])
+    assert results[-1]
+
+def test_duplicates_outside_the_window_are_not_counted(anti_spam, clock):
+    interval = main.SPAM_DUPLICATE_WINDOW / (main.SPAM_DUPLICATE_MAX - 1) + 1
+    assert not any(send(anti_spam, clock, ["bedava nitro burada"] * 10, interval=interval))
+
+def test_short_replies_are_not_duplicates(anti_spam, clock):
+    assert not any(send(anti_spam, clock, ["ok", "evet", "xd", "ok", "ok", "ok", "ok", "ok"]))
+    assert anti_spam.punished == []
+
+@pytest.mark.parametrize('content', ["e!yazıtura", f"<@{BOT_ID}> yazıtura", f"<@!{BOT_ID}> yazıtura"])
+def test_repeated_commands_are_not_duplicates(anti_spam, clock, content):
+    assert not any(send(anti_spam, clock, [content] * 8))
+
+def test_message_flood_is_flagged(anti_spam, clock):
+    # Kısa mesajlar tekrar sayılmasa da hız sınırı onları da kapsar
+    results = send(anti_spam, clock, ["ok"] * (main.SPAM_USER_MAX_MESSAGES + 1), interval=0.1)
+
+    assert results == [False] * main.SPAM_USER_MAX_MESSAGES + [True]
+    (reason, targets, duplicate), = anti_spam.punished
+    assert not duplicate
+    assert len(targets) == main.SPAM_USER_MAX_MESSAGES + 1
+
+def test_moderators_are_exempt(anti_spam, clock):
+    assert not any(send(anti_spam, clock, ["bedava nitro burada"] * 8, manage_messages=True))
+
+def test_punishment_is_rate_limited(anti_spam, clock):
+    results = send(anti_spam, clock, ["bedava nitro burada"] * 8)
+    assert results[main.SPAM_DUPLICATE_MAX:] == [True] * (8 - main.SPAM_DUPLICATE_MAX)
+    assert len(anti_spam.punished) == 1 # SPAM_ACTION_COOLDOWN içinde ikinci kez işlem yapılmaz
+
+def test_tracked_users_are_bounded(clock):
+    engine = main.AntiSpam(max_users=100)
+    for user_id in range(1000):
+        asyncio.run(engine.check(make_message("e!ping", user_id=user_id)))
+    assert engine.tracked_users == 100
@@ -0,0 +1,102 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from discord.ext import commands
+
+import main
+
+def make_ctx(command_name, user_id=1, channel_id=10, guild_id=5):
+    return SimpleNamespace(author=SimpleNamespace(id=user_id), channel=SimpleNamespace(id=channel_id),
+                           guild=SimpleNamespace(id=guild_id), command=SimpleNamespace(qualified_name=command_name))
+
+def consume_all(cooldowns, ctx, attempts):
+    """consume() çağrılarından kaçının geçtiğini ve son reddin bekleme süresini döner."""
+    allowed, retry_after = 0, None
+    for _ in range(attempts):
+        try:
+            cooldowns.consume(ctx)
+            allowed += 1
+        except commands.CommandOnCooldown as error:
+            retry_after = error.retry_after
+    return allowed, retry_after
+
+def test_consume_allows_rate_then_raises(clock):
+    cooldowns = main.CommandCooldowns(None)
+    rate, per, _ = main.DEFAULT_COOLDOWNS['zar']
+
+    allowed, retry_after = consume_all(cooldowns, make_ctx('zar'), rate + 3)
+
+    assert allowed == rate
+    assert retry_after == pytest.approx(per / rate)
+    assert cooldowns.limited['zar'] == 3
+
+def test_tokens_come_back_over_time(clock):
+    cooldowns = main.CommandCooldowns(None)
+    rate, per, _ = main.DEFAULT_COOLDOWNS['zar']
+    ctx = make_ctx('zar')
+    consume_all(cooldowns, ctx, rate)
+
+    clock.advance(per / rate) # Bir jetonluk süre
+    assert consume_all(cooldowns, ctx, rate) == (1, pytest.approx(per / rate))
+    clock.advance(per) # Kova tamamen dolar ama rate'ten fazla jeton birikmez
+    assert consume_all(cooldowns, ctx, rate + 1)[0] == rate
+
+def test_scopes_key_buckets_separately(clock):
+    cooldowns = main.CommandCooldowns(None)
+    rate, _, scope = main.DEFAULT_COOLDOWNS['zar']
+    assert scope == 'kullanıcı'
+    consume_all(cooldowns, make_ctx('zar', user_id=1), rate)
+
+    assert consume_all(cooldowns, make_ctx('zar', user_id=2), 1) == (1, None)        # Başka kullanıcı
+    assert consume_all(cooldowns, make_ctx('zar', user_id=1, guild_id=6), 1) == (1, None) # Başka sunucu
+    assert consume_all(cooldowns, make_ctx('zar', user_id=1, channel_id=11), 1)[0] == 0  # Kanal kullanıcı kovasını değiştirmez
+
+    channel_rate = main.DEFAULT_COOLDOWNS['duyuru'][0]
+    consume_all(cooldowns, make_ctx('duyuru', user_id=1), channel_rate)
+    assert consume_all(cooldowns, make_ctx('duyuru', user_id=2), 1)[0] == 0 # Kanal kapsamında kova kanalındır
+
+def test_owner_and_unlisted_commands_are_not_limited(clock):
+    cooldowns = main.CommandCooldowns(None)
+    assert consume_all(cooldowns, make_ctx('zar', user_id=main.OWNER_ID), 100) == (100, None)
+    assert consume_all(cooldowns, make_ctx('ping'), 100) == (100, None)
+    assert cooldowns.bucket_count == 0
+
+def test_guild_overrides(database, clock):
+    async def scenario():
+        await database.connect()
+        try:
+            await main.run_migrations()
+            cooldowns = main.CommandCooldowns(database)
+            await cooldowns.set(5, 'zar', 0, 10.0, 'kullanıcı') # 0 = sınırsız
+            await cooldowns.set(5, 'ping', 1, 30.0, 'sunucu')
+            unlimited = consume_all(cooldowns, make_ctx('zar'), 50)
+            ping = consume_all(cooldowns, make_ctx('ping', user_id=2), 2)
+
+            reloaded = main.CommandCooldowns(database)
+            await reloaded.load()
+            rules = {name: (rule.rate, rule.per, rule.scope, custom) for name, rule, custom in reloaded.rules(5)}
+
+            assert await reloaded.reset(5, 'zar')
+            assert not await reloaded.reset(5, 'zar')
+            return unlimited, ping, rules, reloaded.rule(5, 'zar').rate
+        finally:
+            await database.close()
+
+    unlimited, ping, rules, default_rate = asyncio.run(scenario())
+    assert unlimited == (50, None)
+    assert ping == (1, pytest.approx(30.0))
+    assert rules['zar'] == (0, 10.0, 'kullanıcı', True)
+    assert rules['ping'] == (1, 30.0, 'sunucu', True)
+    assert rules['duyuru'][3] is False
+    assert default_rate == main.DEFAULT_COOLDOWNS['zar'][0]
+
+def test_buckets_are_bounded_and_refilled_ones_evicted(clock):
+    cooldowns = main.CommandCooldowns(None, max_buckets=100)
+    for user_id in range(1000):
+        cooldowns.consume(make_ctx('zar', user_id=user_id))
+    assert cooldowns.bucket_count <= 100
+
+    clock.advance(main.DEFAULT_COOLDOWNS['zar'][1]) # Hepsi yeniden doldu
+    cooldowns.consume(make_ctx('zar', user_id=-1))
+    assert cooldowns.bucket_count == 1
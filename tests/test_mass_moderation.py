@@ -0,0 +1,138 @@
+import asyncio
+from types import SimpleNamespace
+
+import discord
+import pytest
+
+import main
+
+BOT_ID = 900
+AUTHOR_ID = 1
+GUILD_OWNER_ID = 2
+
+def http_error(error_class, status):
+    return error_class(SimpleNamespace(status=status, reason="test"), {'code': 0, 'message': "test"})
+
+class FakeGuild:
+    """Engine'in kullandığı Guild yöntemleri; yanıtı errors sözlüğüne göre hata olan kullanıcılar dışında hep başarılı."""
+    def __init__(self, members=(), errors=None, bulk_ban_error=None):
+        self.id = 5
+        self.owner_id = GUILD_OWNER_ID
+        self.chunked = True
+        self.me = SimpleNamespace(top_role=20)
+        self.members = {member.id: member for member in members}
+        self.errors = errors or {}
+        self.bulk_ban_error = bulk_ban_error
+        self.calls = []
+
+    def get_member(self, user_id):
+        self.calls.append(('get_member', user_id))
+        return self.members.get(user_id)
+
+    async def _act(self, action, user):
+        self.calls.append((action, user.id))
+        await asyncio.sleep(0)
+        if user.id in self.errors:
+            raise self.errors[user.id]
+
+    async def kick(self, user, reason=None):
+        await self._act('kick', user)
+
+    async def ban(self, user, reason=None):
+        await self._act('ban', user)
+
+    async def unban(self, user, reason=None):
+        await self._act('unban', user)
+
+    async def bulk_ban(self, users, reason=None):
+        self.calls.append(('bulk_ban', len(users)))
+        if self.bulk_ban_error is not None:
+            raise self.bulk_ban_error
+        return SimpleNamespace(banned=[user for user in users if user.id not in self.errors])
+
+class FakeStatusMessage:
+    def __init__(self):
+        self.edits = []
+
+    async def edit(self, content=None, **kwargs):
+        self.edits.append(content)
+
+@pytest.fixture(autouse=True)
+def logged_in(monkeypatch):
+    monkeypatch.setattr(main.bot._connection, 'user', SimpleNamespace(id=BOT_ID))
+    monkeypatch.setattr(main, 'MASS_MODERATION_PROGRESS_INTERVAL', 0.0) # Her sonuçta ilerleme yazılsın
+
+def member(user_id, top_role=1):
+    return SimpleNamespace(id=user_id, top_role=top_role)
+
+def run_engine(guild, action, user_ids):
+    ctx = SimpleNamespace(guild=guild, author=SimpleNamespace(id=AUTHOR_ID, top_role=10, mention=f"<@{AUTHOR_ID}>"))
+    engine = main.MassModerationEngine(ctx, action, "test")
+    engine.status_message = FakeStatusMessage()
+
+    async def scenario():
+        await engine.run(await engine.resolve(user_ids))
+    asyncio.run(scenario())
+    return engine
+
+def summary_counts(engine):
+    fields = {field.name: int(field.value) for field in engine.summary_embed().fields if field.name in ("Başarılı", "Atlandı", "Başarısız")}
+    return fields["Başarılı"], fields["Atlandı"], fields["Başarısız"]
+
+def assert_consistent(engine):
+    counts = engine.counts()
+    assert engine.processed == engine.total
+    assert sum(counts.values()) == engine.requested == len(engine.results)
+    assert summary_counts(engine) == (counts['başarılı'], counts['atlandı'], counts['başarısız'])
+    # İlerleme mesajı her sonuçla artar ve işlenenlerin tamamını göstererek biter
+    progress = [int(edit.split("**")[1].split("/")[0]) for edit in engine.status_message.edits]
+    assert progress == sorted(progress)
+    assert engine.status_message.edits[-1].startswith(f"⏳ İşleniyor... **{engine.total}/{engine.total}**")
+
+def test_kick_counts_every_outcome():
+    guild = FakeGuild(members=[member(10), member(11), member(12, top_role=10), member(13), member(14), member(15)],
+                      errors={13: http_error(discord.Forbidden, 403), 14: http_error(discord.NotFound, 404), 15: http_error(discord.HTTPException, 500)})
+    user_ids = [AUTHOR_ID, BOT_ID, main.OWNER_ID, 10, 11, 12, 13, 14, 15, 99]
+
+    engine = run_engine(guild, 'kick', user_ids)
+
+    assert engine.requested == 10
+    assert engine.total == 5 # Kendisi, bot, bot sahibi, yüksek rollü üye ve sunucuda olmayan kullanıcı kontrolde atlanır
+    assert engine.results[10] == engine.results[11] == ('başarılı', None)
+    assert engine.results[12] == ('atlandı', "rolü sizinkinden yüksek veya eşit")
+    assert engine.results[99] == ('atlandı', "sunucuda değil")
+    assert engine.results[13] == ('başarısız', "yetkim yok")
+    assert engine.results[14] == ('atlandı', "sunucuda değil")
+    assert engine.results[15] == ('başarısız', "HTTP 500")
+    assert_consistent(engine)
+
+def test_ban_batches_count_users_discord_did_not_ban(monkeypatch):
+    monkeypatch.setattr(main, 'MASS_BAN_BATCH_SIZE', 3)
+    guild = FakeGuild(errors={22: http_error(discord.HTTPException, 500)})
+
+    engine = run_engine(guild, 'ban', list(range(20, 28)))
+
+    assert [call for call in guild.calls if call[0] == 'bulk_ban'] == [('bulk_ban', 3), ('bulk_ban', 3), ('bulk_ban', 2)]
+    assert engine.results[22] == ('başarısız', "Discord yasaklamadı")
+    assert engine.counts()['başarılı'] == 7
+    assert_consistent(engine)
+
+def test_ban_falls_back_to_single_bans_without_manage_guild(monkeypatch):
+    monkeypatch.setattr(main, 'MASS_BAN_BATCH_SIZE', 3)
+    guild = FakeGuild(bulk_ban_error=http_error(discord.Forbidden, 403))
+
+    engine = run_engine(guild, 'ban', list(range(20, 28)))
+
+    assert sorted(user_id for action, user_id in guild.calls if action == 'ban') == list(range(20, 28))
+    assert engine.counts()['başarılı'] == 8
+    assert_consistent(engine)
+
+def test_unban_needs_no_member_lookups():
+    guild = FakeGuild(errors={31: http_error(discord.NotFound, 404)})
+
+    engine = run_engine(guild, 'unban', [30, 31, main.OWNER_ID])
+
+    assert not any(action == 'get_member' for action, _ in guild.calls)
+    assert engine.results[30] == ('başarılı', None)
+    assert engine.results[31] == ('atlandı', "yasaklı değil")
+    assert_consistent(engine)
@@ -0,0 +1,65 @@
+import asyncio
+import os
+import shutil
+import sqlite3
+
+import main
+from conftest import ROOT
+
+LATEST_VERSION = main.MIGRATIONS[-1][0]
+
+def tables(path):
+    with sqlite3.connect(path) as conn:
+        return {name for (name,) in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+
+def schema_versions(path):
+    with sqlite3.connect(path) as conn:
+        return [version for (version,) in conn.execute("SELECT version FROM schema_version ORDER BY version")]
+
+async def migrate(database):
+    await database.connect()
+    try:
+        return await main.run_migrations(), await main.run_migrations(), await main.check_query_plans()
+    finally:
+        await database.close()
+
+def test_migrations_versions_are_sequential():
+    assert [version for version, _, _ in main.MIGRATIONS] == list(range(1, LATEST_VERSION + 1))
+
+def test_run_migrations_on_fresh_database(database):
+    applied, applied_again, regressions = asyncio.run(migrate(database))
+
+    assert applied == LATEST_VERSION
+    assert applied_again == 0
+    assert regressions == []
+    assert schema_versions(database.path) == list(range(1, LATEST_VERSION + 1))
+    assert {'guild_settings', 'ticket_archive', 'raid_settings', 'command_cooldowns', 'spam_settings'} <= tables(database.path)
+
+def test_run_migrations_on_baseline_database(database):
+    # Depodaki bot_settings.db migration'lardan önceki şemayla oluşturulmuş: schema_version tablosu yok
+    shutil.copy(os.path.join(ROOT, 'bot_settings.db'), database.path)
+    with sqlite3.connect(database.path) as conn:
+        conn.execute("INSERT OR REPLACE INTO guild_settings (guild_id, welcome_channel_id) VALUES (1, 2)")
+    assert 'schema_version' not in tables(database.path)
+
+    applied, applied_again, regressions = asyncio.run(migrate(database))
+
+    assert applied == LATEST_VERSION
+    assert applied_again == 0
+    assert regressions == []
+    assert schema_versions(database.path) == list(range(1, LATEST_VERSION + 1))
+    with sqlite3.connect(database.path) as conn:
+        assert conn.execute("SELECT welcome_channel_id FROM guild_settings WHERE guild_id = 1").fetchone() == (2,)
+
+def test_query_plan_check_reports_missing_index(database):
+    async def scenario():
+        await database.connect()
+        try:
+            await main.run_migrations()
+            await database.execute("DROP INDEX idx_reaction_roles_message")
+            return await main.check_query_plans()
+        finally:
+            await database.close()
+
+    regressions = asyncio.run(scenario())
+    assert any(regression.startswith("Silinen mesajın reaksiyon rolleri") for regression in regressions)
@@ -0,0 +1,88 @@
+import asyncio
+import sqlite3
+
+import pytest
+
+import main
+
+async def create_log_table(database):
+    async with database.transaction() as conn:
+        await conn.execute("CREATE TABLE write_log (value INTEGER)")
+
+async def write_burst(database, count):
+    # Beklenmeyen (write-behind) yazmalar ve en sonda beklenen bir yazma; commit sırası çağrı sırasıyla aynı olmalı
+    for value in range(count):
+        assert await database.execute("INSERT INTO write_log (value) VALUES (?)", (value,), durable=False) is None
+    await database.execute("INSERT INTO write_log (value) VALUES (?)", (count,))
+    return [value for (value,) in await database.fetchall("SELECT value FROM write_log ORDER BY rowid")]
+
+def test_write_behind_commits_in_call_order(database):
+    async def scenario():
+        await database.connect()
+        try:
+            await create_log_table(database)
+            commits_before = database.commits
+            values = await write_burst(database, 50)
+            return values, database.commits - commits_before
+        finally:
+            await database.close()
+
+    values, commits = asyncio.run(scenario())
+    assert values == list(range(51))
+    assert commits < 51 # Yazmalar group commit ile birleşti
+
+def test_flush_commits_pending_write_behind(database):
+    async def scenario():
+        await database.connect()
+        try:
+            await create_log_table(database)
+            for value in range(10):
+                await database.execute("INSERT INTO write_log (value) VALUES (?)", (value,), durable=False)
+            await database.flush()
+            assert not database._pending
+            return await database.fetchall("SELECT value FROM write_log ORDER BY rowid")
+        finally:
+            await database.close()
+
+    assert [value for (value,) in asyncio.run(scenario())] == list(range(10))
+
+def test_failed_write_does_not_roll_back_the_batch(database):
+    async def scenario():
+        await database.connect()
+        try:
+            await create_log_table(database)
+            await database.execute("INSERT INTO write_log (value) VALUES (?)", (1,), durable=False)
+            failing = asyncio.ensure_future(database.execute("INSERT INTO missing_table VALUES (1)"))
+            await database.execute("INSERT INTO write_log (value) VALUES (?)", (2,))
+            with pytest.raises(sqlite3.OperationalError):
+                await failing
+            return await database.fetchall("SELECT value FROM write_log ORDER BY rowid")
+        finally:
+            await database.close()
+
+    assert asyncio.run(scenario()) == [(1,), (2,)]
+
+def test_cluster_worker_writes_keep_call_order(database):
+    async def scenario():
+        await database.connect()
+        await create_log_table(database)
+        server = await asyncio.start_server(main.DatabaseWriterServer(database, 'gizli').handle, '127.0.0.1', 0)
+        port = server.sockets[0].getsockname()[1]
+        worker = main.Database(database.path, writer_address=f"127.0.0.1:{port}", writer_secret='gizli')
+        await worker.connect()
+        try:
+            values = await write_burst(worker, 50)
+            await worker.execute("UPDATE write_log SET value = ? WHERE value = 0", (b'\x00\xff',))
+            blob = await worker.fetchone("SELECT value FROM write_log WHERE rowid = 1")
+            with pytest.raises(sqlite3.OperationalError):
+                await worker.execute("INSERT INTO missing_table VALUES (1)")
+            return values, blob
+        finally:
+            await worker.close()
+            server.close()
+            await server.wait_closed()
+            await database.close()
+
+    values, blob = asyncio.run(scenario())
+    assert values == list(range(51))
+    assert blob == (b'\x00\xff',)